@@ -0,0 +1,475 @@
+"""
+Async Bluetooth Module
+An asyncio front end for discovery, connect, disconnect and send. Commands
+run with asyncio.create_subprocess_exec and audio goes over non-blocking
+RFCOMM sockets, so hundreds of device operations can be in flight on one
+event loop without a thread per operation. Every operation accepts a
+timeout, and cancelling the awaiting task kills any command it started.
+Socket connects are the exception: Windows' proactor loop can only connect
+INET sockets, so RFCOMM connects run as blocking calls in the executor.
+"""
+
+import asyncio
+import re
+import socket
+import sys
+import time
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from bluetooth_manager import AudioDeviceInfo
+from capability_probe import CapabilityProbe, bluetooth_service_running
+from device_classifier import get_device_classifier
+from device_farm import DeviceFarm
+from helper_process import POWERSHELL_PREAMBLE, powershell_script_command
+
+# Color codes bluetoothctl may put around "NEW", "CHG" and "DEL"
+_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def _device_info(address: str, name: str, device_type: str = "",
+                 class_of_device: Optional[int] = None) -> AudioDeviceInfo:
+    has_audio = get_device_classifier().classify(address, name, device_type, class_of_device).is_audio
+    return {'address': address, 'name': name, 'has_audio': has_audio, 'services': 0, 'rssi': None}
+
+
+def _close_late_socket(future: asyncio.Future):
+    """Close the socket of a channel connect that finished after its caller gave up."""
+    if not future.cancelled() and future.exception() is None and future.result() is not None:
+        future.result().close()
+
+
+class AsyncBluetoothManager:
+    """
+    Coroutine-based Bluetooth manager. Until the Bluetooth service probe
+    answers (or if `mode` is given) it does not know whether to use the
+    real stack or the simulated device farm; each operation waits for that
+    answer first. Connects to the same address share one attempt.
+    """
+
+    def __init__(self, device_farm: Optional[DeviceFarm] = None, mode: Optional[str] = None,
+                 max_concurrent_connects: int = 8, max_processes: int = 4,
+                 command_timeout: float = 30.0, socket_timeout: float = 10.0,
+                 channels: Sequence[int] = (1, 2, 3, 4, 5), device_cache=None):
+        self.device_farm = device_farm or DeviceFarm.default()
+        self.mode = mode  # 'real' or 'simulated'; None until probed
+        self.backend_probe = CapabilityProbe("bluetooth_service", bluetooth_service_running)
+        self.max_concurrent_connects = max_concurrent_connects
+        self.max_processes = max_processes  # Commands running at once
+        self.command_timeout = command_timeout
+        self.socket_timeout = socket_timeout
+        self.channels = tuple(channels)
+        self.device_cache = device_cache
+
+        self.connected: Dict[str, bool] = {}
+        self.sockets: Dict[str, socket.socket] = {}
+        self._connects: Dict[str, asyncio.Task] = {}
+        self._socket_locks: Dict[str, asyncio.Lock] = {}
+        # Created on first use so they belong to the running loop
+        self._connect_slots: Optional[asyncio.Semaphore] = None
+        self._process_slots: Optional[asyncio.Semaphore] = None
+        self._mode_future: Optional[asyncio.Future] = None
+
+        self.stats = {'connects': 0, 'failed_connects': 0, 'disconnects': 0, 'sends': 0,
+                      'send_errors': 0, 'timeouts': 0, 'commands': 0, 'running_commands': 0}
+
+    @staticmethod
+    def _key(address: str) -> str:
+        return address.upper()
+
+    def _slots(self) -> Tuple[asyncio.Semaphore, asyncio.Semaphore]:
+        if self._connect_slots is None:
+            self._connect_slots = asyncio.Semaphore(self.max_concurrent_connects)
+            self._process_slots = asyncio.Semaphore(self.max_processes)
+        return self._connect_slots, self._process_slots
+
+    async def get_mode(self, timeout: float = 6.0) -> str:
+        """'real' or 'simulated', probing the Bluetooth service on first use."""
+        if self.mode is not None:
+            return self.mode
+        if self._mode_future is None:
+            loop = asyncio.get_running_loop()
+            future = self._mode_future = loop.create_future()
+
+            def on_probed(available: bool):
+                def resolve():
+                    if not future.done():
+                        future.set_result(available)
+                loop.call_soon_threadsafe(resolve)
+
+            self.backend_probe.add_listener(on_probed)
+            self.backend_probe.start()
+        try:
+            available = await asyncio.wait_for(asyncio.shield(self._mode_future), timeout)
+        except asyncio.TimeoutError:
+            available = False
+        if self.mode is None:
+            self.mode = 'real' if available else 'simulated'
+            print(f"[AsyncBluetooth] Using {self.mode} Bluetooth backend")
+        return self.mode
+
+    # Commands
+
+    async def _run_command(self, argv: List[str], timeout: Optional[float] = None) -> Tuple[int, str]:
+        """Run a command without blocking the loop; kills it on timeout or cancellation."""
+        _, process_slots = self._slots()
+        timeout = self.command_timeout if timeout is None else timeout
+        async with process_slots:
+            process = await asyncio.create_subprocess_exec(
+                *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            self.stats['commands'] += 1
+            self.stats['running_commands'] += 1
+            try:
+                stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+                return process.returncode, stdout.decode(errors='replace')
+            except asyncio.TimeoutError:
+                self.stats['timeouts'] += 1
+                raise
+            finally:
+                self.stats['running_commands'] -= 1
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+
+    async def _stream_command(self, argv: List[str], timeout: float) -> AsyncIterator[str]:
+        """Yield a command's output lines as they are printed, killing it when done or abandoned."""
+        _, process_slots = self._slots()
+        async with process_slots:
+            process = await asyncio.create_subprocess_exec(
+                *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+            self.stats['commands'] += 1
+            self.stats['running_commands'] += 1
+            deadline = time.monotonic() + timeout
+            try:
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        line = await asyncio.wait_for(process.stdout.readline(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    if not line:
+                        break
+                    yield line.decode(errors='replace').rstrip()
+            finally:
+                self.stats['running_commands'] -= 1
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+
+    # Discovery
+
+    async def discover(self, duration: float = 10.0) -> AsyncIterator[AudioDeviceInfo]:
+        """
+        Yield devices as they are found during a scan of `duration` seconds.
+        Stop early by breaking out of the loop or cancelling the task.
+        """
+        seen = set()
+        if await self.get_mode() == 'simulated':
+            started = time.monotonic()
+            for at, spec in self.device_farm.discovery_schedule(duration):
+                delay = started + at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                yield _device_info(spec.address, spec.name, spec.device_type, spec.class_of_device)
+            return
+
+        lines = self._stream_command(self._discovery_command(duration), duration + 5.0)
+        try:
+            async for line in lines:
+                device = self._parse_discovery_line(line)
+                if device and self._key(device['address']) not in seen:
+                    seen.add(self._key(device['address']))
+                    yield device
+        finally:
+            # Kill the scan now rather than when the generator is garbage collected
+            await lines.aclose()
+
+    @staticmethod
+    def _discovery_command(duration: float) -> List[str]:
+        if sys.platform == 'win32':
+            script = POWERSHELL_PREAMBLE + """
+            $adapter = Await ([Windows.Devices.Bluetooth.BluetoothAdapter]::GetDefaultAsync()) ([Windows.Devices.Bluetooth.BluetoothAdapter])
+            if ($adapter) {
+                $devices = Await ($adapter.GetDevicesAsync()) ([Windows.Devices.Enumeration.DeviceInformationCollection])
+                foreach ($device in $devices) {
+                    Write-Output "$($device.Name)|$($device.Id)"
+                }
+            }
+            """
+            return powershell_script_command(script)
+        return ['bluetoothctl', '--timeout', str(int(max(1, duration))), 'scan', 'on']
+
+    @staticmethod
+    def _parse_discovery_line(line: str) -> Optional[AudioDeviceInfo]:
+        if '|' in line:
+            name, _, address = line.partition('|')
+            name = name.strip()
+            if name and name != "None":
+                return _device_info(address.strip(), name)
+            return None
+        # bluetoothctl: "[NEW] Device AA:BB:CC:DD:EE:FF Speaker Name"; [CHG] lines carry
+        # property changes ("RSSI: -60") and [DEL] lines removals, never a name
+        parts = _ANSI_ESCAPE.sub('', line).split(None, 3)
+        if len(parts) >= 3 and parts[0] == '[NEW]' and parts[1] == 'Device' and parts[2].count(':') == 5:
+            name = parts[3] if len(parts) > 3 else parts[2]
+            return _device_info(parts[2], name)
+        return None
+
+    # Connection
+
+    async def connect(self, address: str, timeout: Optional[float] = None) -> bool:
+        """
+        Connect to a device. Concurrent calls for one address share a single
+        attempt; a caller timing out or being cancelled does not abort it
+        for the others. Returns False on failure or timeout.
+        """
+        key = self._key(address)
+        if self.connected.get(key):
+            return True
+        task = self._connects.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._connect(address))
+            self._connects[key] = task
+            task.add_done_callback(lambda _: self._connects.pop(key, None))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            print(f"[AsyncBluetooth] Connect to {address} timed out")
+            return False
+        except asyncio.CancelledError:
+            if task.cancelled():
+                return False  # Aborted by disconnect() or close(), not by our caller
+            raise
+
+    async def _connect(self, address: str) -> bool:
+        connect_slots, _ = self._slots()
+        async with connect_slots:
+            try:
+                if await self.get_mode() == 'simulated':
+                    await asyncio.sleep(self.device_farm.connect_time(address))
+                    success = self.device_farm.connect(address, wait=False)
+                else:
+                    success = await self._real_connect(address)
+            except asyncio.TimeoutError:
+                success = False
+            except OSError as e:
+                print(f"[AsyncBluetooth] Connect to {address} failed: {e}")
+                success = False
+
+        if success:
+            self.connected[self._key(address)] = True
+            self.stats['connects'] += 1
+        else:
+            self.stats['failed_connects'] += 1
+        return success
+
+    async def _real_connect(self, address: str) -> bool:
+        if sys.platform == 'win32':
+            script = f"""
+            $device = Get-PnpDevice | Where-Object {{$_.InstanceId -like "*{address.replace(':', '')}*"}}
+            if ($device) {{
+                Enable-PnpDevice -InstanceId $device.InstanceId -Confirm:$false
+                Write-Output "SUCCESS"
+            }} else {{
+                Write-Output "DEVICE_NOT_FOUND"
+            }}
+            """
+            _, output = await self._run_command(powershell_script_command(script))
+            return "SUCCESS" in output
+        returncode, _ = await self._run_command(['bluetoothctl', 'connect', address])
+        return returncode == 0
+
+    async def disconnect(self, address: str, timeout: Optional[float] = None) -> bool:
+        """Close the device's socket and disconnect it."""
+        key = self._key(address)
+        task = self._connects.get(key)
+        if task is not None:
+            task.cancel()
+        self._close_socket(address)
+        try:
+            if await self.get_mode() == 'simulated':
+                success = self.device_farm.disconnect(address)
+            else:
+                success = await self._real_disconnect(address, timeout)
+        except asyncio.TimeoutError:
+            print(f"[AsyncBluetooth] Disconnect from {address} timed out")
+            success = False
+        except OSError as e:
+            print(f"[AsyncBluetooth] Disconnect from {address} failed: {e}")
+            success = False
+        if success:
+            self.connected.pop(key, None)
+            self.stats['disconnects'] += 1
+        return success
+
+    async def _real_disconnect(self, address: str, timeout: Optional[float]) -> bool:
+        if sys.platform == 'win32':
+            script = f"""
+            $device = Get-PnpDevice | Where-Object {{$_.InstanceId -like "*{address.replace(':', '')}*"}}
+            if ($device) {{
+                Disable-PnpDevice -InstanceId $device.InstanceId -Confirm:$false
+                Write-Output "DISCONNECTED"
+            }}
+            """
+            _, output = await self._run_command(powershell_script_command(script), timeout)
+            return "DISCONNECTED" in output
+        returncode, _ = await self._run_command(['bluetoothctl', 'disconnect', address], timeout)
+        return returncode == 0
+
+    def is_connected(self, address: str) -> bool:
+        key = self._key(address)
+        if self.mode == 'simulated':
+            return self.connected.get(key, False) and self.device_farm.is_connected(address)
+        return self.connected.get(key, False)
+
+    # Sending
+
+    async def send(self, address: str, data: bytes, timeout: Optional[float] = None) -> bool:
+        """
+        Send audio to a connected device, opening its socket on first use and
+        reconnecting the socket once on error. A send that times out closes
+        the socket, since the peer may have received a partial chunk.
+        """
+        if not self.connected.get(self._key(address)):
+            return False
+        if await self.get_mode() == 'simulated':
+            success = self.device_farm.send(address, data)
+            self.stats['sends' if success else 'send_errors'] += 1
+            return success
+
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            sock = await self._get_socket(address)
+            if sock is None:
+                break
+            try:
+                await asyncio.wait_for(loop.sock_sendall(sock, data), timeout)
+                self.stats['sends'] += 1
+                return True
+            except asyncio.TimeoutError:
+                self.stats['timeouts'] += 1
+                self._close_socket(address)
+                break
+            except OSError as e:
+                print(f"[AsyncBluetooth] Send to {address} failed ({e}), reconnecting")
+                self._close_socket(address)
+        self.stats['send_errors'] += 1
+        return False
+
+    async def _get_socket(self, address: str) -> Optional[socket.socket]:
+        key = self._key(address)
+        lock = self._socket_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            sock = self.sockets.get(key)
+            if sock is None:
+                sock = await self._open_socket(address)
+                if sock is not None:
+                    self.sockets[key] = sock
+            return sock
+
+    async def _open_socket(self, address: str) -> Optional[socket.socket]:
+        """Open a non-blocking RFCOMM socket, probing all channels at once if none is known."""
+        if not hasattr(socket, 'AF_BLUETOOTH'):
+            print("[AsyncBluetooth] This Python build has no Bluetooth socket support")
+            return None
+        known = self.device_cache.get_channel(address) if self.device_cache else None
+        if known is not None:
+            sock = await self._open_channel(address, known)
+            if sock is not None:
+                return sock
+
+        tasks = [asyncio.ensure_future(self._open_channel(address, channel))
+                 for channel in self.channels if channel != known]
+        winner = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                sock = await next_done
+                if sock is not None:
+                    winner = sock
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            for task in tasks:
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    sock = task.result()
+                    if sock is not None and sock is not winner:
+                        sock.close()
+        if winner is not None and self.device_cache:
+            self.device_cache.update_channel(address, winner.getpeername()[1])
+        return winner
+
+    async def _open_channel(self, address: str, channel: int) -> Optional[socket.socket]:
+        # loop.sock_connect() fails for AF_BLUETOOTH on the proactor loop, so connect in a thread
+        future = asyncio.get_running_loop().run_in_executor(None, self._connect_channel, address, channel)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            future.add_done_callback(_close_late_socket)
+            raise
+
+    def _connect_channel(self, address: str, channel: int) -> Optional[socket.socket]:
+        """Blocking connect on one channel; returns the socket, made non-blocking, or None."""
+        sock = socket.socket(socket.AF_BLUETOOTH, socket.SOCK_STREAM, socket.BTPROTO_RFCOMM)
+        try:
+            sock.settimeout(self.socket_timeout)
+            sock.connect((address, channel))
+            sock.setblocking(False)
+            return sock
+        except (OSError, ValueError):
+            sock.close()
+            return None
+
+    def _close_socket(self, address: str):
+        sock = self.sockets.pop(self._key(address), None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    # Lifecycle
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, mode=self.mode, connected=sum(1 for c in self.connected.values() if c),
+                    connecting=len(self._connects), sockets=len(self.sockets))
+
+    async def close(self):
+        """Cancel pending connects, disconnect every device and close all sockets."""
+        for task in list(self._connects.values()):
+            task.cancel()
+        await asyncio.gather(*(self.disconnect(address) for address in list(self.connected)),
+                             return_exceptions=True)
+        for address in list(self.sockets):
+            self._close_socket(address)
+
+
+# Connect to a few hundred simulated sinks on one event loop
+async def _demo(count: int = 300):
+    import threading
+    farm = DeviceFarm.generate(count, seed=1, discover_window=2.0, connect_time=(0.2, 0.5))
+    manager = AsyncBluetoothManager(device_farm=farm, mode='simulated', max_concurrent_connects=count)
+
+    started = time.monotonic()
+    devices = [device async for device in manager.discover(duration=2.0)]
+    print(f"Discovered {len(devices)} devices in {time.monotonic() - started:.2f}s")
+
+    started = time.monotonic()
+    results = await asyncio.gather(*(manager.connect(device['address'], timeout=5.0) for device in devices))
+    print(f"Connected {sum(results)}/{len(devices)} in {time.monotonic() - started:.2f}s "
+          f"with {threading.active_count()} threads")
+
+    chunk = bytes(4096)
+    started = time.monotonic()
+    sent = await asyncio.gather(*(manager.send(device['address'], chunk) for device in devices))
+    print(f"Sent to {sum(sent)} devices in {(time.monotonic() - started) * 1000:.1f} ms")
+
+    await manager.close()
+    farm.stop()
+    print(manager.get_stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(_demo())
@@ -3,16 +3,156 @@ Audio Engine Module
 Handles audio file loading, playback, and streaming to multiple Bluetooth devices.
 """
 
-import pygame
+from __future__ import annotations
+
 import threading
 import time
 import os
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 import wave
 import struct
-import numpy as np
-from mutagen import File
 import io
+from loudness import LoudnessCache
+from latency_probe import LoopbackBackend, measure_latency
+from stream_scheduler import PresentationScheduler
+from sync_monitor import SyncMonitor
+from latency_profiles import LatencyProfileStore
+from startup_profiler import lazy_import
+
+# Loaded on first use so importing the engine does not start pygame or numpy
+pygame = lazy_import("pygame")
+np = lazy_import("numpy")
+mutagen = lazy_import("mutagen")
+
+
+def _resample_linear(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """Resample (frames, channels) audio with linear interpolation."""
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+    target_frames = int(round(len(samples) * target_rate / source_rate))
+    source_positions = np.arange(target_frames) * (source_rate / target_rate)
+    source_index = np.arange(len(samples))
+    return np.stack([np.interp(source_positions, source_index, samples[:, ch])
+                     for ch in range(samples.shape[1])], axis=1).astype(np.float32)
+
+
+def decode_audio_file(file_path: str, sample_rate: int = 44100, channels: int = 2) -> np.ndarray:
+    """
+    Decode an audio file into a float32 array of shape (frames, channels).
+    PCM WAV files are read directly; everything else is decoded by pygame.
+    """
+    if file_path.lower().endswith('.wav'):
+        try:
+            with wave.open(file_path, 'rb') as wav_file:
+                if wav_file.getsampwidth() == 2:
+                    file_channels = wav_file.getnchannels()
+                    raw = wav_file.readframes(wav_file.getnframes())
+                    samples = np.frombuffer(raw, dtype='<i2').reshape(-1, file_channels)
+                    samples = samples.astype(np.float32) / 32768.0
+                    if file_channels != channels:
+                        samples = np.repeat(samples[:, :1], channels, axis=1)
+                    return _resample_linear(samples, wav_file.getframerate(), sample_rate)
+        except wave.Error:
+            pass
+
+    if not pygame.mixer.get_init():
+        pygame.mixer.init(frequency=sample_rate, size=-16, channels=channels)
+    mixer_rate, mixer_format, mixer_channels = pygame.mixer.get_init()
+    samples = pygame.sndarray.array(pygame.mixer.Sound(file_path))
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    scale = float(2 ** (abs(mixer_format) - 1))
+    samples = samples.astype(np.float32) / scale
+    if mixer_channels != channels:
+        samples = np.repeat(samples[:, :1], channels, axis=1)
+    return _resample_linear(samples, mixer_rate, sample_rate)
+
+
+def pcm16_bytes(chunk: np.ndarray, volume: float = 1.0) -> bytes:
+    """Interleaved 16-bit little-endian PCM of a float chunk, as sent to devices."""
+    scaled = np.clip(chunk * np.float32(volume), -1.0, 1.0) * np.float32(32767.0)
+    return scaled.astype('<i2').tobytes()
+
+
+class PrefetchedTrack:
+    """A fully decoded track held in memory and read sequentially in chunks."""
+
+    def __init__(self, file_path: str, samples: np.ndarray, sample_rate: int):
+        self.file_path = file_path
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.position = 0
+
+    @property
+    def frames(self) -> int:
+        return len(self.samples)
+
+    @property
+    def remaining(self) -> int:
+        return self.frames - self.position
+
+    def read(self, frames: int) -> np.ndarray:
+        """Return the next block of up to `frames` frames."""
+        chunk = self.samples[self.position:self.position + frames]
+        self.position += len(chunk)
+        return chunk
+
+
+class CrossfadeMixer:
+    """
+    Overlaps the tail of the outgoing track with the head of the incoming one.
+    Gain curves are precomputed, so mixing a chunk is one multiply-add.
+    """
+
+    CURVES = ('linear', 'equal_power')
+
+    def __init__(self, duration: float = 3.0, curve: str = 'equal_power', sample_rate: int = 44100):
+        self.sample_rate = sample_rate
+        self.duration = 0.0
+        self.curve = curve
+        self._fade_out = np.zeros(0, dtype=np.float32)
+        self._fade_in = np.zeros(0, dtype=np.float32)
+        self._active_out = self._fade_out
+        self._active_in = self._fade_in
+        self.configure(duration, curve)
+
+    @property
+    def fade_frames(self) -> int:
+        return len(self._fade_out)
+
+    def configure(self, duration: float, curve: Optional[str] = None):
+        """
+        Set the crossfade duration in seconds and the gain curve. A fade in
+        progress keeps its curves; the new settings apply from the next one.
+        """
+        curve = curve or self.curve
+        if curve not in self.CURVES:
+            raise ValueError(f"Unknown crossfade curve: {curve}")
+        self.duration = max(0.0, duration)
+        self.curve = curve
+        self._fade_out, self._fade_in = self._build_curves(int(self.duration * self.sample_rate))
+
+    def _build_curves(self, length: int):
+        """Build fade-out/fade-in gain curves of the given length."""
+        t = (np.arange(length, dtype=np.float32) + 0.5) / max(length, 1)
+        if self.curve == 'equal_power':
+            return np.cos(t * np.pi / 2).astype(np.float32), np.sin(t * np.pi / 2).astype(np.float32)
+        return (1.0 - t).astype(np.float32), t.astype(np.float32)
+
+    def begin(self, length: int):
+        """Prepare a transition lasting `length` frames."""
+        if length == self.fade_frames:
+            self._active_out, self._active_in = self._fade_out, self._fade_in
+        else:
+            # Tracks shorter than the fade get a compressed curve, never a cut
+            self._active_out, self._active_in = self._build_curves(length)
+
+    def mix(self, outgoing: np.ndarray, incoming: np.ndarray, position: int) -> np.ndarray:
+        """Mix one chunk of the transition starting `position` frames into it."""
+        end = position + len(outgoing)
+        return (outgoing * self._active_out[position:end, None] +
+                incoming * self._active_in[position:end, None])
+
 
 class AudioEngine:
     def __init__(self):
@@ -29,7 +169,36 @@ class AudioEngine:
         self.bit_depth = 16
         
         # Synchronization
-        self.sync_delay = 0.0  # Compensation for Bluetooth latency
+        self.sync_delay = 0.0  # Extra presentation delay applied to every device
+        self.synchronizer = AudioSynchronizer()
+        # Saved with every latency profile; a profile measured with another format is not reused
+        self.synchronizer.stream_format = {'sample_rate': self.sample_rate, 'channels': self.channels,
+                                           'bit_depth': self.bit_depth}
+        self.scheduler = PresentationScheduler(self.sample_rate, clock=self.synchronizer.master_clock,
+                                               channels=self.channels)
+        self.buffer_ahead = 0.5  # Seconds of audio queued beyond the slowest device's latency
+        self._lead_time = 0.0
+        self.sync_monitor: Optional[SyncMonitor] = None
+        
+        # Decoded stream for Bluetooth devices
+        self.chunk_frames = 1024
+        self.chunk_sink: Optional[Callable[[str, np.ndarray], None]] = None
+        self.track_changed_callback: Optional[Callable[[str], None]] = None
+        self.crossfade = CrossfadeMixer(sample_rate=self.sample_rate)
+        
+        # Loudness normalization from the analysis cache (see loudness.py)
+        self.loudness_cache = LoudnessCache()
+        self.normalize_loudness = True
+        self.track_gain = 1.0
+        self.stream_thread = None
+        self._track_lock = threading.Lock()
+        self._current_track: Optional[PrefetchedTrack] = None
+        self._next_track: Optional[PrefetchedTrack] = None
+        self._deferred_track: Optional[PrefetchedTrack] = None
+        self._pending_prefetches = 0
+        self._fade_total = 0
+        self._local_fade_requested = False
+        self._local_reload: Optional[str] = None
         
     def load_file(self, file_path: str) -> bool:
         """Load an audio file for playback."""
@@ -38,16 +207,26 @@ class AudioEngine:
                 raise FileNotFoundError(f"Audio file not found: {file_path}")
             
             self.current_file = file_path
+            self.track_gain = self._get_track_gain(file_path)
             
             # Get audio file metadata
             audio_info = self._get_audio_info(file_path)
             print(f"Loaded audio file: {os.path.basename(file_path)}")
             print(f"Duration: {audio_info.get('duration', 'Unknown')}")
             print(f"Bitrate: {audio_info.get('bitrate', 'Unknown')}")
+            print(f"Track gain: {audio_info.get('track_gain', 'Not analyzed')}")
             
             # Load the file into pygame mixer
             pygame.mixer.music.load(file_path)
             
+            # Decode the stream for Bluetooth devices in the background
+            with self._track_lock:
+                self._current_track = None
+                self._next_track = None
+                self._deferred_track = None
+                self._fade_total = 0
+            self._start_prefetch(file_path, as_next=False)
+            
             return True
             
         except Exception as e:
@@ -56,10 +235,11 @@ class AudioEngine:
     
     def _get_audio_info(self, file_path: str) -> dict:
         """Get metadata information from audio file."""
+        info = {'duration': 'Unknown', 'bitrate': 'Unknown'}
         try:
-            audio_file = File(file_path)
+            audio_file = mutagen.File(file_path)
             if audio_file is not None:
-                return {
+                info = {
                     'duration': f"{int(audio_file.info.length // 60)}:{int(audio_file.info.length % 60):02d}",
                     'bitrate': f"{getattr(audio_file.info, 'bitrate', 'Unknown')} kbps",
                     'sample_rate': getattr(audio_file.info, 'sample_rate', 'Unknown'),
@@ -67,7 +247,122 @@ class AudioEngine:
                 }
         except:
             pass
-        return {'duration': 'Unknown', 'bitrate': 'Unknown'}
+        
+        loudness = self.loudness_cache.get(file_path)
+        if loudness:
+            info['track_gain'] = f"{loudness['gain_db']:+.1f} dB"
+        return info
+    
+    def _get_track_gain(self, file_path: str) -> float:
+        """Linear normalization gain for a file from the loudness cache."""
+        if not self.normalize_loudness:
+            return 1.0
+        return self.loudness_cache.get_gain(file_path)
+    
+    def _effective_volume(self) -> float:
+        """Volume for the local mixer; pygame can only attenuate, so gain is capped at 1."""
+        return self.volume * min(1.0, self.track_gain)
+    
+    def queue_next(self, file_path: str) -> bool:
+        """Queue the next track; it is decoded ahead of time for a gapless crossfade."""
+        if not os.path.exists(file_path):
+            print(f"Audio file not found: {file_path}")
+            return False
+        self._start_prefetch(file_path, as_next=True)
+        return True
+    
+    def set_crossfade(self, duration: float, curve: Optional[str] = None):
+        """
+        Configure crossfade duration (seconds) and curve ('linear' or
+        'equal_power'). Takes effect from the next transition.
+        """
+        try:
+            with self._track_lock:
+                self.crossfade.configure(duration, curve)
+            print(f"Crossfade set to {self.crossfade.duration:.1f}s ({self.crossfade.curve})")
+        except ValueError as e:
+            print(f"Error setting crossfade: {e}")
+    
+    def _start_prefetch(self, file_path: str, as_next: bool):
+        """Decode a track on a background thread."""
+        with self._track_lock:
+            self._pending_prefetches += 1
+        threading.Thread(
+            target=self._prefetch_worker,
+            args=(file_path, as_next),
+            daemon=True
+        ).start()
+    
+    def _prefetch_worker(self, file_path: str, as_next: bool):
+        """Worker thread that decodes a track into memory."""
+        try:
+            samples = decode_audio_file(file_path, self.sample_rate, self.channels)
+            gain = self._get_track_gain(file_path)
+            if gain != 1.0:
+                samples *= np.float32(gain)
+            track = PrefetchedTrack(file_path, samples, self.sample_rate)
+            with self._track_lock:
+                if as_next and self._fade_total:
+                    # Never swap the incoming track in the middle of a fade
+                    self._deferred_track = track
+                elif as_next:
+                    self._next_track = track
+                elif self.current_file == file_path:
+                    self._current_track = track
+        except Exception as e:
+            print(f"Error decoding {os.path.basename(file_path)}: {e}")
+        finally:
+            with self._track_lock:
+                self._pending_prefetches -= 1
+    
+    def read_chunk(self, frames: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        Read the next chunk of the decoded stream, crossfading into the queued
+        track when the current one reaches its tail. Returns None when no
+        decoded audio is available.
+        """
+        frames = frames or self.chunk_frames
+        with self._track_lock:
+            track = self._current_track
+            if track is None or (track.remaining == 0 and self._next_track is None):
+                return None
+            
+            incoming = self._next_track
+            fade_length = 0
+            if incoming is not None:
+                fade_length = min(self.crossfade.fade_frames, track.frames, incoming.frames)
+            
+            # A fade in progress runs to its end even if the crossfade was reconfigured
+            if self._fade_total or (fade_length and track.remaining <= fade_length):
+                if not self._fade_total:
+                    self._fade_total = track.remaining
+                    self.crossfade.begin(self._fade_total)
+                    self._local_fade_requested = True
+                position = self._fade_total - track.remaining
+                count = min(frames, track.remaining)
+                chunk = self.crossfade.mix(track.read(count), incoming.read(count), position)
+            else:
+                # Stop exactly at the fade start so the transition is sample-accurate
+                if fade_length:
+                    frames = min(frames, track.remaining - fade_length)
+                chunk = track.read(frames)
+            
+            if track.remaining == 0 and incoming is not None:
+                self._advance_track()
+            return chunk
+    
+    def _advance_track(self):
+        """Make the queued track current. Caller holds the track lock."""
+        self._current_track = self._next_track
+        self._next_track = self._deferred_track
+        self._deferred_track = None
+        self._fade_total = 0
+        self.current_file = self._current_track.file_path
+        self.track_gain = self._get_track_gain(self.current_file)
+        self._local_reload = self.current_file
+        print(f"Now playing: {os.path.basename(self.current_file)}")
+        if self.track_changed_callback:
+            self.track_changed_callback(self.current_file)
     
     def play(self, device_addresses: List[str]) -> bool:
         """Start playing audio to specified Bluetooth devices."""
@@ -82,6 +377,14 @@ class AudioEngine:
             self.is_playing = True
             self.is_paused = False
             
+            # Restart the decoded stream from the beginning of the current track
+            with self._track_lock:
+                if self._current_track:
+                    self._current_track.position = 0
+                self._fade_total = 0
+                self._local_fade_requested = False
+                self._local_reload = None
+            
             # Start playback thread
             self.playback_thread = threading.Thread(
                 target=self._playback_worker,
@@ -99,81 +402,104 @@ class AudioEngine:
     def _playback_worker(self, device_addresses: List[str]):
         """Worker thread for audio playback."""
         try:
-            # Apply synchronization delay for Bluetooth devices
-            if self.sync_delay > 0:
-                time.sleep(self.sync_delay)
+            # Stream audio data to Bluetooth devices; devices start filling
+            # their queues now and release chunks at pts - device latency
+            self._stream_to_bluetooth_devices(device_addresses)
             
-            # Start pygame mixer playback
-            pygame.mixer.music.set_volume(self.volume)
+            # Start local playback at the presentation time of the first sample
+            delay = self.scheduler.start_pts - self.synchronizer.master_clock()
+            if delay > 0 and self.stop_event.wait(delay):
+                return
+            
+            pygame.mixer.music.set_volume(self._effective_volume())
             pygame.mixer.music.play()
             
             # Monitor playback
             while self.is_playing and not self.stop_event.is_set():
-                if not pygame.mixer.music.get_busy() and not self.is_paused:
+                self._follow_track_transition()
+                
+                stream_active = self.stream_thread is not None and self.stream_thread.is_alive()
+                if not pygame.mixer.music.get_busy() and not self.is_paused and not stream_active:
                     # Music finished playing
                     self.is_playing = False
                     break
                 
                 time.sleep(0.1)
             
-            # Stream audio data to Bluetooth devices
-            self._stream_to_bluetooth_devices(device_addresses)
-            
         except Exception as e:
             print(f"Error in playback worker: {e}")
             self.is_playing = False
     
+    def _follow_track_transition(self):
+        """Mirror decoded-stream track changes on the local pygame output."""
+        if self._local_fade_requested:
+            self._local_fade_requested = False
+            pygame.mixer.music.fadeout(int(self.crossfade.duration * 1000))
+        
+        if self._local_reload:
+            file_path, self._local_reload = self._local_reload, None
+            pygame.mixer.music.load(file_path)
+            pygame.mixer.music.set_volume(self._effective_volume())
+            pygame.mixer.music.play()
+    
     def _stream_to_bluetooth_devices(self, device_addresses: List[str]):
         """Stream audio data to multiple Bluetooth devices simultaneously."""
         try:
-            # This is where we would implement actual Bluetooth audio streaming
-            # For now, we'll simulate the process
-            
             print(f"Streaming audio to {len(device_addresses)} Bluetooth devices")
             
-            # In a real implementation, this would:
-            # 1. Read audio data from the current file
-            # 2. Convert to appropriate format for Bluetooth A2DP
-            # 3. Send data packets to each connected device
-            # 4. Handle synchronization and buffering
-            
+            latencies = self.synchronizer.get_device_latencies(device_addresses)
+            start_pts = self.scheduler.start(device_addresses, latencies, self._send_chunk,
+                                             extra_delay=self.sync_delay)
             for device_address in device_addresses:
-                print(f"Streaming to device: {device_address}")
-                # Simulate audio streaming
-                threading.Thread(
-                    target=self._device_stream_worker,
-                    args=(device_address,),
-                    daemon=True
-                ).start()
+                self._apply_device_drift(device_address)
+            self._lead_time = start_pts - self.synchronizer.master_clock()
+            
+            self.stream_thread = threading.Thread(
+                target=self._stream_worker,
+                args=(list(device_addresses),),
+                daemon=True
+            )
+            self.stream_thread.start()
                 
         except Exception as e:
             print(f"Error streaming to Bluetooth devices: {e}")
     
-    def _device_stream_worker(self, device_address: str):
-        """Worker thread for streaming to a specific device."""
+    def _stream_worker(self, device_addresses: List[str]):
+        """Read the decoded stream and stamp each chunk with its presentation time."""
         try:
-            # Simulate audio streaming to individual device
             while self.is_playing and not self.stop_event.is_set():
-                if self.is_paused:
-                    time.sleep(0.1)
+                # Stay at most buffer_ahead seconds ahead of the schedule
+                ahead = self.scheduler.time_until_next() - self._lead_time - self.buffer_ahead
+                if self.is_paused or ahead > 0:
+                    time.sleep(0.1 if self.is_paused else min(ahead, 0.1))
                     continue
                 
-                # In real implementation:
-                # - Read audio chunk from current file
-                # - Apply any device-specific audio processing
-                # - Send via Bluetooth A2DP protocol
-                # - Handle latency compensation
+                chunk = self.read_chunk()
+                if chunk is None:
+                    if self._pending_prefetches:
+                        time.sleep(0.01)
+                        continue
+                    break
                 
-                time.sleep(0.1)  # Simulate processing time
+                self.scheduler.submit(chunk)
                 
         except Exception as e:
-            print(f"Error in device stream worker for {device_address}: {e}")
+            print(f"Error in stream worker: {e}")
+    
+    def _send_chunk(self, device_address: str, chunk: np.ndarray):
+        """Deliver one chunk of decoded audio to a device."""
+        try:
+            if self.chunk_sink:
+                self.chunk_sink(device_address, chunk)
+        except Exception as e:
+            print(f"Error sending audio to {device_address}: {e}")
     
     def pause(self):
         """Pause audio playback."""
         try:
             if self.is_playing and not self.is_paused:
                 pygame.mixer.music.pause()
+                self.scheduler.pause()
                 self.is_paused = True
                 print("Audio playback paused")
                 
@@ -184,6 +510,7 @@ class AudioEngine:
         """Resume audio playback."""
         try:
             if self.is_playing and self.is_paused:
+                self.scheduler.resume()
                 pygame.mixer.music.unpause()
                 self.is_paused = False
                 print("Audio playback resumed")
@@ -199,9 +526,12 @@ class AudioEngine:
             self.stop_event.set()
             
             pygame.mixer.music.stop()
+            self.scheduler.stop()
             
             if self.playback_thread and self.playback_thread.is_alive():
                 self.playback_thread.join(timeout=2)
+            if self.stream_thread and self.stream_thread.is_alive():
+                self.stream_thread.join(timeout=2)
             
             print("Audio playback stopped")
             
@@ -213,7 +543,7 @@ class AudioEngine:
         try:
             self.volume = max(0.0, min(1.0, volume))
             if pygame.mixer.get_init():
-                pygame.mixer.music.set_volume(self.volume)
+                pygame.mixer.music.set_volume(self._effective_volume())
             print(f"Volume set to {self.volume:.2f}")
             
         except Exception as e:
@@ -245,8 +575,74 @@ class AudioEngine:
         except Exception as e:
             print(f"Error setting position: {e}")
     
+    def set_device_latency(self, device_address: str, latency: float):
+        """Update a device's latency; while streaming its delay line adjusts smoothly."""
+        self.synchronizer.device_delays[device_address] = latency
+        self.scheduler.set_device_latency(device_address, latency)
+    
+    def on_device_connected(self, device_address: str) -> bool:
+        """Apply a newly connected device's saved latency and drift profile immediately."""
+        if not self.synchronizer.apply_profile(device_address):
+            return False
+        self.scheduler.set_device_latency(device_address, self.synchronizer.get_device_latency(device_address))
+        self._apply_device_drift(device_address)
+        return True
+    
+    def _apply_device_drift(self, device_address: str):
+        """Resample a streaming device for its known clock drift, if any."""
+        drift = self.synchronizer.device_drift.get(device_address)
+        if drift:
+            self.scheduler.set_device_drift(device_address, drift)
+    
+    def add_stream_device(self, device_address: str) -> bool:
+        """
+        Join a (re)connected device to the running stream at the current
+        presentation time, leaving the other devices' playback untouched.
+        """
+        if not self.is_playing:
+            return False
+        latency = self.synchronizer.get_device_latency(device_address)
+        replayed = self.scheduler.add_device(device_address, latency)
+        self._apply_device_drift(device_address)
+        if self.sync_monitor:
+            self.sync_monitor.add_device(device_address, latency)
+        print(f"{device_address} joined the stream with {replayed} buffered chunks")
+        return True
+    
+    def remove_stream_device(self, device_address: str):
+        """Stop streaming to one device, e.g. after its link dropped."""
+        self.scheduler.remove_device(device_address)
+        if self.sync_monitor:
+            self.sync_monitor.remove_device(device_address)
+    
+    def start_sync_monitor(self, measure: Callable[[str], Optional[float]], interval: float = 2.0):
+        """
+        Continuously re-measure device latency while streaming. `measure(address)`
+        returns the device's current latency in seconds (see sync_monitor.py),
+        not the remaining offset; playhead measurements are made absolute with
+        playhead_measurement(get_playhead, self.scheduler.get_device_latency).
+        """
+        self.stop_sync_monitor()
+        self.sync_monitor = SyncMonitor(measure, self.apply_sync_correction, interval,
+                                        clock=self.synchronizer.master_clock)
+        for device_address in self.scheduler.senders:
+            self.sync_monitor.add_device(device_address, self.synchronizer.get_device_latency(device_address))
+        self.sync_monitor.start()
+    
+    def stop_sync_monitor(self):
+        """Stop continuous sync monitoring."""
+        if self.sync_monitor:
+            self.sync_monitor.stop()
+            self.sync_monitor = None
+    
+    def apply_sync_correction(self, device_address: str, latency: float, drift: float):
+        """Apply a smoothed latency and drift estimate to a device's stream."""
+        self.scheduler.set_device_drift(device_address, drift)
+        self.synchronizer.record_measurement(device_address, latency, drift, source='monitor')
+        self.scheduler.set_device_latency(device_address, latency)
+    
     def set_sync_delay(self, delay: float):
-        """Set synchronization delay for Bluetooth devices."""
+        """Set an extra presentation delay applied to all devices from the next play()."""
         self.sync_delay = max(0.0, delay)
         print(f"Sync delay set to {self.sync_delay:.3f}s")
     
@@ -276,7 +672,9 @@ class AudioEngine:
     def cleanup(self):
         """Clean up audio resources."""
         try:
+            self.stop_sync_monitor()
             self.stop()
+            self.synchronizer.profile_store.flush()
             if pygame.mixer.get_init():
                 pygame.mixer.quit()
             print("Audio engine cleaned up")
@@ -328,23 +726,83 @@ class AudioEffects:
 class AudioSynchronizer:
     """Handles audio synchronization across multiple Bluetooth devices."""
     
-    def __init__(self):
+    DEFAULT_LATENCY = 0.15  # Typical Bluetooth audio delay before calibration
+    
+    def __init__(self, profile_store: Optional[LatencyProfileStore] = None):
         self.device_delays = {}
-        self.master_clock = time.time
+        self.device_drift = {}
+        # Monotonic so presentation timestamps never jump with wall-clock changes
+        self.master_clock = time.monotonic
+        self.profile_store = profile_store or LatencyProfileStore()
+        self.stream_format: Optional[Dict] = None  # Sample rate, channels and bit depth being streamed
+    
+    def apply_profile(self, device_address: str) -> bool:
+        """Warm-start a device from its last saved calibration profile."""
+        profile = self.profile_store.get(device_address)
+        if not profile or 'latency' not in profile:
+            return False
+        if self.stream_format and profile.get('codec') not in (None, self.stream_format):
+            print(f"Device {device_address} profile was measured with {profile['codec']}; recalibration needed")
+            return False
+        
+        self.device_delays[device_address] = profile['latency']
+        self.device_drift[device_address] = profile.get('drift', 0.0)
+        print(f"Device {device_address} delay restored from profile: {profile['latency'] * 1000:.1f}ms")
+        return True
+    
+    def record_measurement(self, device_address: str, latency: float, drift: Optional[float] = None,
+                           source: str = 'measured'):
+        """Store a new latency (and drift) for a device and persist it to its profile."""
+        self.device_delays[device_address] = latency
+        if drift is not None:
+            self.device_drift[device_address] = drift
+        self.profile_store.update(device_address, latency=latency, drift=drift, codec=self.stream_format,
+                                  source=source)
         
     def calibrate_device_delay(self, device_address: str, ping_time: float):
         """Calibrate delay for a specific device based on ping time."""
         # Estimate Bluetooth audio latency (typically 100-300ms)
-        estimated_latency = ping_time + 0.15  # Add 150ms for typical Bluetooth audio delay
-        self.device_delays[device_address] = estimated_latency
+        estimated_latency = ping_time + self.DEFAULT_LATENCY
+        self.record_measurement(device_address, estimated_latency, source='ping')
         print(f"Device {device_address} delay calibrated: {estimated_latency:.3f}s")
     
+    def measure_device_delay(self, device_address: str, backend: LoopbackBackend,
+                             probe: str = 'chirp', sample_rate: int = 44100) -> Optional[float]:
+        """
+        Measure a device's latency by playing a probe signal (chirp or MLS)
+        through a loopback backend and cross-correlating the capture.
+        """
+        try:
+            latency = measure_latency(backend, probe=probe, sample_rate=sample_rate)
+            if latency is None:
+                print(f"Device {device_address} delay measurement failed: no probe detected")
+                return None
+            
+            self.record_measurement(device_address, latency, source=f'loopback-{probe}')
+            print(f"Device {device_address} delay measured: {latency * 1000:.2f}ms")
+            return latency
+            
+        except Exception as e:
+            print(f"Error measuring delay for {device_address}: {e}")
+            return None
+    
+    def get_device_latency(self, device_address: str) -> float:
+        """Get the output latency of a device, or the default if uncalibrated."""
+        return self.device_delays.get(device_address, self.DEFAULT_LATENCY)
+    
+    def get_device_latencies(self, device_addresses: List[str]) -> dict:
+        """Get output latencies for all devices."""
+        return {addr: self.get_device_latency(addr) for addr in device_addresses}
+    
     def get_sync_delays(self, device_addresses: List[str]) -> dict:
-        """Get synchronization delays for all devices."""
-        if not self.device_delays:
-            # Default delays if not calibrated
-            return {addr: 0.15 for addr in device_addresses}
+        """
+        Get how long each device's stream must be delayed so that all devices
+        play in sync with the slowest one. Uncalibrated devices use the default
+        latency, so with no calibration every delay is zero.
+        """
+        if not device_addresses:
+            return {}
         
-        max_delay = max(self.device_delays.get(addr, 0.15) for addr in device_addresses)
-        return {addr: max_delay - self.device_delays.get(addr, 0.15) 
+        max_delay = max(self.get_device_latency(addr) for addr in device_addresses)
+        return {addr: max_delay - self.get_device_latency(addr) 
                 for addr in device_addresses}
\ No newline at end of file
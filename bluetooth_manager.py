@@ -3,63 +3,108 @@ Bluetooth Manager Module
 Handles Bluetooth device discovery, connection, and communication for audio streaming.
 """
 
-import bluetooth
+import queue
+import re
 import subprocess
+import sys
 import time
 import threading
-from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Dict, Optional, Tuple, TypedDict
+from connection_pool import BluetoothConnectionPool
+from device_cache import DeviceCache
+from device_classifier import get_device_classifier, service_uuids
+from helper_process import HelperError, HelperTimeout, get_powershell_helper, shutdown_helpers
+from known_device_store import get_known_device_store
+from link_quality import RSSI, SEND_DROPS, SEND_TIME, get_link_quality_sampler
+from shutdown_coordinator import ShutdownCoordinator, ShutdownReport
+from startup_profiler import lazy_import
+
+bluetooth = lazy_import("bluetooth")  # PyBluez, loaded on first use
+asyncio = lazy_import("asyncio")  # Only needed by aiter_audio_devices()
+
+# "RSSI: -60" or, from newer BlueZ, "RSSI: 0xffffffc4 (-60)" in `bluetoothctl info`
+BLUEZ_RSSI_PATTERN = re.compile(r"RSSI:\s*(?:0x[0-9a-fA-F]+\s*\()?(-?\d+)")
+
+# PyBluez discover_devices() takes its inquiry length in units of 1.28 seconds
+INQUIRY_UNIT = 1.28
+
+# Seconds of the shutdown deadline kept back for stopping the helper after the bulk disconnect
+SHUTDOWN_HELPER_MARGIN = 1.0
+
+
+class AudioDeviceInfo(TypedDict):
+    """Device record produced by discovery."""
+    address: str
+    name: str
+    has_audio: bool
+    services: int
+    rssi: Optional[int]  # dBm; None if never measured
+
 
 class BluetoothManager:
     def __init__(self):
         self.discovered_devices = {}
         self.connected_devices = {}
-        self.audio_service_uuid = "0000110b-0000-1000-8000-00805f9b34fb"  # A2DP Audio Sink
+        # Class of device first, then SDP service UUIDs, then the name
+        self.classifier = get_device_classifier()
         
-    def discover_audio_devices(self, duration=10) -> List[Dict]:
+        # Smoothed RSSI and send timing of connected devices
+        self.link_quality = get_link_quality_sampler()
+        
+        # Concurrent SDP service discovery
+        self.max_sdp_workers = 8
+        self.sdp_timeout = 8.0  # Seconds allowed per device lookup
+        
+        # Names, services and RSSI history of previously seen devices
+        self.device_cache = DeviceCache()
+        # Devices connected before, shared with the other frontends
+        self.known_store = get_known_device_store()
+        self._revalidation_thread: Optional[threading.Thread] = None
+        
+        # Live RFCOMM sockets per device, with the working channel remembered
+        self.connection_pool = BluetoothConnectionPool(device_cache=self.device_cache)
+        self.connection_pool.start_maintenance()
+        
+        # Called with a device address when its link drops unexpectedly
+        self.link_lost_callback: Optional[Callable[[str], None]] = None
+        self.connection_pool.connection_lost_callback = self._handle_link_lost
+        
+    def discover_audio_devices(self, duration=10, device_callback: Optional[Callable[[Dict], None]] = None,
+                               use_cache: bool = True) -> List[Dict]:
         """
         Discover nearby Bluetooth devices that support audio.
         Returns a list of devices with their address, name, and audio capability.
+        Service lookups run concurrently; `device_callback` is called for each
+        device as soon as its services resolve.
+        
+        Devices seen recently are returned straight from the device cache while
+        a background discovery revalidates them; changes arrive through
+        `device_callback`.
         """
+        if use_cache:
+            cached_devices = [self._cached_device_info(entry) for entry in self.device_cache.get_nearby()]
+            if cached_devices:
+                print(f"Returning {len(cached_devices)} cached devices, refreshing in background")
+                for device_info in cached_devices:
+                    self.discovered_devices[device_info['address']] = device_info
+                    if device_callback:
+                        device_callback(device_info)
+                self._start_revalidation(duration, device_callback)
+                return cached_devices
+        
+        return self._discover(duration, device_callback)
+    
+    def _discover(self, duration: int, device_callback: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """Run an inquiry and resolve every device found."""
         try:
             print("Starting Bluetooth device discovery...")
             devices = []
             
-            # Use Windows-specific Bluetooth discovery
-            nearby_devices = bluetooth.discover_devices(duration=duration, lookup_names=True)
-            
-            for address, name in nearby_devices:
-                try:
-                    # Check if device supports audio services
-                    services = bluetooth.find_service(address=address)
-                    has_audio = any(self.audio_service_uuid.lower() in str(service.get('service-id', '')).lower() 
-                                  for service in services)
-                    
-                    # For Windows, we'll also check for common audio device patterns
-                    if not has_audio:
-                        audio_keywords = ['speaker', 'headphone', 'headset', 'airpod', 'earbud', 'audio']
-                        has_audio = any(keyword in name.lower() for keyword in audio_keywords)
-                    
-                    device_info = {
-                        'address': address,
-                        'name': name or f"Unknown Device ({address})",
-                        'has_audio': has_audio,
-                        'services': len(services),
-                        'rssi': self._get_device_rssi(address)
-                    }
-                    
-                    devices.append(device_info)
-                    self.discovered_devices[address] = device_info
-                    
-                except Exception as e:
-                    print(f"Error checking device {address}: {e}")
-                    # Add device anyway with limited info
-                    devices.append({
-                        'address': address,
-                        'name': name or f"Unknown Device ({address})",
-                        'has_audio': True,  # Assume it might have audio
-                        'services': 0,
-                        'rssi': -100
-                    })
+            for device_info in self.iter_audio_devices(duration, include_cached=False):
+                devices.append(device_info)
+                if device_callback:
+                    device_callback(device_info)
             
             print(f"Discovered {len(devices)} devices")
             return devices
@@ -69,14 +114,240 @@ class BluetoothManager:
             # Fallback: return mock devices for testing
             return self._get_mock_devices()
     
-    def _get_device_rssi(self, address: str) -> int:
-        """Get signal strength for a device (Windows implementation)."""
+    def iter_audio_devices(self, duration: int = 10, cancel_event: Optional[threading.Event] = None,
+                           include_cached: bool = True, inquiry_slice: float = 2.0) -> Iterator[AudioDeviceInfo]:
+        """
+        Discover devices incrementally, yielding each one as soon as it is known.
+        Recently seen devices come from the cache immediately; the inquiry then
+        runs in slices of about `inquiry_slice` seconds on a scanner thread, and
+        each slice's new devices are resolved while the next slice scans.
+        Setting `cancel_event` (or closing the generator) stops discovery.
+        If the inquiry fails before any device was reported (e.g. no working
+        PyBluez), the mock devices are yielded instead.
+        """
+        cancel_event = cancel_event or threading.Event()
+        reported = {}
+        
+        if include_cached:
+            for entry in self.device_cache.get_nearby():
+                if cancel_event.is_set():
+                    return
+                device_info = self._cached_device_info(entry)
+                self.discovered_devices[device_info['address']] = device_info
+                reported[device_info['address']] = device_info
+                yield device_info
+        
+        deadline = time.monotonic() + duration
+        stop_scan = threading.Event()
+        batches = queue.Queue()  # {address: class of device} per slice, an exception, or None when done
+        
+        def scan():
+            seen = set()
+            try:
+                while not (cancel_event.is_set() or stop_scan.is_set()):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    
+                    # Names come from the cache where possible, so skip the inquiry-time lookup
+                    units = max(1, int(round(min(inquiry_slice, remaining) / INQUIRY_UNIT)))
+                    found = bluetooth.discover_devices(duration=units, lookup_names=False, lookup_class=True)
+                    classes = {address: class_of_device for address, class_of_device in found
+                               if address not in seen}
+                    seen.update(classes)
+                    if classes:
+                        batches.put(classes)
+            except Exception as e:
+                batches.put(e)
+            finally:
+                batches.put(None)
+        
+        threading.Thread(target=scan, daemon=True).start()
+        try:
+            while not cancel_event.is_set():
+                try:
+                    classes = batches.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if classes is None:
+                    break
+                if isinstance(classes, Exception):
+                    raise classes
+                
+                for device_info in self._resolve_services(list(classes), classes):
+                    if cancel_event.is_set():
+                        return
+                    if reported.get(device_info['address']) != device_info:
+                        reported[device_info['address']] = device_info
+                        yield device_info
+        except Exception as e:
+            print(f"Error during device discovery: {e}")
+            if not reported:
+                # Fallback: return mock devices for testing
+                yield from self._get_mock_devices()
+        finally:
+            stop_scan.set()
+            self.device_cache.save()
+    
+    async def aiter_audio_devices(self, duration: int = 10, include_cached: bool = True) -> AsyncIterator[AudioDeviceInfo]:
+        """Async-iterator form of iter_audio_devices; cancelling the consumer stops discovery."""
+        loop = asyncio.get_running_loop()
+        cancel_event = threading.Event()
+        devices = self.iter_audio_devices(duration, cancel_event, include_cached)
+        finished = object()
         try:
-            # This is a simplified implementation
-            # In a real implementation, you'd use Windows Bluetooth APIs
-            return -50  # Mock RSSI value
-        except:
-            return -100
+            while True:
+                device_info = await loop.run_in_executor(None, next, devices, finished)
+                if device_info is finished:
+                    break
+                yield device_info
+        finally:
+            cancel_event.set()
+    
+    def _start_revalidation(self, duration: int, device_callback: Optional[Callable[[Dict], None]]):
+        """Refresh the cache with a discovery in the background."""
+        if self._revalidation_thread and self._revalidation_thread.is_alive():
+            return
+        
+        def revalidate():
+            previous_devices = dict(self.discovered_devices)
+            for device_info in self._discover(duration):
+                previous = previous_devices.get(device_info['address'])
+                if device_callback and previous != device_info:
+                    device_callback(device_info)
+        
+        self._revalidation_thread = threading.Thread(target=revalidate, daemon=True)
+        self._revalidation_thread.start()
+    
+    def _resolve_services(self, addresses: List[str], classes: Optional[Dict[str, int]] = None) -> Iterator[Dict]:
+        """
+        Resolve names and SDP services for all devices through a bounded worker
+        pool, skipping lookups the cache can still answer. A device whose
+        class of device (from `classes`, reported by the inquiry) or earlier
+        classification settles its audio capability needs no SDP query at
+        all. Yields device info in completion order; a lookup that runs longer
+        than sdp_timeout is reported with limited info instead of holding up
+        the rest.
+        """
+        if not addresses:
+            return
+        
+        started_at = {}
+        classes = classes or {}
+        
+        def lookup(address: str) -> Dict:
+            started_at[address] = time.monotonic()
+            
+            name = self.device_cache.get_name(address)
+            if name is None:
+                name = bluetooth.lookup_name(address) or ''
+                self.device_cache.update_name(address, name)
+            
+            cached_services = self.device_cache.get_services(address)
+            device_class = self.classifier.classify(address, name, class_of_device=classes.get(address))
+            if device_class.source != 'name':
+                service_count = cached_services['services'] if cached_services else 0
+                return self._build_device_info(address, name, device_class.is_audio, service_count)
+            if cached_services is not None:
+                return self._build_device_info(address, name, cached_services['has_audio'],
+                                               cached_services['services'])
+            
+            services = bluetooth.find_service(address=address)
+            has_audio = self._has_audio_service(address, name, services)
+            self.device_cache.update_services(address, len(services), has_audio)
+            return self._build_device_info(address, name, has_audio, len(services))
+        
+        pool = ThreadPoolExecutor(max_workers=min(self.max_sdp_workers, len(addresses)))
+        try:
+            pending = {pool.submit(lookup, address): address for address in addresses}
+            
+            while pending:
+                done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    address = pending.pop(future)
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        print(f"Error checking device {address}: {e}")
+                        yield self._fallback_device_info(address)
+                
+                now = time.monotonic()
+                for future, address in list(pending.items()):
+                    start = started_at.get(address)
+                    if start is not None and now - start > self.sdp_timeout:
+                        print(f"Service lookup timed out for {address}")
+                        del pending[future]
+                        yield self._fallback_device_info(address)
+        finally:
+            # Stuck lookups cannot be interrupted; let them finish in the background
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _has_audio_service(self, address: str, name: str, services: List[Dict]) -> bool:
+        """Decide audio capability from SDP records, falling back to the name."""
+        return self.classifier.classify(address, name, uuids=list(service_uuids(services))).is_audio
+    
+    def _build_device_info(self, address: str, name: str, has_audio: bool, service_count: int) -> Dict:
+        """Build the device record and record the sighting in the cache."""
+        rssi = self._get_device_rssi(address)
+        self.device_cache.mark_seen(address, rssi)
+        
+        device_info = {
+            'address': address,
+            'name': name or f"Unknown Device ({address})",
+            'has_audio': has_audio,
+            'services': service_count,
+            'rssi': rssi
+        }
+        self.discovered_devices[address] = device_info
+        return device_info
+    
+    def _cached_device_info(self, entry: Dict) -> Dict:
+        """Build a device record from a cache entry."""
+        history = entry.get('rssi_history') or [[0, None]]
+        address = entry['address']
+        return {
+            'address': address,
+            'name': entry.get('name') or f"Unknown Device ({address})",
+            'has_audio': entry.get('has_audio', False),
+            'services': entry.get('services', 0),
+            'rssi': history[-1][1]
+        }
+    
+    def _fallback_device_info(self, address: str) -> Dict:
+        """Device record used when the service lookup failed or timed out."""
+        name = self.device_cache.get_name(address)
+        return {
+            'address': address,
+            'name': name or f"Unknown Device ({address})",
+            'has_audio': True,  # Assume it might have audio
+            'services': 0,
+            'rssi': None
+        }
+    
+    def _get_device_rssi(self, address: str) -> Optional[int]:
+        """Smoothed signal strength from the link quality sampler, else BlueZ; None if unknown."""
+        rssi = self.link_quality.smoothed(address, RSSI)
+        if rssi is None:
+            rssi = self._read_bluez_rssi(address)
+        return None if rssi is None else int(round(rssi))
+    
+    @staticmethod
+    def _read_bluez_rssi(address: str) -> Optional[int]:
+        """RSSI BlueZ last saw for a device; Windows exposes none to us, so None there."""
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            result = subprocess.run(['bluetoothctl', 'info', address], capture_output=True, text=True, timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        match = BLUEZ_RSSI_PATTERN.search(result.stdout)
+        return int(match.group(1)) if match else None
+    
+    def _poll_link_quality(self, address: str) -> Optional[Dict[str, float]]:
+        """Link quality source for the sampler; send timing and drops are recorded by send_audio_data."""
+        rssi = self._read_bluez_rssi(address)
+        return None if rssi is None else {RSSI: rssi}
     
     def _get_mock_devices(self) -> List[Dict]:
         """Return mock devices for testing when Bluetooth discovery fails."""
@@ -110,8 +381,13 @@ class BluetoothManager:
             if success:
                 self.connected_devices[device_address] = {
                     'connected_at': time.time(),
-                    'status': 'connected'
+                    'status': 'connected',
+                    # 'rfcomm': audio goes over a pooled socket; 'system': Windows routes it
+                    'transport': 'rfcomm' if self.connection_pool.has_connection(device_address) else 'system'
                 }
+                self.known_store.record_connected(
+                    self.discovered_devices.get(device_address, {'address': device_address}))
+                self.link_quality.track(device_address, self._poll_link_quality)
                 print(f"Successfully connected to {device_address}")
                 return True
             else:
@@ -145,22 +421,21 @@ class BluetoothManager:
             }}
             """
             
-            result = subprocess.run(
-                ["powershell", "-Command", ps_command],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            output = get_powershell_helper().call(ps_command, timeout=30)
             
-            if "SUCCESS" in result.stdout:
+            if "SUCCESS" in output:
                 return True
             
             # Method 2: Fallback to Windows Bluetooth stack
             return self._fallback_bluetooth_connect(device_address)
             
-        except subprocess.TimeoutExpired:
-            print("PowerShell command timed out")
+        except HelperTimeout as e:
+            print(f"PowerShell command failed: {e}")
             return False
+        except HelperError as e:
+            # No usable helper (e.g. not on Windows); connect over RFCOMM instead
+            print(f"PowerShell command failed: {e}")
+            return self._fallback_bluetooth_connect(device_address)
         except Exception as e:
             print(f"Windows Bluetooth connection error: {e}")
             return self._fallback_bluetooth_connect(device_address)
@@ -168,23 +443,9 @@ class BluetoothManager:
     def _fallback_bluetooth_connect(self, device_address: str) -> bool:
         """Fallback method for Bluetooth connection."""
         try:
-            # Try using bluetooth library directly
-            sock = bluetooth.BluetoothSocket(bluetooth.RFCOMM)
-            sock.settimeout(10)
-            
-            # Try to connect on a common RFCOMM channel
-            for channel in [1, 2, 3, 4, 5]:
-                try:
-                    sock.connect((device_address, channel))
-                    sock.close()
-                    print(f"Connected to {device_address} on channel {channel}")
-                    return True
-                except bluetooth.BluetoothError:
-                    continue
-            
-            sock.close()
-            print(f"Could not connect to {device_address} on any channel")
-            return False
+            # Connect over RFCOMM; the pool keeps the socket open for sending
+            connection = self.connection_pool.acquire(device_address)
+            return connection is not None
             
         except Exception as e:
             print(f"Fallback connection failed: {e}")
@@ -193,32 +454,70 @@ class BluetoothManager:
     
     def disconnect_device(self, device_address: str) -> bool:
         """Disconnect from a Bluetooth device."""
+        if device_address not in self.connected_devices:
+            return False
+        if not self.disconnect_devices([device_address]).get(device_address, False):
+            print(f"Windows did not confirm disconnecting {device_address}; released it locally")
+        return True
+    
+    def disconnect_devices(self, device_addresses: List[str], timeout: float = 15.0) -> Dict[str, bool]:
+        """
+        Disconnect several devices with a single PowerShell request, so
+        device enumeration and helper round-trips are paid once, not per device.
+        Every device is released locally (socket closed, no longer connected)
+        whatever the outcome; the result says whether Windows confirmed
+        disconnecting each one.
+        """
+        device_addresses = [address for address in device_addresses if address in self.connected_devices]
+        if not device_addresses:
+            return {}
+        addresses_by_id = {address.replace(':', ''): address for address in device_addresses}
         try:
-            if device_address in self.connected_devices:
-                # Use Windows commands to disconnect
-                ps_command = f"""
-                $device = Get-PnpDevice | Where-Object {{$_.InstanceId -like "*{device_address.replace(':', '')}*"}}
+            # Use Windows commands to disconnect
+            instance_ids = ", ".join(f"'{instance_id}'" for instance_id in addresses_by_id)
+            ps_command = f"""
+            $pnpDevices = Get-PnpDevice
+            foreach ($id in @({instance_ids})) {{
+                $device = $pnpDevices | Where-Object {{$_.InstanceId -like "*$id*"}}
                 if ($device) {{
-                    Disable-PnpDevice -InstanceId $device.InstanceId -Confirm:$false
-                    Write-Output "DISCONNECTED"
+                    try {{
+                        Disable-PnpDevice -InstanceId $device.InstanceId -Confirm:$false -ErrorAction Stop
+                        Write-Output "DISCONNECTED $id"
+                    }} catch {{
+                        Write-Output "FAILED $id"
+                    }}
+                }} else {{
+                    Write-Output "DEVICE_NOT_FOUND $id"
                 }}
-                """
-                
-                result = subprocess.run(
-                    ["powershell", "-Command", ps_command],
-                    capture_output=True,
-                    text=True,
-                    timeout=15
-                )
-                
-                del self.connected_devices[device_address]
-                print(f"Disconnected from {device_address}")
-                return True
-            return False
+            }}
+            """
+            
+            output = get_powershell_helper().call(ps_command, timeout=timeout)
             
         except Exception as e:
-            print(f"Error disconnecting device {device_address}: {e}")
-            return False
+            print(f"Error disconnecting devices {', '.join(device_addresses)}: {e}")
+            output = ""
+        
+        results = {address: False for address in device_addresses}
+        for line in output.splitlines():
+            status, _, instance_id = line.strip().partition(' ')
+            if status == 'DISCONNECTED' and instance_id in addresses_by_id:
+                results[addresses_by_id[instance_id]] = True
+        
+        for device_address, disconnected in results.items():
+            self.connection_pool.close(device_address)
+            self.connected_devices.pop(device_address, None)
+            self.link_quality.untrack(device_address)
+            print(f"Disconnected from {device_address}" if disconnected
+                  else f"Released {device_address}; Windows did not confirm the disconnect")
+        return results
+    
+    def _disconnect_all_for_shutdown(self, timeout: float):
+        """Shutdown step: disconnect everything, failing the step if Windows did not confirm every device."""
+        results = self.disconnect_devices(list(self.connected_devices), timeout=timeout)
+        unconfirmed = [address for address, disconnected in results.items() if not disconnected]
+        if unconfirmed:
+            raise RuntimeError(f"Disconnect not confirmed for {', '.join(unconfirmed)}")
     
     def get_connected_devices(self) -> Dict:
         """Get list of currently connected devices."""
@@ -228,33 +527,81 @@ class BluetoothManager:
         """Check if a specific device is connected."""
         return device_address in self.connected_devices
     
+    def is_link_alive(self, device_address: str) -> bool:
+        """Check that a connected device's link is still up, not just marked connected."""
+        if device_address not in self.connected_devices:
+            return False
+        if self.connection_pool.has_connection(device_address) and \
+                not self.connection_pool.is_alive(device_address):
+            self._handle_link_lost(device_address, notify=False)
+            return False
+        return True
+    
+    def _handle_link_lost(self, device_address: str, notify: bool = True):
+        """Forget a device whose link dropped so it can be connected again."""
+        if self.connected_devices.pop(device_address, None) is None:
+            return
+        self.connection_pool.close(device_address)
+        self.link_quality.untrack(device_address)
+        print(f"Link to {device_address} lost")
+        if notify and self.link_lost_callback:
+            self.link_lost_callback(device_address)
+    
     def send_audio_data(self, device_address: str, audio_data: bytes) -> bool:
         """Send audio data to a connected device."""
         try:
-            if device_address not in self.connected_devices:
+            device = self.connected_devices.get(device_address)
+            if device is None:
                 return False
             
-            # This would typically involve A2DP protocol implementation
-            # For now, we'll simulate the audio sending
+            # RFCOMM devices always send through the pool, which reconnects a
+            # socket closed while idle instead of silently dropping the audio
+            if device.get('transport') == 'rfcomm':
+                started = time.perf_counter()
+                sent = self.connection_pool.send(device_address, audio_data)
+                self.link_quality.record(device_address, SEND_TIME, time.perf_counter() - started)
+                self.link_quality.record(device_address, SEND_DROPS, 0.0 if sent else 1.0)
+                if sent:
+                    return True
+                self._handle_link_lost(device_address)
+                return False
+            
+            # Windows plays to a 'system' device through its audio endpoint;
+            # there is nothing for us to send
             return True
             
         except Exception as e:
             print(f"Error sending audio to {device_address}: {e}")
             return False
     
-    def cleanup(self):
-        """Clean up Bluetooth connections and resources."""
-        try:
-            # Disconnect all connected devices
-            for device_address in list(self.connected_devices.keys()):
-                self.disconnect_device(device_address)
-            
-            self.connected_devices.clear()
-            self.discovered_devices.clear()
-            print("Bluetooth manager cleaned up")
-            
-        except Exception as e:
-            print(f"Error during Bluetooth cleanup: {e}")
+    def add_shutdown_steps(self, coordinator: ShutdownCoordinator, after: Iterable[str] = ()) -> List[str]:
+        """
+        Register this manager's shutdown work: one bulk disconnect, socket and
+        cache cleanup alongside it, and the helper process last.
+        Returns the names of the registered steps.
+        """
+        after = list(after)
+        # The bulk disconnect gets whatever time is left, less a margin for stopping the helper after it
+        disconnect = coordinator.add_step(
+            "bluetooth.disconnect",
+            lambda: self._disconnect_all_for_shutdown(
+                timeout=max(0.1, coordinator.remaining() - SHUTDOWN_HELPER_MARGIN)),
+            after)
+        sockets = coordinator.add_step("bluetooth.sockets", self.connection_pool.close_all, after)
+        cache = coordinator.add_step("bluetooth.cache", self.device_cache.save, after)
+        helper = coordinator.add_step("bluetooth.helper", shutdown_helpers, [disconnect])
+        return [disconnect, sockets, cache, helper]
+    
+    def cleanup(self, deadline: float = 5.0) -> ShutdownReport:
+        """Clean up Bluetooth connections and resources within `deadline` seconds."""
+        coordinator = ShutdownCoordinator(deadline)
+        self.add_shutdown_steps(coordinator)
+        report = coordinator.run()
+        
+        self.connected_devices.clear()
+        self.discovered_devices.clear()
+        print("Bluetooth manager cleaned up")
+        return report
 
 # Additional Windows-specific Bluetooth utilities
 class WindowsBluetoothUtils:
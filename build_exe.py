@@ -49,6 +49,11 @@ a = Analysis(
         'time',
         'os',
         'sys',
+        # Loaded lazily with lazy_import(), so not found by import analysis
+        'pygame',
+        'numpy',
+        'mutagen',
+        'bluetooth',
     ],
     hookspath=[],
     hooksconfig={},
@@ -87,6 +87,7 @@ hiddenimports = [
     'socket',
     'struct',
     'uuid',
+    'latency_profiles',
 ]
 
 # Analysis phase
@@ -556,6 +557,19 @@ if __name__ == "__main__":
         # Copy supporting files
         support_files = [
             "enhanced_bluetooth.py",
+            "helper_process.py",
+            "device_registry.py",
+            "connection_scheduler.py",
+            "shutdown_coordinator.py",
+            "known_device_store.py",
+            "capability_probe.py",
+            "startup_profiler.py",
+            "device_farm.py",
+            "async_bluetooth.py",
+            "scatter_send.py",
+            "device_classifier.py",
+            "link_quality.py",
+            "latency_profiles.py",
             "audio_capture.py",
             "README_MUSIC_HOST.md"
         ]
@@ -70,6 +70,7 @@ analysis = Analysis(
         'ctypes',
         'ctypes.wintypes',
         'winreg',
+        'latency_profiles',
     ],
     hookspath=[],
     hooksconfig={},
@@ -316,6 +317,19 @@ SectionEnd
             "music_host_main.py",
             "audio_capture.py", 
             "enhanced_bluetooth.py",
+            "helper_process.py",
+            "device_registry.py",
+            "connection_scheduler.py",
+            "shutdown_coordinator.py",
+            "known_device_store.py",
+            "capability_probe.py",
+            "startup_profiler.py",
+            "device_farm.py",
+            "async_bluetooth.py",
+            "scatter_send.py",
+            "device_classifier.py",
+            "link_quality.py",
+            "latency_profiles.py",
             "README.md"
         ]
         
@@ -0,0 +1,135 @@
+"""
+Capability Probe Module
+Checks slow backend capabilities (such as whether the Windows Bluetooth
+service is running) on a background thread so constructing a manager never
+waits for them. Results are cached per probe name for a TTL, so managers
+created in the same process within that window reuse the answer.
+"""
+
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# name -> (result, monotonic time it was measured)
+_result_cache: Dict[str, Tuple[bool, float]] = {}
+_cache_lock = threading.Lock()
+
+
+class CapabilityProbe:
+    """
+    A check that runs at most once per TTL. State is 'probing' until the
+    first check finishes, then 'available' or 'unavailable'; a re-check
+    keeps the previous result until the new one is known. Listeners are
+    called after every check, and immediately if a result already exists.
+    """
+
+    def __init__(self, name: str, check: Callable[[], bool], ttl: float = 300.0):
+        self.name = name
+        self.check = check
+        self.ttl = ttl
+
+        self.result: Optional[bool] = None
+        self.checked_at: Optional[float] = None
+        self.duration: Optional[float] = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[bool], None]] = []
+
+    @property
+    def state(self) -> str:
+        if self.result is None:
+            return 'probing'
+        return 'available' if self.result else 'unavailable'
+
+    def start(self, force: bool = False) -> 'CapabilityProbe':
+        """Start the check in the background unless a fresh result is cached."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return self
+            with _cache_lock:
+                cached = None if force else _result_cache.get(self.name)
+            if cached and time.monotonic() - cached[1] <= self.ttl:
+                self.result, self.checked_at = cached
+                self.duration = 0.0
+                self._done.set()
+                listeners = list(self._listeners)
+            else:
+                self._thread = threading.Thread(target=self._run, daemon=True, name=f"probe-{self.name}")
+                self._thread.start()
+                return self
+        self._notify_all(listeners, cached[0])
+        return self
+
+    def _run(self):
+        started = time.monotonic()
+        try:
+            result = bool(self.check())
+        except Exception as e:
+            print(f"Capability probe {self.name} failed: {e}")
+            result = False
+        self.duration = time.monotonic() - started
+        self.checked_at = time.monotonic()
+        with _cache_lock:
+            _result_cache[self.name] = (result, self.checked_at)
+        with self._lock:
+            self.result = result
+            self._done.set()
+            listeners = list(self._listeners)
+        self._notify_all(listeners, result)
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[bool]:
+        """
+        Block until a result is known; None if it is still probing after
+        `timeout`. During a re-check the previous result is returned at once.
+        """
+        if self.result is None and self._thread is None:
+            self.start()
+        self._done.wait(timeout)
+        return self.result
+
+    def add_listener(self, listener: Callable[[bool], None]):
+        """Call `listener(result)` whenever a check finishes (now, if one already has)."""
+        with self._lock:
+            self._listeners.append(listener)
+            result = self.result
+        if result is not None:
+            self._notify(listener, result)
+
+    def _notify_all(self, listeners: List[Callable[[bool], None]], result: bool):
+        for listener in listeners:
+            self._notify(listener, result)
+
+    def _notify(self, listener: Callable[[bool], None], result: bool):
+        try:
+            listener(result)
+        except Exception as e:
+            print(f"Capability probe {self.name} listener error: {e}")
+
+
+def bluetooth_service_running() -> bool:
+    """Whether the Windows Bluetooth support service (bthserv) is running."""
+    result = subprocess.run(['sc', 'query', 'bthserv'], capture_output=True, text=True, timeout=5)
+    return 'RUNNING' in result.stdout
+
+
+def clear_probe_cache(name: Optional[str] = None):
+    """Forget cached results so the next start() re-checks (e.g. after the user enables Bluetooth)."""
+    with _cache_lock:
+        if name is None:
+            _result_cache.clear()
+        else:
+            _result_cache.pop(name, None)
+
+
+# Show construction cost versus probe time
+if __name__ == "__main__":
+    started = time.perf_counter()
+    probe = CapabilityProbe("bluetooth_service", bluetooth_service_running).start()
+    print(f"Probe started in {(time.perf_counter() - started) * 1000:.2f} ms, state: {probe.state}")
+    probe.add_listener(lambda result: print(f"Bluetooth service running: {result}"))
+    probe.wait(10)
+    print(f"State: {probe.state} after {probe.duration:.2f}s")
+    again = CapabilityProbe("bluetooth_service", bluetooth_service_running).start()
+    print(f"Second probe state (cached): {again.state}")
@@ -0,0 +1,260 @@
+"""
+Connection Pool Module
+Keeps live RFCOMM sockets per device and remembers which channel worked,
+so sends reuse a warm connection and reconnects skip the channel sweep.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Optional, Sequence
+
+from startup_profiler import lazy_import
+
+bluetooth = lazy_import("bluetooth")
+
+
+class PooledConnection:
+    """A connected socket plus the bookkeeping the pool needs to reuse it."""
+
+    def __init__(self, address: str, channel: int, sock):
+        self.address = address
+        self.channel = channel
+        self.sock = sock
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.bytes_sent = 0
+        self.lock = threading.Lock()  # Serializes writes to the socket
+
+    def send(self, data: bytes):
+        with self.lock:
+            self.sock.sendall(data)
+            self.bytes_sent += len(data)
+            self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+
+
+class BluetoothConnectionPool:
+    """
+    Per-device pool of RFCOMM connections. On first contact every candidate
+    channel is probed in parallel and the first to connect wins; the channel
+    is remembered (and persisted through the device cache if one is given)
+    so later connects try it directly.
+    """
+
+    def __init__(self, socket_factory: Optional[Callable] = None, channels: Sequence[int] = (1, 2, 3, 4, 5),
+                 connect_timeout: float = 10.0, idle_timeout: float = 120.0, device_cache=None):
+        self.socket_factory = socket_factory or (lambda: bluetooth.BluetoothSocket(bluetooth.RFCOMM))
+        self.channels = tuple(channels)
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout  # Connections unused this long are closed
+        self.device_cache = device_cache
+
+        self.connections: Dict[str, PooledConnection] = {}
+        self.known_channels: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self._address_locks: Dict[str, threading.Lock] = {}
+
+        self._maintenance_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        # Called with the address when maintenance finds a socket detached from its peer
+        self.connection_lost_callback: Optional[Callable[[str], None]] = None
+
+        # Statistics
+        self.stats = {'connects': 0, 'reuses': 0, 'probe_sweeps': 0, 'evictions': 0, 'send_errors': 0}
+
+    @staticmethod
+    def _key(address: str) -> str:
+        return address.upper()
+
+    def _address_lock(self, address: str) -> threading.Lock:
+        with self.lock:
+            return self._address_locks.setdefault(self._key(address), threading.Lock())
+
+    def get_known_channel(self, address: str) -> Optional[int]:
+        """Channel that last worked for a device, if any."""
+        channel = self.known_channels.get(self._key(address))
+        if channel is None and self.device_cache:
+            channel = self.device_cache.get_channel(address)
+        return channel
+
+    def _remember_channel(self, address: str, channel: int):
+        self.known_channels[self._key(address)] = channel
+        if self.device_cache:
+            self.device_cache.update_channel(address, channel)
+
+    def has_connection(self, address: str) -> bool:
+        with self.lock:
+            return self._key(address) in self.connections
+
+    def acquire(self, address: str) -> Optional[PooledConnection]:
+        """Return a live connection to a device, connecting if needed."""
+        with self._address_lock(address):
+            with self.lock:
+                connection = self.connections.get(self._key(address))
+            if connection is not None:
+                if self.is_healthy(connection):
+                    self.stats['reuses'] += 1
+                    return connection
+                self.close(address)
+
+            connection = self._connect(address)
+            if connection is not None:
+                with self.lock:
+                    self.connections[self._key(address)] = connection
+                self.stats['connects'] += 1
+            return connection
+
+    def _open(self, address: str, channel: int):
+        """Connect a new socket on one channel; returns it or None."""
+        sock = self.socket_factory()
+        try:
+            sock.settimeout(self.connect_timeout)
+            sock.connect((address, channel))
+            return sock
+        except (bluetooth.BluetoothError, OSError):
+            try:
+                sock.close()
+            except Exception:
+                pass
+            return None
+
+    def _connect(self, address: str) -> Optional[PooledConnection]:
+        known_channel = self.get_known_channel(address)
+        if known_channel is not None:
+            sock = self._open(address, known_channel)
+            if sock is not None:
+                return PooledConnection(address, known_channel, sock)
+            print(f"Remembered channel {known_channel} failed for {address}, probing")
+
+        candidates = [channel for channel in self.channels if channel != known_channel]
+        return self._probe_channels(address, candidates)
+
+    def _probe_channels(self, address: str, channels: Sequence[int]) -> Optional[PooledConnection]:
+        """Try all channels at once and keep the first that connects."""
+        if not channels:
+            return None
+        self.stats['probe_sweeps'] += 1
+
+        winner: Optional[PooledConnection] = None
+        executor = ThreadPoolExecutor(max_workers=len(channels))
+        futures = {executor.submit(self._open, address, channel): channel for channel in channels}
+        try:
+            for future in as_completed(futures):
+                sock = future.result()
+                if sock is not None:
+                    winner = PooledConnection(address, futures[future], sock)
+                    del futures[future]
+                    break
+        finally:
+            # Return without waiting for slower channels; close whatever they connect later
+            for future in futures:
+                future.add_done_callback(self._close_late_socket)
+            executor.shutdown(wait=False)
+
+        if winner is None:
+            print(f"Could not connect to {address} on any channel")
+            return None
+        self._remember_channel(address, winner.channel)
+        print(f"Connected to {address} on channel {winner.channel}")
+        return winner
+
+    @staticmethod
+    def _close_late_socket(future):
+        sock = future.result()
+        if sock is not None:
+            try:
+                sock.close()
+            except Exception:
+                pass
+
+    def send(self, address: str, data: bytes) -> bool:
+        """Send over the device's pooled connection, reconnecting once on failure."""
+        for attempt in range(2):
+            connection = self.acquire(address)
+            if connection is None:
+                return False
+            try:
+                connection.send(data)
+                return True
+            except (bluetooth.BluetoothError, OSError) as e:
+                self.stats['send_errors'] += 1
+                print(f"Send to {address} failed ({e}), reconnecting")
+                self.close(address)
+        return False
+
+    def is_healthy(self, connection: PooledConnection) -> bool:
+        """A connection is healthy if it is still attached to its peer and not idle too long."""
+        if time.monotonic() - connection.last_used > self.idle_timeout:
+            return False
+        return self._is_attached(connection)
+
+    @staticmethod
+    def _is_attached(connection: PooledConnection) -> bool:
+        try:
+            connection.sock.getpeername()
+            return True
+        except Exception:
+            return False
+
+    def is_alive(self, address: str) -> bool:
+        """Whether the device's pooled socket is still attached to its peer (idle or not)."""
+        with self.lock:
+            connection = self.connections.get(self._key(address))
+        return connection is not None and self._is_attached(connection)
+
+    def close(self, address: str):
+        """Close and forget a device's connection; the remembered channel is kept."""
+        with self.lock:
+            connection = self.connections.pop(self._key(address), None)
+        if connection:
+            connection.close()
+
+    def evict_idle(self) -> int:
+        """Close connections that are idle or no longer healthy. Returns how many were closed."""
+        with self.lock:
+            connections = list(self.connections.values())
+        evicted = 0
+        for connection in connections:
+            if not self.is_healthy(connection):
+                attached = self._is_attached(connection)
+                self.close(connection.address)
+                evicted += 1
+                if not attached and self.connection_lost_callback:
+                    self.connection_lost_callback(connection.address)
+        self.stats['evictions'] += evicted
+        return evicted
+
+    def start_maintenance(self, interval: float = 15.0):
+        """Periodically health-check and evict idle connections in the background."""
+        if self._maintenance_thread and self._maintenance_thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def maintenance_loop():
+            while not self._stop_event.wait(interval):
+                self.evict_idle()
+
+        self._maintenance_thread = threading.Thread(target=maintenance_loop, daemon=True)
+        self._maintenance_thread.start()
+
+    def close_all(self):
+        """Stop maintenance and close every pooled connection."""
+        self._stop_event.set()
+        with self.lock:
+            connections = list(self.connections.values())
+            self.connections.clear()
+        for connection in connections:
+            connection.close()
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            open_connections = {address: {'channel': c.channel, 'bytes_sent': c.bytes_sent}
+                                for address, c in self.connections.items()}
+        return dict(self.stats, connections=open_connections)
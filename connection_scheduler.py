@@ -0,0 +1,177 @@
+"""
+Connection Scheduler Module
+Runs device connects on a bounded pool of workers so a burst of requests
+does not flood the radio. Requests for an address already queued or
+connecting share one future, and lower priority numbers run first.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+
+class _ConnectJob:
+    """One pending or running connect, shared by duplicate requests."""
+
+    __slots__ = ('key', 'task', 'priority', 'future', 'submitted_at', 'started')
+
+    def __init__(self, key: str, task: Callable[[], bool], priority: int):
+        self.key = key
+        self.task = task
+        self.priority = priority
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+        self.started = False
+
+
+class ConnectionScheduler:
+    """
+    Priority queue of connect tasks served by at most `max_concurrent`
+    worker threads. Workers are started on demand and exit when idle.
+    """
+
+    def __init__(self, max_concurrent: int = 2, idle_timeout: float = 5.0):
+        self.max_concurrent = max_concurrent
+        self.idle_timeout = idle_timeout  # Idle workers exit after this long
+
+        self._queue: List = []  # Heap of (priority, sequence, job)
+        self._sequence = itertools.count()
+        self._jobs: Dict[str, _ConnectJob] = {}  # Queued or running, by address
+        self._condition = threading.Condition()
+        self._workers = 0
+        self._idle_workers = 0
+        self._running = 0
+        self._shutdown = False
+
+        self.metrics = {
+            'submitted': 0,
+            'deduplicated': 0,
+            'completed': 0,
+            'failed': 0,
+            'total_wait': 0.0,
+            'total_duration': 0.0
+        }
+
+    @staticmethod
+    def _key(address: str) -> str:
+        return address.upper()
+
+    def submit(self, address: str, task: Callable[[], bool], priority: int = 1) -> Future:
+        """
+        Queue a connect for an address. If one is already queued or running
+        the existing future is returned; a more urgent duplicate raises the
+        queued job's priority.
+        """
+        key = self._key(address)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("Connection scheduler is shut down")
+
+            job = self._jobs.get(key)
+            if job is not None:
+                self.metrics['deduplicated'] += 1
+                if not job.started and priority < job.priority:
+                    # The old heap entry becomes stale and is skipped by workers
+                    job.priority = priority
+                    heapq.heappush(self._queue, (priority, next(self._sequence), job))
+                    self._condition.notify()
+                return job.future
+
+            job = _ConnectJob(key, task, priority)
+            self._jobs[key] = job
+            heapq.heappush(self._queue, (priority, next(self._sequence), job))
+            self.metrics['submitted'] += 1
+
+            if self._idle_workers:
+                self._condition.notify()
+            elif self._workers < self.max_concurrent:
+                self._workers += 1
+                threading.Thread(target=self._worker_loop, daemon=True).start()
+            return job.future
+
+    def _next_job(self) -> Optional[_ConnectJob]:
+        """Pop the most urgent job that has not started; None if the worker should exit."""
+        with self._condition:
+            while True:
+                while self._queue:
+                    priority, _, job = heapq.heappop(self._queue)
+                    if not job.started and priority == job.priority:
+                        job.started = True
+                        self._running += 1
+                        return job
+                if self._shutdown:
+                    break
+                self._idle_workers += 1
+                notified = self._condition.wait(self.idle_timeout)
+                self._idle_workers -= 1
+                if not notified and not self._queue:
+                    break
+            self._workers -= 1
+            return None
+
+    def _worker_loop(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            started_at = time.monotonic()
+            try:
+                success = bool(job.task())
+                error = None
+            except Exception as e:
+                success = False
+                error = e
+            duration = time.monotonic() - started_at
+
+            with self._condition:
+                self._running -= 1
+                self._jobs.pop(job.key, None)
+                self.metrics['completed' if success else 'failed'] += 1
+                self.metrics['total_wait'] += started_at - job.submitted_at
+                self.metrics['total_duration'] += duration
+
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(success)
+
+    def is_pending(self, address: str) -> bool:
+        """Whether a connect for the address is queued or running."""
+        with self._condition:
+            return self._key(address) in self._jobs
+
+    def get_metrics(self) -> Dict:
+        with self._condition:
+            finished = self.metrics['completed'] + self.metrics['failed']
+            return {
+                'queued': len(self._jobs) - self._running,
+                'in_flight': self._running,
+                'workers': self._workers,
+                'max_concurrent': self.max_concurrent,
+                'submitted': self.metrics['submitted'],
+                'deduplicated': self.metrics['deduplicated'],
+                'completed': self.metrics['completed'],
+                'failed': self.metrics['failed'],
+                'avg_wait': self.metrics['total_wait'] / finished if finished else 0.0,
+                'avg_duration': self.metrics['total_duration'] / finished if finished else 0.0
+            }
+
+    def shutdown(self, cancel_pending: bool = True):
+        """Stop accepting work; queued connects are cancelled unless told otherwise."""
+        with self._condition:
+            self._shutdown = True
+            cancelled = []
+            if cancel_pending:
+                while self._queue:
+                    _, _, job = heapq.heappop(self._queue)
+                    if not job.started:
+                        job.started = True
+                        self._jobs.pop(job.key, None)
+                        cancelled.append(job)
+            self._condition.notify_all()
+        for job in cancelled:
+            job.future.cancel()
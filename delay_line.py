@@ -0,0 +1,134 @@
+"""
+Delay Line Module
+Sample-accurate per-device delay lines backed by ring buffers.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+from startup_profiler import lazy_import
+
+np = lazy_import("numpy")
+
+
+class DelayLine:
+    """
+    Delays a multichannel stream by an exact number of frames. The delay can
+    change while streaming; the output crossfades from the old read position
+    to the new one so the jump does not click.
+    """
+
+    def __init__(self, channels: int = 2, max_delay_frames: int = 44100,
+                 max_chunk_frames: int = 8192, crossfade_frames: int = 256, delay_frames: int = 0):
+        self.channels = channels
+        self.max_delay_frames = max_delay_frames
+        self.max_chunk_frames = max_chunk_frames
+        self.crossfade_frames = crossfade_frames
+        self.capacity = max_delay_frames + max_chunk_frames
+
+        self.buffer = np.zeros((self.capacity, channels), dtype=np.float32)
+        self.write_pos = 0
+        self.delay_frames = max(0, min(int(delay_frames), max_delay_frames))
+
+        # Active crossfade between two read positions
+        self._old_delay = self.delay_frames
+        self._fade_done = 0
+        self._fade_length = 0
+        self.lock = threading.Lock()
+
+    def set_delay(self, frames: int, crossfade_frames: Optional[int] = None):
+        """Change the delay; the change is crossfaded over `crossfade_frames` frames."""
+        frames = max(0, min(int(frames), self.max_delay_frames))
+        with self.lock:
+            if frames == self.delay_frames:
+                return
+            fade = self.crossfade_frames if crossfade_frames is None else crossfade_frames
+            self._old_delay = self.delay_frames
+            self.delay_frames = frames
+            self._fade_done = 0
+            self._fade_length = max(0, fade)
+
+    def set_delay_seconds(self, seconds: float, sample_rate: int = 44100):
+        """Change the delay, given in seconds."""
+        self.set_delay(int(round(seconds * sample_rate)))
+
+    def _read(self, start: int, frames: int, delay: int) -> np.ndarray:
+        indexes = (start + np.arange(frames) - delay) % self.capacity
+        return self.buffer[indexes]
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """Write a chunk into the line and return the delayed chunk of equal length."""
+        if len(chunk) > self.max_chunk_frames:
+            return np.concatenate([self.process(chunk[i:i + self.max_chunk_frames])
+                                   for i in range(0, len(chunk), self.max_chunk_frames)])
+
+        with self.lock:
+            frames = len(chunk)
+            start = self.write_pos
+            indexes = (start + np.arange(frames)) % self.capacity
+            self.buffer[indexes] = chunk
+            self.write_pos = (start + frames) % self.capacity
+
+            output = self._read(start, frames, self.delay_frames)
+            if self._fade_done < self._fade_length:
+                ramp = (self._fade_done + np.arange(frames, dtype=np.float32) + 1) / self._fade_length
+                ramp = np.minimum(ramp, 1.0)[:, None]
+                old_output = self._read(start, frames, self._old_delay)
+                output = old_output + (output - old_output) * ramp
+                self._fade_done += frames
+            return output
+
+    def reset(self):
+        """Clear buffered audio."""
+        with self.lock:
+            self.buffer.fill(0)
+            self._fade_done = self._fade_length
+
+
+class DriftResampler:
+    """
+    Streaming linear-interpolation resampler for clock drift correction.
+    A ratio above 1.0 consumes input faster than real time (fewer output
+    frames), which pulls a device that is falling behind back into line.
+    """
+
+    def __init__(self, channels: int = 2, ratio: float = 1.0):
+        self.channels = channels
+        self.ratio = ratio
+        self._phase = 0.0  # Fractional read position past the previous chunk's last frame
+        self._last = np.zeros((1, channels), dtype=np.float32)
+        self.frames_in = 0
+        self.frames_out = 0
+
+    def advance_seconds(self, sample_rate: int = 44100) -> float:
+        """How far ahead of the source timeline the output has been pulled."""
+        return (self.frames_in - self.frames_out) / sample_rate
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """Resample one chunk; the read phase carries over between chunks."""
+        if len(chunk) == 0:
+            return chunk
+        self.frames_in += len(chunk)
+        if self.ratio == 1.0 and self._phase == 0.0:
+            self._last = chunk[-1:]
+            self.frames_out += len(chunk)
+            return chunk
+
+        # Index 0 is the previous chunk's last frame, so interpolation spans chunk edges
+        source = np.concatenate([self._last, chunk])
+        start = 1.0 + self._phase
+        count = int(np.floor((len(chunk) - start) / self.ratio)) + 1 if start <= len(chunk) else 0
+        positions = start + np.arange(count) * self.ratio
+
+        base = np.floor(positions).astype(np.int64)
+        frac = (positions - base)[:, None].astype(np.float32)
+        upper = np.minimum(base + 1, len(source) - 1)
+        output = source[base] + (source[upper] - source[base]) * frac
+
+        next_position = start + count * self.ratio
+        self._phase = next_position - len(chunk) - 1.0
+        self._last = chunk[-1:]
+        self.frames_out += count
+        return output.astype(np.float32)
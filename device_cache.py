@@ -0,0 +1,124 @@
+"""
+Device Cache Module
+Persistent TTL cache of Bluetooth remote names, service records, audio
+capability and RSSI history, keyed by device address.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class DeviceCache:
+    """Per-address cache with separate TTLs for names, services and presence."""
+
+    def __init__(self, filename: str = "device_cache.json", name_ttl: float = 7 * 24 * 3600,
+                 services_ttl: float = 24 * 3600, presence_ttl: float = 15 * 60,
+                 rssi_history_size: int = 32):
+        self.filename = filename
+        self.name_ttl = name_ttl
+        self.services_ttl = services_ttl
+        self.presence_ttl = presence_ttl  # How long after last sighting a device counts as nearby
+        self.rssi_history_size = rssi_history_size
+        self.entries: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def _key(address: str) -> str:
+        return address.upper()
+
+    def load(self):
+        """Load cached entries from disk."""
+        try:
+            if os.path.exists(self.filename):
+                with open(self.filename, 'r') as f:
+                    self.entries = json.load(f)
+        except Exception as e:
+            print(f"Error loading device cache: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Write cached entries to disk atomically."""
+        with self.lock:
+            data = json.dumps(self.entries)
+        try:
+            temp_filename = self.filename + ".tmp"
+            with open(temp_filename, 'w') as f:
+                f.write(data)
+            os.replace(temp_filename, self.filename)
+        except Exception as e:
+            print(f"Error saving device cache: {e}")
+
+    def _entry(self, address: str) -> Dict:
+        return self.entries.setdefault(self._key(address), {'address': address})
+
+    def get(self, address: str) -> Optional[Dict]:
+        """Return a copy of the cached entry for an address."""
+        with self.lock:
+            entry = self.entries.get(self._key(address))
+            return dict(entry) if entry else None
+
+    @staticmethod
+    def _is_fresh(entry: Optional[Dict], field: str, ttl: float) -> bool:
+        return bool(entry) and time.time() - entry.get(field, 0) <= ttl
+
+    def get_name(self, address: str) -> Optional[str]:
+        """Cached remote name if still within its TTL."""
+        entry = self.get(address)
+        return entry.get('name') if self._is_fresh(entry, 'name_at', self.name_ttl) else None
+
+    def get_services(self, address: str) -> Optional[Dict]:
+        """Cached service summary ({'services', 'has_audio'}) if still within its TTL."""
+        entry = self.get(address)
+        if not self._is_fresh(entry, 'services_at', self.services_ttl):
+            return None
+        return {'services': entry.get('services', 0), 'has_audio': entry.get('has_audio', False)}
+
+    def update_name(self, address: str, name: str):
+        with self.lock:
+            entry = self._entry(address)
+            entry['name'] = name
+            entry['name_at'] = time.time()
+
+    def update_services(self, address: str, service_count: int, has_audio: bool):
+        with self.lock:
+            entry = self._entry(address)
+            entry['services'] = service_count
+            entry['has_audio'] = has_audio
+            entry['services_at'] = time.time()
+
+    def get_channel(self, address: str) -> Optional[int]:
+        """RFCOMM channel that last connected; kept until it fails."""
+        entry = self.get(address)
+        return entry.get('rfcomm_channel') if entry else None
+
+    def update_channel(self, address: str, channel: int):
+        with self.lock:
+            self._entry(address)['rfcomm_channel'] = channel
+
+    def mark_seen(self, address: str, rssi: Optional[int] = None):
+        """Record a sighting, with its signal strength if known."""
+        with self.lock:
+            entry = self._entry(address)
+            now = time.time()
+            entry['last_seen'] = now
+            if rssi is not None:
+                history = entry.setdefault('rssi_history', [])
+                history.append([now, rssi])
+                del history[:-self.rssi_history_size]
+
+    def get_nearby(self) -> List[Dict]:
+        """Entries seen within presence_ttl whose services are still fresh."""
+        now = time.time()
+        with self.lock:
+            return [dict(entry) for entry in self.entries.values()
+                    if now - entry.get('last_seen', 0) <= self.presence_ttl
+                    and now - entry.get('services_at', 0) <= self.services_ttl]
+
+    def clear(self):
+        """Forget every cached device."""
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,180 @@
+"""
+Device Classifier Module
+Decides whether a Bluetooth device is an audio sink. The Class of Device
+reported during inquiry is checked first, then advertised service UUIDs,
+and only then the name against one precompiled keyword pattern. Results are
+cached per address, so repeat lookups are a dictionary hit and known
+devices never need another SDP query.
+"""
+
+import re
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+# Class of Device: bits 8-12 major class, bits 2-7 minor class, 13-23 services
+MAJOR_CLASSES = {
+    0x00: 'misc', 0x01: 'computer', 0x02: 'phone', 0x03: 'network',
+    0x04: 'audio_video', 0x05: 'peripheral', 0x06: 'imaging', 0x07: 'wearable',
+    0x08: 'toy', 0x09: 'health', 0x1F: 'uncategorized'
+}
+MAJOR_AUDIO_VIDEO = 0x04
+
+# Audio/video minor classes that play audio
+AUDIO_MINOR_CLASSES = {
+    0x01: 'headset', 0x02: 'handsfree', 0x05: 'speaker', 0x06: 'headphones',
+    0x07: 'portable_audio', 0x08: 'car_audio', 0x0A: 'hifi_audio', 0x0F: 'display_speaker'
+}
+
+# 16-bit service class UUIDs of audio sink profiles
+AUDIO_SINK_UUIDS = {
+    0x110B: 'speaker',     # Audio Sink
+    0x110D: 'speaker',     # Advanced Audio Distribution
+    0x1108: 'headset',     # Headset
+    0x1131: 'headset',     # Headset - HS
+    0x111E: 'handsfree'    # Handsfree
+}
+
+# Every keyword either manager used to scan for, as a single pattern
+AUDIO_NAME_PATTERN = re.compile(
+    r"speaker|headphone|headset|earphone|earbud|airpod|beats|bose|sony|jbl|audio|sound|music",
+    re.IGNORECASE
+)
+
+_BASE_UUID_PATTERN = re.compile(r"^(?:0x)?([0-9a-f]{4})$|^0000([0-9a-f]{4})-0000-1000-8000-00805f9b34fb$",
+                                re.IGNORECASE)
+
+
+class DeviceClass:
+    """Classification of one device and the evidence it came from."""
+
+    __slots__ = ('is_audio', 'kind', 'source')
+
+    def __init__(self, is_audio: bool, kind: str, source: str):
+        self.is_audio = is_audio
+        self.kind = kind  # e.g. 'speaker', 'headphones', 'phone', 'audio', 'unknown'
+        self.source = source  # 'class_of_device', 'service_uuid' or 'name'
+
+    def __repr__(self):
+        return f"DeviceClass({self.kind}, audio={self.is_audio}, from {self.source})"
+
+
+def classify_class_of_device(class_of_device: Optional[int]) -> Optional[DeviceClass]:
+    """Classification from the Class of Device, or None if it does not tell."""
+    if not class_of_device:
+        return None
+    major = (class_of_device >> 8) & 0x1F
+    if major == MAJOR_AUDIO_VIDEO:
+        minor = (class_of_device >> 2) & 0x3F
+        kind = AUDIO_MINOR_CLASSES.get(minor)
+        if kind is not None:
+            return DeviceClass(True, kind, 'class_of_device')
+        return DeviceClass(False, 'video', 'class_of_device')
+    kind = MAJOR_CLASSES.get(major)
+    if kind is None or kind in ('misc', 'uncategorized'):
+        return None
+    return DeviceClass(False, kind, 'class_of_device')
+
+
+def short_uuid(uuid: str) -> Optional[int]:
+    """The 16-bit form of a Bluetooth base UUID ('110B' or the full 128-bit string)."""
+    match = _BASE_UUID_PATTERN.match(uuid.strip())
+    if match is None:
+        return None
+    return int(match.group(1) or match.group(2), 16)
+
+
+def classify_service_uuids(uuids: Iterable[str]) -> Optional[DeviceClass]:
+    """Classification from service class UUIDs, or None if none is an audio sink profile."""
+    for uuid in uuids:
+        kind = AUDIO_SINK_UUIDS.get(short_uuid(str(uuid)))
+        if kind is not None:
+            return DeviceClass(True, kind, 'service_uuid')
+    return None
+
+
+def service_uuids(services: Iterable[Dict]) -> Iterable[str]:
+    """Service class UUIDs of PyBluez SDP records."""
+    for service in services:
+        yield from service.get('service-classes') or ()
+        if service.get('service-id'):
+            yield service['service-id']
+
+
+def classify_name(name: str, device_type: str = "") -> DeviceClass:
+    """Fallback classification from the name and type strings."""
+    if AUDIO_NAME_PATTERN.search(name or '') or AUDIO_NAME_PATTERN.search(device_type or ''):
+        return DeviceClass(True, 'audio', 'name')
+    return DeviceClass(False, 'unknown', 'name')
+
+
+class DeviceClassifier:
+    """
+    Classifies devices and caches the result by address. A result based on
+    the class of device or service UUIDs is kept for good; a name-based one
+    is redone when the name changes or better evidence arrives.
+    """
+
+    def __init__(self):
+        self._cache: Dict[str, Tuple[DeviceClass, str, str]] = {}  # address -> (class, name, type)
+        self._lock = threading.Lock()
+
+    def cached(self, address: str) -> Optional[DeviceClass]:
+        """The cached classification of an address, if it did not come from the name alone."""
+        entry = self._cache.get(address.upper())
+        if entry is None or entry[0].source == 'name':
+            return None
+        return entry[0]
+
+    def classify(self, address: str, name: str = "", device_type: str = "",
+                 class_of_device: Optional[int] = None,
+                 uuids: Optional[Iterable[str]] = None) -> DeviceClass:
+        key = address.upper()
+        entry = self._cache.get(key)
+        if entry is not None:
+            device_class, cached_name, cached_type = entry
+            if device_class.source != 'name':
+                return device_class
+            if class_of_device is None and uuids is None and (name, device_type) == (cached_name, cached_type):
+                return device_class
+
+        device_class = (classify_class_of_device(class_of_device)
+                        or (classify_service_uuids(uuids) if uuids is not None else None)
+                        or classify_name(name, device_type))
+        with self._lock:
+            self._cache[key] = (device_class, name, device_type)
+        return device_class
+
+    def forget(self, address: str):
+        with self._lock:
+            self._cache.pop(address.upper(), None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_classifier: Optional[DeviceClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_device_classifier() -> DeviceClassifier:
+    """The classifier shared by every manager in this process."""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = DeviceClassifier()
+        return _classifier
+
+
+# Classify a few sample devices
+if __name__ == "__main__":
+    classifier = get_device_classifier()
+    samples = [
+        ("AA:00:00:00:00:01", "Living Room", "", 0x240414, None),
+        ("AA:00:00:00:00:02", "Sony Xperia", "", 0x5A020C, None),
+        ("AA:00:00:00:00:03", "Unnamed", "", None, ["0000110b-0000-1000-8000-00805f9b34fb"]),
+        ("AA:00:00:00:00:04", "JBL Flip 5", "Speaker", None, None),
+        ("AA:00:00:00:00:05", "Keyboard", "", None, None),
+    ]
+    for address, name, device_type, class_of_device, uuids in samples:
+        print(f"{name:12s} {classifier.classify(address, name, device_type, class_of_device, uuids)}")
@@ -0,0 +1,537 @@
+"""
+Device Farm Module
+A simulated Bluetooth backend made of many virtual audio sinks, for load
+testing discovery, connects and stream fan-out without hardware. Each sink
+has its own link latency, bandwidth, jitter, packet loss, clock drift and
+disconnect schedule, plays received audio at its own pace and reports what
+it played. All sinks are driven by one event thread, so a farm of several
+hundred sinks costs one thread rather than one per device.
+
+Usage: python device_farm.py [--sinks N] [--duration S] [--loss P] [--disconnects-per-minute R]
+"""
+
+import argparse
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# (name prefix, device type) used when generating sinks
+SINK_MODELS = (
+    ("JBL Charge", "Speaker"),
+    ("Sony WH-1000XM", "Headphones"),
+    ("Samsung Galaxy Buds", "Earbuds"),
+    ("Bose SoundLink", "Speaker"),
+    ("AirPods Pro", "Earbuds"),
+    ("Beats Studio", "Headphones"),
+    ("JBL Flip", "Speaker"),
+    ("Anker Soundcore", "Speaker")
+)
+
+# Class of Device each sink type reports (Audio/Video major class)
+DEVICE_TYPE_CLASSES = {
+    "Speaker": 0x240414,
+    "Headphones": 0x240418,
+    "Earbuds": 0x240404
+}
+
+# Mean RSSI (dBm) reported for each signal strength
+SIGNAL_RSSI = {"Strong": -50.0, "Medium": -65.0, "Weak": -80.0}
+
+
+class SinkSpec:
+    """Link and playback characteristics of one virtual sink."""
+
+    def __init__(self, name: str, address: str, device_type: str = "Speaker",
+                 latency: float = 0.15, bandwidth: float = 800_000.0, jitter: float = 0.002,
+                 buffer: float = 0.1,
+                 loss: float = 0.0, drift_ppm: float = 0.0, connect_time: float = 0.2,
+                 connect_success: float = 1.0, discover_delay: float = 0.0,
+                 outages: Sequence[Tuple[float, float]] = (), signal_strength: str = "Strong",
+                 class_of_device: Optional[int] = None):
+        self.name = name
+        self.address = address
+        self.device_type = device_type
+        self.latency = latency  # One-way link plus render latency, seconds
+        self.bandwidth = bandwidth  # Bytes per second the link can carry
+        self.jitter = jitter  # Standard deviation of extra arrival delay, seconds
+        self.buffer = buffer  # Audio the sink buffers before (re)starting playback, seconds
+        self.loss = loss  # Probability a chunk is lost in transit
+        self.drift_ppm = drift_ppm  # Positive plays faster than the host clock
+        self.connect_time = connect_time
+        self.connect_success = connect_success  # Probability a connect succeeds
+        self.discover_delay = discover_delay  # Seconds into a scan before the sink is seen
+        self.outages = sorted(outages)  # (seconds after connect, seconds down)
+        self.signal_strength = signal_strength
+        self.class_of_device = DEVICE_TYPE_CLASSES.get(device_type, 0) if class_of_device is None else class_of_device
+
+
+class VirtualSink:
+    """
+    Playback state of one sink. Playback starts `buffer` seconds after the
+    first chunk arrives and then plays chunks back to back on the sink's own
+    clock; a chunk arriving after the buffer ran dry is an underrun (playback
+    restarts after another buffer delay), and one older than the newest
+    chunk received is discarded as late.
+    """
+
+    def __init__(self, spec: SinkSpec, sample_rate: int, frame_bytes: int, max_backlog: float,
+                 rng: random.Random, history: int = 256):
+        self.spec = spec
+        self.sample_rate = sample_rate
+        self.frame_bytes = frame_bytes
+        self.max_backlog = max_backlog  # Seconds of queued transmission before chunks are dropped
+        self.rng = rng
+
+        self.connected = False
+        self.available_at = 0.0  # Reconnects fail until the current outage ends
+        self.connected_at: Optional[float] = None
+        self.first_connected_at: Optional[float] = None
+        self.generation = 0  # Bumped on every disconnect; in-flight chunks of old links are lost
+        self.next_sequence = 0
+        self.link_free_at = 0.0
+        self.playout_end: Optional[float] = None
+        self.highest_sequence = -1
+        self.pending: deque = deque()  # (start, end, sequence, frames) not yet finished playing
+        self.played: deque = deque(maxlen=history)  # (start, sequence, frames) recently played
+
+        self.stats = {
+            'sent': 0, 'bytes_sent': 0, 'lost': 0, 'overflow': 0, 'late': 0, 'in_flight_lost': 0,
+            'received': 0, 'played_chunks': 0, 'played_frames': 0, 'underruns': 0, 'disconnects': 0,
+            'connects': 0, 'failed_connects': 0
+        }
+        self.quality_marks = (0, 0)  # (sent, lost + overflow) at the last link_quality() poll
+
+    def frames_of(self, data) -> Tuple[int, int]:
+        """(frames, bytes) of an audio chunk given as an array or raw PCM bytes."""
+        if hasattr(data, 'shape'):
+            return len(data), int(data.nbytes)
+        size = len(data)
+        return size // self.frame_bytes, size
+
+    def transmit(self, data, now: float) -> Optional[Tuple[float, int, int]]:
+        """
+        Put a chunk on the link. Returns (arrival time, sequence, frames), or
+        None if the chunk is dropped on the way.
+        """
+        frames, size = self.frames_of(data)
+        sequence = self.next_sequence
+        self.next_sequence += 1
+        self.stats['sent'] += 1
+        self.stats['bytes_sent'] += size
+
+        start = max(now, self.link_free_at)
+        if start - now > self.max_backlog:
+            self.stats['overflow'] += 1
+            return None
+        self.link_free_at = start + size / self.spec.bandwidth
+        if self.spec.loss and self.rng.random() < self.spec.loss:
+            self.stats['lost'] += 1
+            return None
+        jitter = abs(self.rng.gauss(0.0, self.spec.jitter)) if self.spec.jitter else 0.0
+        return self.link_free_at + self.spec.latency + jitter, sequence, frames
+
+    def receive(self, sequence: int, frames: int, arrival: float):
+        """Schedule an arrived chunk for playback."""
+        self.stats['received'] += 1
+        if sequence < self.highest_sequence:
+            self.stats['late'] += 1
+            return
+        self.highest_sequence = sequence
+
+        duration = frames / (self.sample_rate * (1.0 + self.spec.drift_ppm * 1e-6))
+        if self.playout_end is None or arrival > self.playout_end:
+            if self.playout_end is not None:
+                self.stats['underruns'] += 1
+            start = arrival + self.spec.buffer
+        else:
+            start = self.playout_end
+        self.playout_end = start + duration
+        self.pending.append((start, self.playout_end, sequence, frames))
+
+    def advance(self, now: float):
+        """Count chunks whose playback has finished by `now`."""
+        while self.pending and self.pending[0][1] <= now:
+            start, _, sequence, frames = self.pending.popleft()
+            self.played.append((start, sequence, frames))
+            self.stats['played_chunks'] += 1
+            self.stats['played_frames'] += frames
+
+    def drop_link(self, now: float, available_at: float, dropped: bool = True):
+        """Close the link: queued audio stops and in-flight chunks never arrive."""
+        self.connected = False
+        self.generation += 1
+        self.available_at = available_at
+        self.advance(now)
+        self.pending.clear()
+        self.playout_end = None
+        self.link_free_at = now
+        if dropped:
+            self.stats['disconnects'] += 1
+
+    def report(self, now: float) -> Dict:
+        self.advance(now)
+        buffered = max(0.0, self.playout_end - now) if self.playout_end is not None else 0.0
+        return dict(self.stats,
+                    address=self.spec.address,
+                    connected=self.connected,
+                    buffered=buffered,
+                    played_seconds=self.stats['played_frames'] / self.sample_rate,
+                    recent=list(self.played)[-8:])
+
+
+class DeviceFarm:
+    """
+    Virtual sinks behind a Bluetooth-manager-like API: discover(), connect(),
+    disconnect(), is_connected() and send(address, data). send() matches the
+    send_callback signature of PresentationScheduler, so a farm can stand in
+    for real devices in the streaming pipeline.
+    """
+
+    def __init__(self, specs: Sequence[SinkSpec], sample_rate: int = 44100, frame_bytes: int = 4,
+                 max_backlog: float = 1.0, seed: Optional[int] = None):
+        rng = random.Random(seed)
+        self.sample_rate = sample_rate
+        self.rng = rng
+        self.sinks: Dict[str, VirtualSink] = {
+            spec.address.upper(): VirtualSink(spec, sample_rate, frame_bytes, max_backlog,
+                                              random.Random(rng.random()))
+            for spec in specs
+        }
+
+        # Called with the address when a scheduled outage drops a connected sink
+        self.link_lost_callback: Optional[Callable[[str], None]] = None
+
+        self._events: List = []  # Heap of (time, sequence, kind, sink, payload)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    @classmethod
+    def generate(cls, count: int, seed: Optional[int] = None, latency: Tuple[float, float] = (0.05, 0.3),
+                 bandwidth: Tuple[float, float] = (500_000.0, 1_500_000.0), jitter: float = 0.003,
+                 loss: float = 0.0, drift_ppm: float = 50.0, connect_time: Tuple[float, float] = (0.05, 0.3),
+                 connect_success: float = 0.98, discover_window: float = 6.0,
+                 disconnects_per_minute: float = 0.0, outage: Tuple[float, float] = (0.5, 3.0),
+                 schedule_length: float = 600.0, **farm_options) -> 'DeviceFarm':
+        """
+        A farm of `count` sinks with parameters drawn uniformly from the
+        given ranges; drift is drawn from +/- drift_ppm. Outages are a Poisson
+        process at `disconnects_per_minute` over the first `schedule_length`
+        seconds of each connection.
+        """
+        rng = random.Random(seed)
+        specs = []
+        for i in range(count):
+            prefix, device_type = SINK_MODELS[i % len(SINK_MODELS)]
+            outages = []
+            if disconnects_per_minute > 0:
+                at = rng.expovariate(disconnects_per_minute / 60.0)
+                while at < schedule_length:
+                    down = rng.uniform(*outage)
+                    outages.append((at, down))
+                    at += down + rng.expovariate(disconnects_per_minute / 60.0)
+            specs.append(SinkSpec(
+                name=f"{prefix} {i + 1}",
+                address=f"FA:RM:{(i >> 16) & 0xFF:02X}:{(i >> 8) & 0xFF:02X}:{i & 0xFF:02X}:00",
+                device_type=device_type,
+                latency=rng.uniform(*latency),
+                bandwidth=rng.uniform(*bandwidth),
+                jitter=jitter,
+                loss=loss,
+                drift_ppm=rng.uniform(-drift_ppm, drift_ppm),
+                connect_time=rng.uniform(*connect_time),
+                connect_success=connect_success,
+                discover_delay=rng.uniform(0.0, discover_window),
+                outages=outages,
+                signal_strength=rng.choice(("Weak", "Medium", "Strong"))
+            ))
+        return cls(specs, seed=seed, **farm_options)
+
+    @classmethod
+    def default(cls) -> 'DeviceFarm':
+        """The small farm used by the simulation mode of the Bluetooth managers."""
+        names = [("JBL Charge 4", "Speaker"), ("Sony WH-1000XM4", "Headphones"),
+                 ("Samsung Galaxy Buds", "Earbuds"), ("Bose SoundLink Mini", "Speaker"),
+                 ("AirPods Pro", "Earbuds"), ("Beats Studio3", "Headphones"),
+                 ("JBL Flip 5", "Speaker"), ("Anker Soundcore", "Speaker")]
+        specs = [SinkSpec(name, f"XX:XX:XX:XX:XX:{i + 1:02X}", device_type,
+                          latency=0.12 + 0.03 * i, connect_time=1.0, connect_success=0.9,
+                          discover_delay=0.8 * i, signal_strength=("Weak", "Medium", "Strong")[i % 3])
+                 for i, (name, device_type) in enumerate(names)]
+        return cls(specs)
+
+    def _sink(self, address: str) -> Optional[VirtualSink]:
+        return self.sinks.get(address.upper())
+
+    # Discovery and connection
+
+    def discovery_schedule(self, duration: float) -> List[Tuple[float, SinkSpec]]:
+        """(seconds into the scan, sink) in discovery order, scaled to fit `duration`."""
+        specs = sorted((sink.spec for sink in self.sinks.values()), key=lambda spec: spec.discover_delay)
+        window = max((spec.discover_delay for spec in specs), default=0.0)
+        scale = min(1.0, duration / window) if window > 0 else 1.0
+        return [(spec.discover_delay * scale, spec) for spec in specs]
+
+    def discover(self, duration: float, should_stop: Optional[Callable[[], bool]] = None) -> Iterator[SinkSpec]:
+        """Yield sinks as they are 'seen' during a scan of `duration` seconds."""
+        started = time.monotonic()
+        for at, spec in self.discovery_schedule(duration):
+            delay = started + at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if should_stop and should_stop():
+                return
+            yield spec
+
+    def connect_time(self, address: str) -> float:
+        sink = self._sink(address)
+        return sink.spec.connect_time if sink else 0.0
+
+    def connect(self, address: str, wait: bool = True) -> bool:
+        """
+        Connect to a sink; fails during an outage. With wait=False the
+        caller is expected to have waited connect_time() already (e.g. with
+        asyncio.sleep), so the call returns at once.
+        """
+        sink = self._sink(address)
+        if sink is None:
+            return False
+        if wait:
+            time.sleep(sink.spec.connect_time)
+        now = time.monotonic()
+        with self._condition:
+            if sink.connected:
+                return True
+            if now < sink.available_at or self.rng.random() >= sink.spec.connect_success:
+                sink.stats['failed_connects'] += 1
+                return False
+            sink.connected = True
+            sink.connected_at = now
+            if sink.first_connected_at is None:
+                sink.first_connected_at = now
+            sink.stats['connects'] += 1
+            # Outages count from the first connect; a reconnect only sees the ones still ahead
+            for offset, down in sink.spec.outages:
+                at = sink.first_connected_at + offset
+                if at > now:
+                    self._push(at, 'down', sink, (sink.generation, down))
+        self._ensure_thread()
+        return True
+
+    def disconnect(self, address: str) -> bool:
+        sink = self._sink(address)
+        if sink is None:
+            return False
+        with self._condition:
+            if sink.connected:
+                sink.drop_link(time.monotonic(), 0.0, dropped=False)
+        return True
+
+    def is_connected(self, address: str) -> bool:
+        sink = self._sink(address)
+        return sink is not None and sink.connected
+
+    def link_quality(self, address: str) -> Optional[Dict[str, float]]:
+        """
+        Current RSSI, send-to-arrival latency and loss since the previous
+        call, for a connected sink; None otherwise. Matches the source
+        signature of LinkQualitySampler.track().
+        """
+        sink = self._sink(address)
+        if sink is None:
+            return None
+        now = time.monotonic()
+        with self._condition:
+            if not sink.connected:
+                return None
+            sent = sink.stats['sent']
+            lost = sink.stats['lost'] + sink.stats['overflow']
+            last_sent, last_lost = sink.quality_marks
+            sink.quality_marks = (sent, lost)
+            quality = {
+                'rssi': SIGNAL_RSSI.get(sink.spec.signal_strength, -70.0) + sink.rng.gauss(0.0, 3.0),
+                'latency': max(0.0, sink.link_free_at - now) + sink.spec.latency
+            }
+            if sent > last_sent:
+                quality['loss'] = (lost - last_lost) / (sent - last_sent)
+        return quality
+
+    # Streaming
+
+    def send(self, address: str, data) -> bool:
+        """Send one audio chunk; False if the sink is unknown or not connected."""
+        sink = self._sink(address)
+        if sink is None:
+            return False
+        now = time.monotonic()
+        with self._condition:
+            if not sink.connected:
+                return False
+            delivery = sink.transmit(data, now)
+            if delivery is not None:
+                arrival, sequence, frames = delivery
+                self._push(arrival, 'arrive', sink, (sink.generation, sequence, frames))
+        self._ensure_thread()
+        return True
+
+    def send_to_all(self, data) -> int:
+        """Send one chunk to every connected sink; returns how many accepted it."""
+        return sum(1 for address, sink in list(self.sinks.items()) if sink.connected and self.send(address, data))
+
+    # Event thread
+
+    def _push(self, when: float, kind: str, sink: VirtualSink, payload):
+        event = (when, next(self._sequence), kind, sink, payload)
+        heapq.heappush(self._events, event)
+        if self._events[0] is event:
+            # New earliest event; wake the event thread to shorten its wait
+            self._condition.notify()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._condition:
+                if self._stopped or (self._thread and self._thread.is_alive()):
+                    return
+                self._thread = threading.Thread(target=self._event_loop, daemon=True, name="device-farm")
+                self._thread.start()
+
+    def _event_loop(self):
+        lost_links = []
+        with self._condition:
+            while not self._stopped:
+                now = time.monotonic()
+                while self._events and self._events[0][0] <= now:
+                    when, _, kind, sink, payload = heapq.heappop(self._events)
+                    if kind == 'arrive':
+                        generation, sequence, frames = payload
+                        if generation != sink.generation:
+                            sink.stats['in_flight_lost'] += 1
+                        else:
+                            sink.receive(sequence, frames, when)
+                    elif kind == 'down':
+                        generation, down = payload
+                        if generation == sink.generation and sink.connected:
+                            sink.drop_link(when, when + down)
+                            lost_links.append(sink.spec.address)
+
+                if lost_links and self.link_lost_callback:
+                    callback, addresses, lost_links = self.link_lost_callback, lost_links, []
+                    self._condition.release()
+                    try:
+                        for address in addresses:
+                            callback(address)
+                    except Exception as e:
+                        print(f"Device farm link lost callback error: {e}")
+                    finally:
+                        self._condition.acquire()
+                    continue
+                lost_links.clear()
+
+                timeout = self._events[0][0] - time.monotonic() if self._events else None
+                self._condition.wait(timeout)
+
+    def stop(self):
+        """Stop the event thread; undelivered chunks are discarded."""
+        with self._condition:
+            self._stopped = True
+            self._events.clear()
+            self._condition.notify_all()
+
+    # Reporting
+
+    def report(self) -> Dict[str, Dict]:
+        """What every sink has received and played so far."""
+        now = time.monotonic()
+        with self._condition:
+            return {sink.spec.address: sink.report(now) for sink in self.sinks.values()}
+
+    def summary(self) -> Dict:
+        """Totals across all sinks plus underrun percentiles."""
+        reports = list(self.report().values())
+        totals = {key: sum(r[key] for r in reports)
+                  for key in ('sent', 'lost', 'overflow', 'late', 'in_flight_lost', 'received',
+                              'played_chunks', 'underruns', 'disconnects', 'connects', 'failed_connects')}
+        underruns = sorted(r['underruns'] for r in reports)
+        played = sorted(r['played_seconds'] for r in reports)
+        totals.update(
+            sinks=len(reports),
+            connected=sum(1 for r in reports if r['connected']),
+            underruns_p50=underruns[len(underruns) // 2] if underruns else 0,
+            underruns_max=underruns[-1] if underruns else 0,
+            played_seconds_min=played[0] if played else 0.0,
+            played_seconds_max=played[-1] if played else 0.0
+        )
+        return totals
+
+
+def run_load_test(farm: DeviceFarm, duration: float = 10.0, sample_rate: int = 44100,
+                  chunk_frames: int = 1024) -> Dict:
+    """
+    Connect every sink, then stream `duration` seconds of silence to all of
+    them through a PresentationScheduler, as AudioEngine does. Returns the
+    farm summary plus the scheduler's dropped-chunk count.
+    """
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+    from stream_scheduler import PresentationScheduler
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        results = list(executor.map(farm.connect, list(farm.sinks)))
+    connect_time = time.monotonic() - started
+    addresses = [sink.spec.address for sink in farm.sinks.values() if sink.connected]
+    latencies = {sink.spec.address: sink.spec.latency for sink in farm.sinks.values()}
+    print(f"Connected {sum(results)}/{len(results)} sinks in {connect_time:.2f}s")
+
+    chunk = np.zeros((chunk_frames, 2), dtype=np.float32)
+    scheduler = PresentationScheduler(sample_rate)
+    start_pts = scheduler.start(addresses, latencies, farm.send)
+    lead_time = start_pts - time.monotonic()
+
+    cpu_started = time.process_time()
+    for _ in range(int(duration * sample_rate / chunk_frames)):
+        while scheduler.time_until_next() - lead_time > 0.5:
+            time.sleep(0.01)
+        scheduler.submit(chunk)
+    time.sleep(max(0.0, scheduler.next_pts - time.monotonic()) + 0.5)
+
+    sender_stats = scheduler.get_stats()
+    scheduler.stop()
+    summary = farm.summary()
+    summary.update(
+        connect_seconds=connect_time,
+        scheduler_dropped=sum(stats.get('dropped', 0) for stats in sender_stats.values()),
+        cpu_seconds=time.process_time() - cpu_started,
+        threads=threading.active_count()
+    )
+    farm.stop()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test stream fan-out against simulated sinks")
+    parser.add_argument('--sinks', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--loss', type=float, default=0.0, help="Probability each chunk is lost")
+    parser.add_argument('--jitter-ms', type=float, default=3.0)
+    parser.add_argument('--drift-ppm', type=float, default=50.0)
+    parser.add_argument('--disconnects-per-minute', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    farm = DeviceFarm.generate(args.sinks, seed=args.seed, loss=args.loss, jitter=args.jitter_ms / 1000,
+                               drift_ppm=args.drift_ppm, connect_time=(0.01, 0.05), connect_success=1.0,
+                               disconnects_per_minute=args.disconnects_per_minute)
+    print(f"Streaming {args.duration:.0f}s to {args.sinks} simulated sinks")
+    summary = run_load_test(farm, args.duration)
+    for key, value in summary.items():
+        print(f"  {key:20s} {value:.2f}" if isinstance(value, float) else f"  {key:20s} {value}")
+
+
+if __name__ == "__main__":
+    main()
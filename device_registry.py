@@ -0,0 +1,169 @@
+"""
+Device Registry Module
+Thread-safe store of discovered devices indexed by address, name and
+audio/connection state. Writers build a new immutable snapshot under a lock
+(copy-on-write); readers take the current snapshot without locking, so
+lookups are constant-time and never see a half-applied update.
+"""
+
+import copy
+import threading
+from types import MappingProxyType
+from typing import Iterable, Iterator, Mapping, Tuple
+
+
+class RegistrySnapshot:
+    """Immutable view of the registry at one moment."""
+
+    __slots__ = ('devices', 'by_address', 'by_name', 'audio', 'connected', 'connected_audio')
+
+    def __init__(self, devices: Tuple = ()):
+        self.devices = devices
+        self.by_address: Mapping = MappingProxyType({device.address: device for device in devices})
+        # First device with a given name wins, matching the old linear scan
+        by_name = {}
+        for device in devices:
+            by_name.setdefault(device.name, device)
+        self.by_name: Mapping = MappingProxyType(by_name)
+        self.audio = tuple(device for device in devices if device.is_audio_device)
+        self.connected = tuple(device for device in devices if device.is_connected)
+        self.connected_audio = tuple(device for device in self.connected if device.is_audio_device)
+
+
+class DeviceRegistry:
+    """
+    Devices keyed by address, kept in discovery order. Adding a device whose
+    address is already known replaces the old entry in place.
+    """
+
+    def __init__(self, devices: Iterable = ()):
+        self._write_lock = threading.Lock()
+        self._snapshot = RegistrySnapshot(self._dedupe(devices))
+
+    @staticmethod
+    def _dedupe(devices: Iterable) -> Tuple:
+        by_address = {}
+        for device in devices:
+            by_address[device.address] = device
+        return tuple(by_address.values())
+
+    def snapshot(self) -> RegistrySnapshot:
+        """Current snapshot; safe to use from any thread without locking."""
+        return self._snapshot
+
+    def _publish(self, devices: Tuple):
+        self._snapshot = RegistrySnapshot(devices)
+
+    # Writes
+
+    def add(self, device):
+        """
+        Add a device, replacing any existing entry with the same address.
+        A connected entry stays connected; a copy of it with the sighting
+        refreshed is stored instead. Returns the stored device.
+        """
+        with self._write_lock:
+            devices = self._snapshot.devices
+            existing = self._snapshot.by_address.get(device.address)
+            if existing is None:
+                self._publish(devices + (device,))
+            elif existing.is_connected and not device.is_connected:
+                return self._update_locked(existing, signal_strength=device.signal_strength,
+                                           last_seen=device.last_seen)
+            else:
+                self._publish(tuple(device if d is existing else d for d in devices))
+            return device
+
+    def add_many(self, devices: Iterable):
+        """Add several devices with a single snapshot rebuild; connected entries are kept."""
+        with self._write_lock:
+            merged = {d.address: d for d in self._snapshot.devices}
+            for device in devices:
+                existing = merged.get(device.address)
+                if existing is not None and existing.is_connected and not device.is_connected:
+                    continue
+                merged[device.address] = device
+            self._publish(tuple(merged.values()))
+
+    def remove(self, address: str):
+        with self._write_lock:
+            devices = self._snapshot.devices
+            if address in self._snapshot.by_address:
+                self._publish(tuple(d for d in devices if d.address != address))
+
+    def set_connected(self, device, connected: bool):
+        """
+        Store a copy of the device with the new connection state and return
+        it. Earlier snapshots keep the object they had, unchanged.
+        """
+        with self._write_lock:
+            devices = self._snapshot.devices
+            existing = self._snapshot.by_address.get(device.address)
+            updated = copy.copy(existing if existing is not None else device)
+            updated.is_connected = connected
+            if existing is None:
+                self._publish(devices + (updated,))
+            else:
+                self._publish(tuple(updated if d is existing else d for d in devices))
+            return updated
+
+    def update(self, address: str, **fields):
+        """
+        Store a copy of a device with the given attributes changed and return
+        it, or None if the address is unknown. Published objects are never
+        mutated, so readers of older snapshots see consistent devices.
+        """
+        with self._write_lock:
+            existing = self._snapshot.by_address.get(address)
+            if existing is None:
+                return None
+            return self._update_locked(existing, **fields)
+
+    def _update_locked(self, existing, **fields):
+        updated = copy.copy(existing)
+        for name, value in fields.items():
+            setattr(updated, name, value)
+        self._publish(tuple(updated if d is existing else d for d in self._snapshot.devices))
+        return updated
+
+    def replace_all(self, devices: Iterable):
+        with self._write_lock:
+            self._publish(self._dedupe(devices))
+
+    def clear(self, keep_connected: bool = False):
+        """Remove all devices, optionally keeping those still connected."""
+        with self._write_lock:
+            self._publish(self._snapshot.connected if keep_connected else ())
+
+    # Lock-free reads
+
+    @property
+    def devices(self) -> Tuple:
+        return self._snapshot.devices
+
+    @property
+    def audio_devices(self) -> Tuple:
+        return self._snapshot.audio
+
+    @property
+    def connected_devices(self) -> Tuple:
+        return self._snapshot.connected
+
+    @property
+    def connected_audio_devices(self) -> Tuple:
+        return self._snapshot.connected_audio
+
+    def get(self, address: str):
+        return self._snapshot.by_address.get(address)
+
+    def get_by_name(self, name: str):
+        return self._snapshot.by_name.get(name)
+
+    def __len__(self) -> int:
+        return len(self._snapshot.devices)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._snapshot.devices)
+
+    def __contains__(self, device) -> bool:
+        return self._snapshot.by_address.get(device.address) is device
@@ -3,38 +3,47 @@ Enhanced Bluetooth Manager for Windows
 Manages Bluetooth device discovery, connection, and audio streaming
 """
 
-import subprocess
 import json
+import subprocess
 import threading
 import time
 import re
-from typing import List, Dict, Optional, Callable
-import os
-import winreg
+import queue
+from concurrent.futures import Future
+from typing import AsyncIterator, Iterable, Iterator, List, Dict, Optional, Callable, Tuple
+from capability_probe import CapabilityProbe, bluetooth_service_running
+from connection_scheduler import ConnectionScheduler
+from device_classifier import get_device_classifier
+from device_farm import DeviceFarm
+from device_registry import DeviceRegistry
+from helper_process import get_powershell_helper, shutdown_helpers
+from known_device_store import get_known_device_store
+from latency_profiles import LatencyProfileStore
+from link_quality import LATENCY, SEND_DROPS, SEND_TIME, get_link_quality_sampler
+from scatter_send import MISSED, PENDING, SENT, ScatterSender, SendOutcome
+from shutdown_coordinator import ShutdownCoordinator, ShutdownReport
+from startup_profiler import lazy_import
+
+asyncio = lazy_import("asyncio")  # Only needed by aiter_devices()
 
 class WindowsBluetoothDevice:
     """Represents a Bluetooth device on Windows."""
     
-    def __init__(self, name: str, address: str, device_type: str = "Unknown", is_connected: bool = False):
+    def __init__(self, name: str, address: str, device_type: str = "Unknown", is_connected: bool = False,
+                 class_of_device: Optional[int] = None):
         self.name = name
         self.address = address
         self.device_type = device_type
         self.is_connected = is_connected
+        self.class_of_device = class_of_device
         self.is_audio_device = self._is_audio_device()
         self.signal_strength = "Unknown"
         self.last_seen = time.time()
         
     def _is_audio_device(self) -> bool:
-        """Determine if this is an audio device based on name/type."""
-        audio_keywords = [
-            'speaker', 'headphone', 'headset', 'earphone', 'earbud', 'airpod',
-            'beats', 'bose', 'sony', 'jbl', 'audio', 'sound', 'music'
-        ]
-        
-        name_lower = self.name.lower()
-        type_lower = self.device_type.lower()
-        
-        return any(keyword in name_lower or keyword in type_lower for keyword in audio_keywords)
+        """Determine if this is an audio device from its class of device, falling back to name/type."""
+        return get_device_classifier().classify(self.address, self.name, self.device_type,
+                                                self.class_of_device).is_audio
         
     def to_dict(self) -> Dict:
         """Convert to dictionary representation."""
@@ -55,9 +64,11 @@ class WindowsBluetoothDevice:
 class EnhancedBluetoothManager:
     """Enhanced Bluetooth manager for Windows with audio focus."""
     
-    def __init__(self):
-        self.devices: List[WindowsBluetoothDevice] = []
-        self.connected_devices: List[WindowsBluetoothDevice] = []
+    def __init__(self, device_farm: Optional[DeviceFarm] = None):
+        # Indexed copy-on-write store; reads never block discovery or connects
+        self.registry = DeviceRegistry()
+        self.known_store = get_known_device_store()
+        self.known_addresses = self.known_store.addresses()  # Prioritized when connecting
         self.is_discovering = False
         self.discovery_thread: Optional[threading.Thread] = None
         
@@ -67,21 +78,73 @@ class EnhancedBluetoothManager:
         self.device_disconnected_callback: Optional[Callable] = None
         self.status_callback: Optional[Callable] = None
         
-        self._check_bluetooth_support()
-        
-    def _check_bluetooth_support(self):
-        """Check if Bluetooth is available on the system."""
-        try:
-            # Check if Bluetooth service is running
-            result = subprocess.run(['sc', 'query', 'bthserv'], 
-                                  capture_output=True, text=True, timeout=5)
-            self.bluetooth_available = 'RUNNING' in result.stdout
-        except Exception:
-            self.bluetooth_available = False
-            
-        if not self.bluetooth_available:
+        # Queues of iter_devices() consumers waiting for discovery results
+        self._discovery_listeners: List[queue.Queue] = []
+        self._listeners_lock = threading.Lock()
+        
+        # Connects share a small worker pool instead of a thread per request
+        self.connection_scheduler = ConnectionScheduler(max_concurrent=2)
+        
+        # Virtual sinks used in simulation mode; pass a larger farm to load test
+        self.device_farm = device_farm or DeviceFarm.default()
+        self.device_farm.link_lost_callback = self._on_simulated_link_lost
+        
+        # Chunks fan out through one send lane per device so a stalled link
+        # cannot hold up the others; latencies move each device's deadline.
+        # Saved latency profiles (written by the audio engine's synchronizer)
+        # give a starting latency on connect.
+        self.scatter_sender = ScatterSender(self._send_to_address)
+        self.device_latencies: Dict[str, float] = {}
+        self.latency_profiles = LatencyProfileStore()
+        self.send_budget = 0.05  # Deadline for chunks sent without a presentation time
+        
+        # Smoothed link quality of connected devices; drives the signal column
+        self.link_quality = get_link_quality_sampler()
+        self.link_quality.add_listener(self._on_link_sampled)
+        
+        # Starts in 'probing' mode and upgrades to 'real' or 'simulated' once
+        # the service check finishes on its own thread
+        self.backend_probe = CapabilityProbe("bluetooth_service", bluetooth_service_running)
+        self.backend_probe.add_listener(self._on_backend_probed)
+        self.backend_probe.start()
+        
+    @property
+    def devices(self) -> Tuple[WindowsBluetoothDevice, ...]:
+        """Snapshot of all known devices in discovery order."""
+        return self.registry.devices
+        
+    @property
+    def connected_devices(self) -> Tuple[WindowsBluetoothDevice, ...]:
+        """Snapshot of connected devices."""
+        return self.registry.connected_devices
+        
+    @property
+    def mode(self) -> str:
+        """'probing' until the Bluetooth service check finishes, then 'real' or 'simulated'."""
+        state = self.backend_probe.state
+        if state == 'probing':
+            return 'probing'
+        return 'real' if state == 'available' else 'simulated'
+        
+    @property
+    def bluetooth_available(self) -> bool:
+        """Whether the Bluetooth service is running; False while still probing."""
+        return self.backend_probe.result is True
+        
+    def _on_backend_probed(self, available: bool):
+        if available:
+            self._log("Bluetooth service detected")
+        else:
             self._log("Warning: Bluetooth service not detected. Using simulation mode.")
             
+    def _wait_for_backend(self, timeout: float = 6.0) -> bool:
+        """Block a worker thread until the backend mode is known; simulate if it never is."""
+        return bool(self.backend_probe.wait(timeout))
+        
+    def refresh_backend(self):
+        """Re-check the Bluetooth service, e.g. after the user turns Bluetooth on."""
+        self.backend_probe.start(force=True)
+        
     def set_device_found_callback(self, callback: Callable):
         """Set callback for when a device is found."""
         self.device_found_callback = callback
@@ -105,50 +168,102 @@ class EnhancedBluetoothManager:
             self.status_callback(message)
             
     def discover_devices(self, duration: int = 10) -> List[WindowsBluetoothDevice]:
-        """Start discovering Bluetooth devices."""
+        """
+        Start discovering Bluetooth devices in the background.
+        Returns a snapshot of the devices known so far; use iter_devices() or
+        the device found callback to receive devices as they are discovered.
+        """
         if self.is_discovering:
             self._log("Discovery already in progress")
-            return self.devices
+            return list(self.devices)
             
         self.is_discovering = True
-        self.devices.clear()
+        self.registry.clear(keep_connected=True)
         
         self._log("Starting Bluetooth device discovery...")
         
-        if self.bluetooth_available:
-            self.discovery_thread = threading.Thread(
-                target=self._real_discovery_worker, 
-                args=(duration,), 
-                daemon=True
-            )
-        else:
-            self.discovery_thread = threading.Thread(
-                target=self._simulated_discovery_worker, 
-                args=(duration,), 
-                daemon=True
-            )
-            
+        self.discovery_thread = threading.Thread(
+            target=self._discovery_worker, 
+            args=(duration,), 
+            daemon=True
+        )
         self.discovery_thread.start()
-        return self.devices
+        return list(self.devices)
+    
+    def iter_devices(self, duration: int = 10,
+                     cancel_event: Optional[threading.Event] = None) -> Iterator[WindowsBluetoothDevice]:
+        """
+        Yield devices as they are discovered. Joins a discovery already in
+        progress or starts one. Setting `cancel_event` (or closing the
+        generator) stops waiting and stops the discovery.
+        """
+        cancel_event = cancel_event or threading.Event()
+        found = queue.Queue()
+        with self._listeners_lock:
+            self._discovery_listeners.append(found)
         
+        try:
+            if not self.is_discovering:
+                self.discover_devices(duration)
+            
+            while not cancel_event.is_set():
+                try:
+                    yield found.get(timeout=0.1)
+                except queue.Empty:
+                    if not self.is_discovering:
+                        break
+                
+            # Drain anything that arrived just before discovery finished
+            while not cancel_event.is_set() and not found.empty():
+                yield found.get_nowait()
+        finally:
+            with self._listeners_lock:
+                self._discovery_listeners.remove(found)
+            # Cancelled or closed early (GeneratorExit, a break in the caller)
+            if self.is_discovering:
+                self.stop_discovery()
+    
+    async def aiter_devices(self, duration: int = 10) -> AsyncIterator[WindowsBluetoothDevice]:
+        """Async-iterator form of iter_devices; cancelling the consumer stops discovery."""
+        loop = asyncio.get_running_loop()
+        cancel_event = threading.Event()
+        devices = self.iter_devices(duration, cancel_event)
+        finished = object()
+        try:
+            while True:
+                device = await loop.run_in_executor(None, next, devices, finished)
+                if device is finished:
+                    break
+                yield device
+        finally:
+            if self.is_discovering and not cancel_event.is_set():
+                cancel_event.set()
+                self.stop_discovery()
+    
+    def _on_device_found(self, device: WindowsBluetoothDevice):
+        """Record a discovered device and notify callbacks and iterators."""
+        device = self.registry.add(device)
+        
+        with self._listeners_lock:
+            listeners = list(self._discovery_listeners)
+        for listener in listeners:
+            listener.put(device)
+            
+        if self.device_found_callback:
+            self.device_found_callback(device)
+        
+    def _discovery_worker(self, duration: int):
+        """Pick real or simulated discovery once the backend probe has finished."""
+        if self._wait_for_backend():
+            self._real_discovery_worker(duration)
+        else:
+            self._simulated_discovery_worker(duration)
+            
     def _real_discovery_worker(self, duration: int):
         """Real Bluetooth discovery using Windows commands."""
         try:
-            # Use PowerShell to discover Bluetooth devices
+            # The helper process preloads the WinRT types and the Await function
             ps_script = """
-            Add-Type -AssemblyName System.Runtime.WindowsRuntime
-            $asTaskGeneric = ([System.WindowsRuntimeSystemExtensions].GetMethods() | ? { $_.Name -eq 'AsTask' -and $_.GetParameters().Count -eq 1 -and $_.GetParameters()[0].ParameterType.Name -eq 'IAsyncOperation`1' })[0]
-            Function Await($WinRtTask, $ResultType) {
-                $asTask = $asTaskGeneric.MakeGenericMethod($ResultType)
-                $netTask = $asTask.Invoke($null, @($WinRtTask))
-                $netTask.Wait(-1) | Out-Null
-                $netTask.Result
-            }
-            
-            [Windows.Devices.Bluetooth.BluetoothAdapter,Windows.Devices.Bluetooth,ContentType=WindowsRuntime] | Out-Null
-            [Windows.Devices.Bluetooth.BluetoothDevice,Windows.Devices.Bluetooth,ContentType=WindowsRuntime] | Out-Null
-            [Windows.Devices.Enumeration.DeviceInformation,Windows.Devices.Enumeration,ContentType=WindowsRuntime] | Out-Null
-            
             $adapter = Await ([Windows.Devices.Bluetooth.BluetoothAdapter]::GetDefaultAsync()) ([Windows.Devices.Bluetooth.BluetoothAdapter])
             if ($adapter) {
                 $devices = Await ($adapter.GetDevicesAsync()) ([Windows.Devices.Enumeration.DeviceInformationCollection])
@@ -158,12 +273,10 @@ class EnhancedBluetoothManager:
             }
             """
             
-            # Run PowerShell script
-            result = subprocess.run(['powershell', '-Command', ps_script], 
-                                  capture_output=True, text=True, timeout=duration)
+            output = get_powershell_helper().call(ps_script, timeout=duration)
             
-            if result.returncode == 0 and result.stdout.strip():
-                lines = result.stdout.strip().split('\n')
+            if output.strip():
+                lines = output.strip().split('\n')
                 for line in lines:
                     if '|' in line:
                         parts = line.split('|')
@@ -175,10 +288,7 @@ class EnhancedBluetoothManager:
                             
                             if name and name != "None":
                                 device = WindowsBluetoothDevice(name, device_id, device_type, is_connected)
-                                self.devices.append(device)
-                                
-                                if self.device_found_callback:
-                                    self.device_found_callback(device)
+                                self._on_device_found(device)
                                     
             else:
                 # Fall back to simulated discovery
@@ -196,39 +306,14 @@ class EnhancedBluetoothManager:
         """Simulated discovery for testing when Bluetooth isn't available."""
         self._log("Using simulated Bluetooth discovery")
         
-        # Simulate discovery time
-        total_steps = 8
-        step_time = duration / total_steps
-        
-        simulated_devices = [
-            ("JBL Charge 4", "XX:XX:XX:XX:XX:01", "Speaker", False),
-            ("Sony WH-1000XM4", "XX:XX:XX:XX:XX:02", "Headphones", False),
-            ("Samsung Galaxy Buds", "XX:XX:XX:XX:XX:03", "Earbuds", False),
-            ("Bose SoundLink Mini", "XX:XX:XX:XX:XX:04", "Speaker", False),
-            ("AirPods Pro", "XX:XX:XX:XX:XX:05", "Earbuds", True),
-            ("Beats Studio3", "XX:XX:XX:XX:XX:06", "Headphones", False),
-            ("JBL Flip 5", "XX:XX:XX:XX:XX:07", "Speaker", False),
-            ("Anker Soundcore", "XX:XX:XX:XX:XX:08", "Speaker", False)
-        ]
-        
-        for i, (name, address, device_type, is_connected) in enumerate(simulated_devices):
-            if not self.is_discovering:
-                break
-                
-            device = WindowsBluetoothDevice(name, address, device_type, is_connected)
-            device.signal_strength = ["Weak", "Medium", "Strong"][i % 3]
+        for spec in self.device_farm.discover(duration, should_stop=lambda: not self.is_discovering):
+            device = WindowsBluetoothDevice(spec.name, spec.address, spec.device_type,
+                                            self.device_farm.is_connected(spec.address), spec.class_of_device)
+            device.signal_strength = spec.signal_strength
             
-            self.devices.append(device)
+            self._log(f"Discovered: {spec.name}")
             
-            if is_connected:
-                self.connected_devices.append(device)
-                
-            self._log(f"Discovered: {name}")
-            
-            if self.device_found_callback:
-                self.device_found_callback(device)
-                
-            time.sleep(step_time)
+            self._on_device_found(device)
             
         self.is_discovering = False
         self._log(f"Simulated discovery completed. Found {len(self.devices)} devices")
@@ -243,35 +328,47 @@ class EnhancedBluetoothManager:
         
         for name, address, device_type, is_connected in simulated_devices:
             device = WindowsBluetoothDevice(name, address, device_type, is_connected)
-            self.devices.append(device)
-            
-            if self.device_found_callback:
-                self.device_found_callback(device)
+            self._on_device_found(device)
                 
-    def connect_device(self, device: WindowsBluetoothDevice) -> bool:
-        """Connect to a Bluetooth device."""
+    def connect_device(self, device: WindowsBluetoothDevice, priority: Optional[int] = None) -> Future:
+        """
+        Queue a connection to a Bluetooth device.
+        Returns a future that resolves to whether the connect succeeded.
+        Repeated requests for the same device share one future, and known
+        devices are connected before new ones unless a priority is given.
+        """
+        device = self._current(device)
         if device.is_connected:
             self._log(f"{device.name} is already connected")
-            return True
+            future = Future()
+            future.set_result(True)
+            return future
+            
+        if self.connection_scheduler.is_pending(device.address):
+            self._log(f"Connection to {device.name} already in progress")
+        else:
+            self._log(f"Connecting to {device.name}...")
             
-        self._log(f"Connecting to {device.name}...")
+        if priority is None:
+            priority = 0 if device.address in self.known_addresses else 1
+        return self.connection_scheduler.submit(device.address, lambda: self._connect_worker(device), priority)
         
-        # Start connection in background thread
-        threading.Thread(target=self._connect_worker, args=(device,), daemon=True).start()
-        return True
+    def get_connection_metrics(self) -> Dict:
+        """Queue length, in-flight connects and timing of the connection scheduler."""
+        return self.connection_scheduler.get_metrics()
         
-    def _connect_worker(self, device: WindowsBluetoothDevice):
+    def _connect_worker(self, device: WindowsBluetoothDevice) -> bool:
         """Background worker for device connection."""
         try:
-            if self.bluetooth_available:
+            if self._wait_for_backend():
                 success = self._real_connect_device(device)
             else:
                 success = self._simulated_connect_device(device)
                 
             if success:
-                device.is_connected = True
-                if device not in self.connected_devices:
-                    self.connected_devices.append(device)
+                device = self._set_connected(device, True)
+                self.known_addresses.add(device.address)
+                self.known_store.record_connected(device.to_dict())
                     
                 self._log(f"Successfully connected to {device.name}")
                 
@@ -279,9 +376,11 @@ class EnhancedBluetoothManager:
                     self.device_connected_callback(device)
             else:
                 self._log(f"Failed to connect to {device.name}")
+            return success
                 
         except Exception as e:
             self._log(f"Connection error for {device.name}: {e}")
+            return False
             
     def _real_connect_device(self, device: WindowsBluetoothDevice) -> bool:
         """Real device connection using Windows Bluetooth stack."""
@@ -303,17 +402,12 @@ class EnhancedBluetoothManager:
             return False
             
     def _simulated_connect_device(self, device: WindowsBluetoothDevice) -> bool:
-        """Simulate device connection."""
-        # Simulate connection delay
-        time.sleep(2)
-        
-        # Simulate 90% success rate for audio devices, 50% for others
-        import random
-        success_rate = 0.9 if device.is_audio_device else 0.5
-        return random.random() < success_rate
+        """Connect to the device's virtual sink in the device farm."""
+        return self.device_farm.connect(device.address)
         
     def disconnect_device(self, device: WindowsBluetoothDevice) -> bool:
         """Disconnect from a Bluetooth device."""
+        device = self._current(device)
         if not device.is_connected:
             self._log(f"{device.name} is not connected")
             return True
@@ -327,15 +421,13 @@ class EnhancedBluetoothManager:
     def _disconnect_worker(self, device: WindowsBluetoothDevice):
         """Background worker for device disconnection."""
         try:
-            if self.bluetooth_available:
+            if self._wait_for_backend():
                 success = self._real_disconnect_device(device)
             else:
                 success = self._simulated_disconnect_device(device)
                 
             if success:
-                device.is_connected = False
-                if device in self.connected_devices:
-                    self.connected_devices.remove(device)
+                device = self._set_connected(device, False)
                     
                 self._log(f"Successfully disconnected from {device.name}")
                 
@@ -357,27 +449,97 @@ class EnhancedBluetoothManager:
             return False
             
     def _simulated_disconnect_device(self, device: WindowsBluetoothDevice) -> bool:
-        """Simulate device disconnection."""
-        time.sleep(1)
-        return True  # Disconnection usually succeeds
+        """Disconnect the device's virtual sink in the device farm."""
+        return self.device_farm.disconnect(device.address)
+        
+    def _on_simulated_link_lost(self, address: str):
+        """A farm sink dropped its link on its disconnect schedule."""
+        device = self.registry.get(address)
+        if device is None or not device.is_connected:
+            return
+        device = self._set_connected(device, False)
+        self._log(f"Lost connection to {device.name}")
+        if self.device_disconnected_callback:
+            self.device_disconnected_callback(device)
+        
+    def _current(self, device: WindowsBluetoothDevice) -> WindowsBluetoothDevice:
+        """The registry's current entry for a device, which may be newer than the one passed in."""
+        return self.registry.get(device.address) or device
+        
+    def _set_connected(self, device: WindowsBluetoothDevice, connected: bool) -> WindowsBluetoothDevice:
+        """
+        Update the registry and start or stop sampling the device's link.
+        Returns the device object now stored in the registry.
+        """
+        device = self.registry.set_connected(device, connected)
+        if connected:
+            source = self.device_farm.link_quality if self.mode == 'simulated' else None
+            self.link_quality.track(device.address, source)
+            profile = self.latency_profiles.get(device.address)
+            if profile and profile.get('latency') is not None and device.address not in self.device_latencies:
+                self.set_device_latency(device.address, profile['latency'])
+        else:
+            self.link_quality.untrack(device.address)
+        return device
+            
+    def _on_link_sampled(self, address: str):
+        self.registry.update(address, signal_strength=self.link_quality.signal_label(address))
         
-    def get_connected_devices(self) -> List[WindowsBluetoothDevice]:
+    def get_connected_devices(self) -> Tuple[WindowsBluetoothDevice, ...]:
         """Get list of connected devices."""
-        return self.connected_devices.copy()
+        return self.registry.connected_devices
         
-    def get_audio_devices(self) -> List[WindowsBluetoothDevice]:
+    def get_audio_devices(self) -> Tuple[WindowsBluetoothDevice, ...]:
         """Get list of audio-capable devices."""
-        return [device for device in self.devices if device.is_audio_device]
+        return self.registry.audio_devices
         
-    def get_connected_audio_devices(self) -> List[WindowsBluetoothDevice]:
+    def get_connected_audio_devices(self) -> Tuple[WindowsBluetoothDevice, ...]:
         """Get list of connected audio devices."""
-        return [device for device in self.connected_devices if device.is_audio_device]
+        return self.registry.connected_audio_devices
         
     def stop_discovery(self):
         """Stop device discovery."""
         self.is_discovering = False
         self._log("Discovery stopped")
         
+    def add_shutdown_steps(self, coordinator: ShutdownCoordinator, after: Iterable[str] = ()) -> List[str]:
+        """
+        Register this manager's shutdown work: stop discovery and queued
+        connects, disconnect every connected device concurrently, then stop
+        the helper process and the simulated device farm. Queued audio sends
+        are dropped. Returns the names
+        of the registered steps.
+        """
+        after = list(after)
+        discovery = coordinator.add_step("bluetooth.discovery", self.stop_discovery, after)
+        connects = coordinator.add_step("bluetooth.connect_queue", self.connection_scheduler.shutdown, after)
+        disconnects = coordinator.add_group(
+            "bluetooth.disconnect",
+            {device.address: (lambda device=device: self._disconnect_quietly(device))
+             for device in self.registry.connected_devices},
+            [connects]
+        )
+        helper = coordinator.add_step("bluetooth.helper", shutdown_helpers, [discovery] + disconnects)
+        sends = coordinator.add_step("bluetooth.scatter_send", self.scatter_sender.stop, after)
+        farm = coordinator.add_step("bluetooth.device_farm", self.device_farm.stop, disconnects + [sends])
+        return [discovery, connects, sends] + disconnects + [helper, farm]
+        
+    def _disconnect_quietly(self, device: WindowsBluetoothDevice):
+        """Disconnect during shutdown without UI callbacks."""
+        if self._wait_for_backend(timeout=1.0):
+            success = self._real_disconnect_device(device)
+        else:
+            success = self._simulated_disconnect_device(device)
+        if not success:
+            raise RuntimeError(f"Failed to disconnect {device.name}")
+        self._set_connected(device, False)
+        
+    def cleanup(self, deadline: float = 5.0) -> ShutdownReport:
+        """Stop discovery, disconnect all devices and stop the helper within `deadline` seconds."""
+        coordinator = ShutdownCoordinator(deadline)
+        self.add_shutdown_steps(coordinator)
+        return coordinator.run()
+        
     def refresh_device_status(self):
         """Refresh the connection status of all devices."""
         self._log("Refreshing device status...")
@@ -389,68 +551,113 @@ class EnhancedBluetoothManager:
             
     def send_audio_to_device(self, device: WindowsBluetoothDevice, audio_data: bytes) -> bool:
         """Send audio data to a specific device."""
+        device = self._current(device)
         if not device.is_connected or not device.is_audio_device:
             return False
             
         # In real implementation, this would send audio via Bluetooth A2DP
-        # For simulation, just return success
+        if self.mode == 'simulated':
+            return self.device_farm.send(device.address, audio_data)
         return True
         
-    def send_audio_to_all(self, audio_data: bytes) -> int:
-        """Send audio data to all connected audio devices."""
-        success_count = 0
+    def _send_to_address(self, address: str, audio_data: bytes) -> bool:
+        device = self.registry.get(address)
+        return device is not None and self.send_audio_to_device(device, audio_data)
+        
+    def set_device_latency(self, address: str, latency: float):
+        """Output latency of a device; its chunks must be sent that much before their presentation time."""
+        self.device_latencies[address] = latency
+        
+    def get_device_latency(self, address: str) -> float:
+        """
+        Latency used for a device's send deadlines: the value set with
+        set_device_latency() (or restored from its latency profile), else its
+        sampled send-to-arrival latency, else 0.
+        """
+        latency = self.device_latencies.get(address)
+        if latency is None:
+            latency = self.link_quality.smoothed(address, LATENCY)
+        return latency or 0.0
+        
+    def send_audio_to_all(self, audio_data: bytes, pts: Optional[float] = None) -> Dict[str, SendOutcome]:
+        """
+        Send audio data to all connected audio devices concurrently. With a
+        presentation time `pts` (time.monotonic() clock) each device must
+        receive the chunk by pts minus get_device_latency(); otherwise within
+        send_budget. Sends that cannot start in time are dropped, not queued.
+        Returns each device's outcome by address.
+        """
+        now = time.monotonic()
+        devices = self.get_connected_audio_devices()
+        if pts is None:
+            deadlines = {device.address: now + self.send_budget for device in devices}
+        else:
+            deadlines = {device.address: pts - self.get_device_latency(device.address) for device in devices}
+        outcomes = self.scatter_sender.scatter({device.address: audio_data for device in devices}, deadlines)
         
-        for device in self.get_connected_audio_devices():
-            if self.send_audio_to_device(device, audio_data):
-                success_count += 1
-                
-        return success_count
+        for address, outcome in outcomes.items():
+            if outcome.status == PENDING:
+                continue
+            if outcome.duration is not None:
+                self.link_quality.record(address, SEND_TIME, outcome.duration)
+            self.link_quality.record(address, SEND_DROPS, 0.0 if outcome.status in (SENT, MISSED) else 1.0)
+        return outcomes
         
     def get_device_by_address(self, address: str) -> Optional[WindowsBluetoothDevice]:
         """Find device by Bluetooth address."""
-        for device in self.devices:
-            if device.address == address:
-                return device
-        return None
+        return self.registry.get(address)
         
     def get_device_by_name(self, name: str) -> Optional[WindowsBluetoothDevice]:
         """Find device by name."""
-        for device in self.devices:
-            if device.name == name:
-                return device
-        return None
-        
-    def save_known_devices(self, filename: str = "known_devices.json"):
-        """Save known devices to file."""
+        return self.registry.get_by_name(name)
+        
+    def save_known_devices(self, filename: Optional[str] = None) -> bool:
+        """
+        Save known devices to the shared known-device store, and also export
+        them as a JSON device list when a filename is given. Returns whether
+        it worked.
+        """
         try:
             devices_data = [device.to_dict() for device in self.devices]
-            with open(filename, 'w') as f:
-                json.dump(devices_data, f, indent=2)
-            self._log(f"Saved {len(devices_data)} devices to {filename}")
+            self.known_store.upsert_many(devices_data)
+            self.known_addresses.update(data['address'] for data in devices_data)
+            if filename:
+                with open(filename, 'w') as f:
+                    json.dump(devices_data, f, indent=2)
+            self._log(f"Saved {len(devices_data)} devices to {filename or self.known_store.path}")
+            return True
         except Exception as e:
             self._log(f"Failed to save devices: {e}")
             
-    def load_known_devices(self, filename: str = "known_devices.json") -> bool:
-        """Load known devices from file."""
+        return False
+            
+    def load_known_devices(self, filename: Optional[str] = None) -> bool:
+        """
+        Load known devices from the shared known-device store; False if it has
+        none. A JSON device list given as filename is imported into the store
+        first, and loading fails if it has no devices.
+        """
         try:
-            if os.path.exists(filename):
-                with open(filename, 'r') as f:
-                    devices_data = json.load(f)
-                    
-                self.devices.clear()
-                for data in devices_data:
-                    device = WindowsBluetoothDevice(
-                        data['name'], 
-                        data['address'], 
-                        data['type'], 
-                        data.get('is_connected', False)
-                    )
-                    device.signal_strength = data.get('signal_strength', 'Unknown')
-                    device.last_seen = data.get('last_seen', time.time())
-                    self.devices.append(device)
-                    
-                self._log(f"Loaded {len(self.devices)} devices from {filename}")
-                return True
+            if filename and not self.known_store.import_json(filename):
+                self._log(f"No known devices in {filename}")
+                return False
+            
+            devices = []
+            for data in self.known_store.load():
+                device = WindowsBluetoothDevice(data['name'], data['address'], data['device_type'])
+                device.signal_strength = data['signal_strength'] or 'Unknown'
+                device.last_seen = data['last_seen'] or time.time()
+                devices.append(device)
+                
+            if not devices:
+                self._log(f"No known devices in {self.known_store.path}")
+                return False
+                
+            # Connected devices are kept; loaded entries are only known, not connected
+            self.registry.add_many(devices)
+            self.known_addresses.update(device.address for device in devices)
+            self._log(f"Loaded {len(devices)} devices from {self.known_store.path}")
+            return True
         except Exception as e:
             self._log(f"Failed to load devices: {e}")
             
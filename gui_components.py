@@ -8,6 +8,22 @@ from tkinter import ttk, messagebox
 import threading
 from typing import Dict, List, Callable
 
+from link_quality import RSSI, get_link_quality_sampler
+
+
+def signal_text(device: Dict) -> str:
+    """Signal column text: smoothed RSSI and quality label when sampled, else the discovery RSSI."""
+    sampler = get_link_quality_sampler()
+    address = device.get('address', '')
+    rssi = sampler.smoothed(address, RSSI)
+    if rssi is None:
+        rssi = device.get('rssi')
+    label = sampler.signal_label(address)
+    if rssi is None:
+        return label
+    return f"{rssi:.0f} dBm" if label == "Unknown" else f"{rssi:.0f} dBm ({label})"
+
+
 class MusicPlayerGUI:
     def __init__(self, root: tk.Tk, app_controller):
         self.root = root
@@ -23,6 +39,10 @@ class MusicPlayerGUI:
         self.create_widgets()
         self.setup_layout()
         
+        # Keep the signal column current as connected devices are sampled
+        get_link_quality_sampler().add_listener(
+            lambda address: self.root.after(0, self._refresh_device_signal, address))
+        
     def create_widgets(self):
         """Create all GUI widgets."""
         # Main frame
@@ -360,22 +380,52 @@ class MusicPlayerGUI:
         
         # Add new devices
         for i, device in enumerate(devices):
-            audio_support = "✓" if device.get('has_audio', False) else "✗"
-            signal_strength = f"{device.get('rssi', -100)} dBm"
-            
-            self.device_tree.insert(
-                "",
-                "end",
-                text=str(i+1),
-                values=(
-                    device.get('name', 'Unknown'),
-                    device.get('address', ''),
-                    audio_support,
-                    signal_strength
-                )
-            )
-        
-        self.discovered_devices = devices
+            self._insert_device_row(i, device)
+        
+        self.discovered_devices = list(devices)
+    
+    def clear_device_list(self):
+        """Remove all devices from the list display."""
+        for item in self.device_tree.get_children():
+            self.device_tree.delete(item)
+        self.discovered_devices = []
+    
+    def add_device(self, device: Dict):
+        """Add or refresh a single device as it is discovered."""
+        for i, existing in enumerate(self.discovered_devices):
+            if existing.get('address') == device.get('address'):
+                self.discovered_devices[i] = device
+                item = self.device_tree.get_children()[i]
+                self.device_tree.item(item, values=self._device_row_values(device))
+                return
+        
+        self._insert_device_row(len(self.discovered_devices), device)
+        self.discovered_devices.append(device)
+    
+    def _device_row_values(self, device: Dict) -> tuple:
+        audio_support = "✓" if device.get('has_audio', False) else "✗"
+        signal_strength = signal_text(device)
+        return (
+            device.get('name', 'Unknown'),
+            device.get('address', ''),
+            audio_support,
+            signal_strength
+        )
+    
+    def _refresh_device_signal(self, address: str):
+        for i, device in enumerate(self.discovered_devices):
+            if device.get('address') == address:
+                item = self.device_tree.get_children()[i]
+                self.device_tree.item(item, values=self._device_row_values(device))
+                return
+    
+    def _insert_device_row(self, index: int, device: Dict):
+        self.device_tree.insert(
+            "",
+            "end",
+            text=str(index+1),
+            values=self._device_row_values(device)
+        )
     
     def update_connected_devices(self, connected_devices: Dict):
         """Update the connected devices display."""
@@ -452,7 +502,7 @@ class DeviceInfoDialog:
         
         # Signal strength
         ttk.Label(main_frame, text="Signal Strength:", font=("Arial", 10, "bold")).pack(anchor="w")
-        ttk.Label(main_frame, text=f"{device_info.get('rssi', -100)} dBm").pack(anchor="w", pady=(0, 10))
+        ttk.Label(main_frame, text=signal_text(device_info)).pack(anchor="w", pady=(0, 10))
         
         # Services
         ttk.Label(main_frame, text="Available Services:", font=("Arial", 10, "bold")).pack(anchor="w")
@@ -526,6 +576,15 @@ class SettingsDialog:
         bit_depth_combo.grid(row=1, column=1, sticky="ew", padx=(10, 0), pady=5)
         
         quality_frame.grid_columnconfigure(1, weight=1)
+        
+        # Transition between queued tracks
+        playback_frame = ttk.LabelFrame(parent, text="Playback", padding="10")
+        playback_frame.pack(fill="x", padx=10, pady=10)
+        
+        ttk.Label(playback_frame, text="Crossfade (seconds):").pack(side="left")
+        self.crossfade_spinbox = ttk.Spinbox(playback_frame, from_=0, to=12, increment=0.5, width=10)
+        self.crossfade_spinbox.set(f"{getattr(self.app, 'crossfade_seconds', 3.0):g}")
+        self.crossfade_spinbox.pack(side="right")
     
     def create_bluetooth_settings(self, parent):
         """Create bluetooth settings widgets."""
@@ -533,8 +592,8 @@ class SettingsDialog:
         conn_frame = ttk.LabelFrame(parent, text="Connection Settings", padding="10")
         conn_frame.pack(fill="x", padx=10, pady=10)
         
-        auto_reconnect_var = tk.BooleanVar(value=True)
-        ttk.Checkbutton(conn_frame, text="Auto-reconnect to devices", variable=auto_reconnect_var).pack(anchor="w", pady=5)
+        self.auto_reconnect_var = tk.BooleanVar(value=getattr(self.app, 'auto_reconnect', True))
+        ttk.Checkbutton(conn_frame, text="Auto-reconnect to devices", variable=self.auto_reconnect_var).pack(anchor="w", pady=5)
         
         discovery_timeout_frame = ttk.Frame(conn_frame)
         discovery_timeout_frame.pack(fill="x", pady=5)
@@ -546,5 +605,12 @@ class SettingsDialog:
     
     def save_settings(self):
         """Save settings and close dialog."""
-        # Here you would save the settings to the application
+        if hasattr(self.app, 'set_auto_reconnect'):
+            self.app.set_auto_reconnect(self.auto_reconnect_var.get())
+        if hasattr(self.app, 'set_crossfade'):
+            try:
+                self.app.set_crossfade(float(self.crossfade_spinbox.get()))
+            except ValueError:
+                messagebox.showerror("Invalid Setting", "Crossfade must be a number of seconds")
+                return
         self.dialog.destroy()
\ No newline at end of file
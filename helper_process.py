@@ -0,0 +1,355 @@
+"""
+Helper Process Module
+Keeps one long-lived PowerShell process per session and sends it scripts
+over a line-based JSON request/response protocol, so repeated Bluetooth
+operations do not pay PowerShell startup and WinRT type loading each time.
+
+Protocol: one JSON object per line.
+    request:  {"id": 7, "script": "..."}
+    response: {"id": 7, "ok": true, "output": "..."}
+              {"id": 7, "ok": false, "error": "..."}
+Lines on stdout that are not responses (e.g. Write-Host noise) are ignored.
+
+Run `python helper_process.py --fake` for a helper that speaks the same
+protocol without PowerShell, for tests; install it as the shared helper
+with set_powershell_helper().
+"""
+
+import base64
+import json
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+
+# Loaded once when the helper starts instead of in every script
+POWERSHELL_PREAMBLE = r"""
+Add-Type -AssemblyName System.Runtime.WindowsRuntime
+$asTaskGeneric = ([System.WindowsRuntimeSystemExtensions].GetMethods() | ? { $_.Name -eq 'AsTask' -and $_.GetParameters().Count -eq 1 -and $_.GetParameters()[0].ParameterType.Name -eq 'IAsyncOperation`1' })[0]
+Function Await($WinRtTask, $ResultType) {
+    $asTask = $asTaskGeneric.MakeGenericMethod($ResultType)
+    $netTask = $asTask.Invoke($null, @($WinRtTask))
+    $netTask.Wait(-1) | Out-Null
+    $netTask.Result
+}
+
+[Windows.Devices.Bluetooth.BluetoothAdapter,Windows.Devices.Bluetooth,ContentType=WindowsRuntime] | Out-Null
+[Windows.Devices.Bluetooth.BluetoothDevice,Windows.Devices.Bluetooth,ContentType=WindowsRuntime] | Out-Null
+[Windows.Devices.Enumeration.DeviceInformation,Windows.Devices.Enumeration,ContentType=WindowsRuntime] | Out-Null
+"""
+
+POWERSHELL_SERVE_LOOP = r"""
+while ($true) {
+    $line = [Console]::In.ReadLine()
+    if ($line -eq $null) { break }
+    if (-not $line.Trim()) { continue }
+    $request = $line | ConvertFrom-Json
+    try {
+        $output = & ([scriptblock]::Create($request.script)) 2>&1 | Out-String
+        $response = @{ id = $request.id; ok = $true; output = $output }
+    } catch {
+        $response = @{ id = $request.id; ok = $false; error = $_.Exception.Message }
+    }
+    [Console]::Out.WriteLine(($response | ConvertTo-Json -Compress))
+    [Console]::Out.Flush()
+}
+"""
+
+
+class HelperError(Exception):
+    """A helper request failed, timed out, or the helper could not be started."""
+
+
+class HelperTimeout(HelperError):
+    """A helper request did not answer in time; the helper has been restarted."""
+
+
+class HelperProcess:
+    """
+    A long-lived helper process driven over stdin/stdout. Requests carry IDs
+    so responses are matched even if they arrive out of order; a reader
+    thread resolves waiting futures. A helper that exits is restarted on the
+    next request, and one that times out is killed and restarted so a hung
+    script cannot block later calls.
+    """
+
+    def __init__(self, command: List[str], name: str = "helper", default_timeout: float = 30.0,
+                 startup_timeout: float = 20.0):
+        self.command = command
+        self.name = name
+        self.default_timeout = default_timeout
+        self.startup_timeout = startup_timeout
+
+        self.process: Optional[subprocess.Popen] = None
+        self.reader_thread: Optional[threading.Thread] = None
+        self.pending: Dict[int, Future] = {}
+        self.next_id = 1
+        self.ready = False  # Set once the current process has answered a request
+        self.lock = threading.Lock()
+
+        # Session statistics
+        self.starts = 0
+        self.requests = 0
+        self.timeouts = 0
+
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Start the helper process if it is not already running."""
+        with self.lock:
+            self._start_locked()
+
+    def _start_locked(self):
+        if self.is_running():
+            return
+        try:
+            self.process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding='utf-8',
+                # The console may emit OEM code page bytes; never let them kill the reader
+                errors='replace',
+                bufsize=1
+            )
+        except OSError as e:
+            self.process = None
+            raise HelperError(f"Could not start {self.name}: {e}")
+
+        self.starts += 1
+        self.ready = False
+        self.reader_thread = threading.Thread(target=self._read_responses, args=(self.process,), daemon=True)
+        self.reader_thread.start()
+
+    def _read_responses(self, process: subprocess.Popen):
+        """Resolve pending requests from the helper's stdout until it exits."""
+        for line in process.stdout:
+            try:
+                response = json.loads(line)
+                request_id = response['id']
+            except (ValueError, KeyError, TypeError):
+                continue
+
+            with self.lock:
+                if self.process is process:
+                    self.ready = True
+                future = self.pending.pop(request_id, None)
+            if future is None:
+                continue
+            if response.get('ok'):
+                future.set_result(response.get('output', ''))
+            else:
+                future.set_exception(HelperError(response.get('error', 'Unknown helper error')))
+
+        # The helper exited; fail anything still waiting on this process
+        with self.lock:
+            if self.process is process:
+                orphaned = list(self.pending.values())
+                self.pending.clear()
+            else:
+                orphaned = []
+        for future in orphaned:
+            if not future.done():
+                future.set_exception(HelperError(f"{self.name} exited"))
+
+    def submit(self, script: str) -> Future:
+        """Send a script without waiting; the future resolves to its output."""
+        future = Future()
+        with self.lock:
+            self._start_locked()
+            request_id = self.next_id
+            self.next_id += 1
+            self.pending[request_id] = future
+            self.requests += 1
+            try:
+                self.process.stdin.write(json.dumps({'id': request_id, 'script': script}) + "\n")
+                self.process.stdin.flush()
+            except (OSError, ValueError) as e:
+                self.pending.pop(request_id, None)
+                future.set_exception(HelperError(f"Could not send request to {self.name}: {e}"))
+        return future
+
+    def call(self, script: str, timeout: Optional[float] = None) -> str:
+        """Run a script in the helper and return its output."""
+        timeout = self.default_timeout if timeout is None else timeout
+        # Until the helper has answered once, allow for it starting up
+        wait_time = timeout if self.ready and self.is_running() else timeout + self.startup_timeout
+        future = self.submit(script)
+        try:
+            return future.result(timeout=wait_time)
+        except FutureTimeoutError:
+            self.timeouts += 1
+            print(f"{self.name} request timed out after {timeout:g}s, restarting helper")
+            self.restart()
+            raise HelperTimeout(f"{self.name} request timed out")
+
+    def restart(self):
+        """Kill the helper; the next request starts a fresh one."""
+        self.stop(graceful=False)
+
+    def stop(self, graceful: bool = True, timeout: float = 2.0):
+        """Stop the helper, closing stdin first so it can exit on its own."""
+        with self.lock:
+            process = self.process
+            self.process = None
+            orphaned = list(self.pending.values())
+            self.pending.clear()
+
+        for future in orphaned:
+            if not future.done():
+                future.set_exception(HelperError(f"{self.name} stopped"))
+
+        if process is None:
+            return
+        try:
+            if graceful:
+                process.stdin.close()
+                process.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+    def get_stats(self) -> Dict:
+        return {
+            'running': self.is_running(),
+            'starts': self.starts,
+            'requests': self.requests,
+            'timeouts': self.timeouts
+        }
+
+
+def powershell_script_command(script: str) -> List[str]:
+    """Command line that runs one PowerShell script, passed encoded to avoid quoting issues."""
+    encoded = base64.b64encode(script.encode('utf-16-le')).decode('ascii')
+    return ["powershell", "-NoLogo", "-NoProfile", "-NonInteractive",
+            "-ExecutionPolicy", "Bypass", "-EncodedCommand", encoded]
+
+
+def powershell_command() -> List[str]:
+    """Command line for a PowerShell helper with the preamble preloaded."""
+    return powershell_script_command(POWERSHELL_PREAMBLE + POWERSHELL_SERVE_LOOP)
+
+
+def fake_helper_command() -> List[str]:
+    """Command line for the fake helper implemented by this module."""
+    return [sys.executable, __file__, "--fake"]
+
+
+_shared_helper: Optional[HelperProcess] = None
+_shared_lock = threading.Lock()
+
+
+def get_powershell_helper() -> HelperProcess:
+    """
+    The session-wide PowerShell helper used by the Bluetooth managers,
+    started on first use. Raises HelperError off Windows unless a helper was
+    installed with set_powershell_helper().
+    """
+    global _shared_helper
+    with _shared_lock:
+        if _shared_helper is None:
+            if sys.platform != 'win32':
+                raise HelperError("PowerShell helper is only available on Windows")
+            _shared_helper = HelperProcess(powershell_command(), name="PowerShell helper")
+        return _shared_helper
+
+
+def set_powershell_helper(helper: Optional[HelperProcess]) -> Optional[HelperProcess]:
+    """
+    Replace the shared helper, e.g. with one running fake_helper_command()
+    in tests. Returns the previous helper, which the caller should stop.
+    """
+    global _shared_helper
+    with _shared_lock:
+        previous = _shared_helper
+        _shared_helper = helper
+    return previous
+
+
+def shutdown_helpers():
+    """Stop the shared helper if one was started."""
+    global _shared_helper
+    with _shared_lock:
+        helper = _shared_helper
+        _shared_helper = None
+    if helper:
+        helper.stop()
+
+
+def run_fake_helper():
+    """
+    Serve the helper protocol without PowerShell. Scripts are answered by
+    simple rules so callers can be exercised off Windows:
+      'sleep <seconds>' sleeps, 'fail <message>' returns an error,
+      'exit' terminates the helper, 'pid' returns the process ID;
+      anything mentioning Enable-PnpDevice reports SUCCESS, one mentioning
+      Disable-PnpDevice reports "DISCONNECTED <id>" for each quoted
+      instance id in it, and any other script returns no output.
+    """
+    import os
+    import re
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            continue
+        script = request.get('script', '').strip()
+        response = {'id': request.get('id'), 'ok': True, 'output': ''}
+
+        if script.startswith('sleep '):
+            time.sleep(float(script.split()[1]))
+        elif script.startswith('fail'):
+            response = {'id': request.get('id'), 'ok': False, 'error': script[4:].strip() or 'failed'}
+        elif script == 'exit':
+            break
+        elif script == 'pid':
+            response['output'] = f"{os.getpid()}\n"
+        elif 'Enable-PnpDevice' in script:
+            response['output'] = "SUCCESS\n"
+        elif 'Disable-PnpDevice' in script:
+            instance_ids = re.findall(r"'([0-9A-Fa-f]{12})'", script)
+            response['output'] = "".join(f"DISCONNECTED {instance_id}\n" for instance_id in instance_ids)
+
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+
+
+# Exercise the helper protocol with the fake helper
+if __name__ == "__main__":
+    if "--fake" in sys.argv:
+        run_fake_helper()
+        sys.exit(0)
+
+    helper = HelperProcess(fake_helper_command(), name="Fake helper", default_timeout=2.0)
+
+    start = time.perf_counter()
+    pids = {helper.call('pid').strip() for _ in range(50)}
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"50 requests in {elapsed:.0f} ms served by {len(pids)} process(es)")
+
+    try:
+        helper.call('fail no such device')
+    except HelperError as e:
+        print(f"Error response: {e}")
+
+    try:
+        helper.call('sleep 5', timeout=0.5)
+    except HelperError as e:
+        print(f"Timeout: {e}")
+    print(f"After restart: pid {helper.call('pid').strip()}")
+
+    helper.submit('exit')
+    time.sleep(0.2)
+    print(f"After helper exit: pid {helper.call('pid').strip()}")
+    print(helper.get_stats())
+    helper.stop()
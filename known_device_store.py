@@ -0,0 +1,186 @@
+"""
+Known Device Store Module
+One SQLite database of known Bluetooth devices shared by every frontend.
+Saves upsert rows in place, one transaction per batch, so a save never
+rewrites the whole list and a crash mid-write leaves the previous batch intact.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+SCHEMA_VERSION = 1
+
+# Columns callers may ask load() for
+DEVICE_FIELDS = ('address', 'name', 'device_type', 'is_audio_device', 'signal_strength',
+                 'last_seen', 'last_connected', 'connect_count')
+
+# JSON device lists written by earlier versions, imported once into a new store
+LEGACY_FILES = ("known_devices.json", "music_host_devices.json")
+
+
+class KnownDeviceStore:
+    """SQLite-backed table of known devices keyed by address."""
+
+    def __init__(self, path: str = "known_devices.db", legacy_files: Sequence[str] = LEGACY_FILES):
+        self.path = path
+        self.lock = threading.Lock()
+        is_new = not os.path.exists(path)
+
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+        if is_new:
+            for filename in legacy_files:
+                self.import_json(filename)
+
+    def _create_schema(self):
+        with self.lock:
+            version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                return
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS devices (
+                    address TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    device_type TEXT NOT NULL DEFAULT 'Unknown',
+                    is_audio_device INTEGER NOT NULL DEFAULT 0,
+                    signal_strength TEXT,
+                    last_seen REAL,
+                    last_connected REAL,
+                    connect_count INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def upsert(self, device: Dict):
+        """Insert or update one device from a to_dict()-style record."""
+        self.upsert_many([device])
+
+    def upsert_many(self, devices: Iterable[Dict]):
+        """Insert or update several devices in one atomic transaction."""
+        rows = [(
+            device['address'],
+            device.get('name') or 'Unknown',
+            device.get('type', device.get('device_type', 'Unknown')),
+            int(bool(device.get('is_audio_device', device.get('has_audio', False)))),
+            device.get('signal_strength'),
+            device.get('last_seen', time.time())
+        ) for device in devices]
+        if not rows:
+            return
+        with self.lock:
+            with self._transaction():
+                self.connection.executemany("""
+                    INSERT INTO devices (address, name, device_type, is_audio_device, signal_strength, last_seen)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(address) DO UPDATE SET
+                        name = excluded.name,
+                        device_type = excluded.device_type,
+                        is_audio_device = excluded.is_audio_device,
+                        signal_strength = COALESCE(excluded.signal_strength, devices.signal_strength),
+                        last_seen = MAX(COALESCE(devices.last_seen, 0), excluded.last_seen)
+                """, rows)
+
+    def record_connected(self, device: Dict):
+        """Upsert a device and count a successful connection to it."""
+        with self.lock:
+            with self._transaction():
+                self.connection.execute("""
+                    INSERT INTO devices (address, name, device_type, is_audio_device, last_seen,
+                                         last_connected, connect_count)
+                    VALUES (?, ?, ?, ?, ?, ?, 1)
+                    ON CONFLICT(address) DO UPDATE SET
+                        name = excluded.name,
+                        last_seen = excluded.last_seen,
+                        last_connected = excluded.last_connected,
+                        connect_count = devices.connect_count + 1
+                """, (device['address'], device.get('name') or 'Unknown',
+                      device.get('type', device.get('device_type', 'Unknown')),
+                      int(bool(device.get('is_audio_device', device.get('has_audio', False)))),
+                      time.time(), time.time()))
+
+    def _transaction(self):
+        return _Transaction(self.connection)
+
+    def load(self, fields: Sequence[str] = ('address', 'name', 'device_type', 'signal_strength', 'last_seen'),
+             order_by_recent: bool = True) -> List[Dict]:
+        """Load only the requested fields for every device, most recently used first."""
+        unknown = [field for field in fields if field not in DEVICE_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown device fields: {unknown}")
+        order = " ORDER BY COALESCE(last_connected, 0) DESC, last_seen DESC" if order_by_recent else ""
+        with self.lock:
+            cursor = self.connection.execute(f"SELECT {', '.join(fields)} FROM devices{order}")
+            return [dict(zip(fields, row)) for row in cursor.fetchall()]
+
+    def get(self, address: str) -> Optional[Dict]:
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT {', '.join(DEVICE_FIELDS)} FROM devices WHERE address = ?", (address,)).fetchone()
+        return dict(zip(DEVICE_FIELDS, row)) if row else None
+
+    def addresses(self) -> Set[str]:
+        """Addresses of all known devices; cheap enough to call at startup."""
+        with self.lock:
+            return {row[0] for row in self.connection.execute("SELECT address FROM devices")}
+
+    def remove(self, address: str):
+        with self.lock:
+            self.connection.execute("DELETE FROM devices WHERE address = ?", (address,))
+
+    def count(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM devices").fetchone()[0]
+
+    def import_json(self, filename: str) -> int:
+        """Import a legacy JSON device list; returns how many devices were imported."""
+        try:
+            if not os.path.exists(filename):
+                return 0
+            with open(filename, 'r') as f:
+                devices_data = json.load(f)
+            devices = [data for data in devices_data if data.get('address')]
+            self.upsert_many(devices)
+            print(f"Imported {len(devices)} known devices from {filename}")
+            return len(devices)
+        except Exception as e:
+            print(f"Error importing known devices from {filename}: {e}")
+            return 0
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back if the block raises."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+_shared_store: Optional[KnownDeviceStore] = None
+_shared_lock = threading.Lock()
+
+
+def get_known_device_store() -> KnownDeviceStore:
+    """The store shared by every frontend in this process."""
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = KnownDeviceStore()
+        return _shared_store
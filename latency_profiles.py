@@ -0,0 +1,108 @@
+"""
+Latency Profiles Module
+Persists measured latency, drift and the stream format (sample rate,
+channels, bit depth) they were measured with per device, so a device is in
+sync as soon as it connects, before any recalibration.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+PROFILE_VERSION = 1
+
+
+class LatencyProfileStore:
+    """Small JSON store of per-device calibration profiles keyed by address."""
+
+    def __init__(self, filename: str = "device_profiles.json", max_age: float = 30 * 24 * 3600,
+                 save_interval: float = 10.0):
+        self.filename = filename
+        self.max_age = max_age  # Profiles older than this are stale
+        self.save_interval = save_interval
+        self.profiles: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+        self._dirty = False
+        self._last_save = 0.0
+        self.load()
+
+    @staticmethod
+    def _key(device_address: str) -> str:
+        return device_address.upper()
+
+    def load(self):
+        """Load profiles from disk, discarding files written by another schema version."""
+        try:
+            if os.path.exists(self.filename):
+                with open(self.filename, 'r') as f:
+                    data = json.load(f)
+                if data.get('version') == PROFILE_VERSION:
+                    self.profiles = data.get('devices', {})
+                else:
+                    print(f"Ignoring device profiles with version {data.get('version')}")
+        except Exception as e:
+            print(f"Error loading device profiles: {e}")
+            self.profiles = {}
+
+    def save(self):
+        """Write profiles to disk atomically."""
+        with self.lock:
+            data = {'version': PROFILE_VERSION, 'saved_at': time.time(), 'devices': dict(self.profiles)}
+            self._dirty = False
+            self._last_save = time.monotonic()
+        try:
+            temp_filename = self.filename + ".tmp"
+            with open(temp_filename, 'w') as f:
+                json.dump(data, f)
+            os.replace(temp_filename, self.filename)
+        except Exception as e:
+            print(f"Error saving device profiles: {e}")
+
+    def flush(self):
+        """Save if there are unsaved updates."""
+        if self._dirty:
+            self.save()
+
+    def get(self, device_address: str, include_stale: bool = False) -> Optional[Dict]:
+        """Return a device's profile, or None if unknown (or stale, unless requested)."""
+        with self.lock:
+            profile = self.profiles.get(self._key(device_address))
+        if profile is None:
+            return None
+        if not include_stale and self.is_stale(profile):
+            return None
+        return dict(profile)
+
+    def is_stale(self, profile: Dict) -> bool:
+        """Whether a profile is too old to trust without recalibration."""
+        return time.time() - profile.get('updated_at', 0) > self.max_age
+
+    def update(self, device_address: str, latency: Optional[float] = None, drift: Optional[float] = None,
+               codec: Optional[Dict] = None, source: str = 'measured'):
+        """Record new calibration values; saves at most once per save_interval."""
+        with self.lock:
+            key = self._key(device_address)
+            profile = self.profiles.setdefault(key, {'measurements': 0})
+            if latency is not None:
+                profile['latency'] = latency
+            if drift is not None:
+                profile['drift'] = drift
+            if codec is not None:
+                profile['codec'] = codec
+            profile['source'] = source
+            profile['measurements'] = profile.get('measurements', 0) + 1
+            profile['updated_at'] = time.time()
+            self._dirty = True
+            save_due = time.monotonic() - self._last_save >= self.save_interval
+
+        if save_due:
+            self.save()
+
+    def remove(self, device_address: str):
+        """Forget a device's profile."""
+        with self.lock:
+            self.profiles.pop(self._key(device_address), None)
+            self._dirty = True
+        self.save()
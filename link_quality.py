@@ -0,0 +1,283 @@
+"""
+Link Quality Module
+Samples the link quality of connected devices on one shared schedule. Each
+device keeps a fixed-size ring buffer per metric with an EWMA of the
+values, so bitrate choices, the signal column and device selection can all
+read a smoothed, current view without querying the devices themselves.
+
+Metrics come from two places: a per-device source polled every interval
+(e.g. DeviceFarm.link_quality) and values recorded by the send path, which
+are averaged per interval before they are stored.
+"""
+
+import threading
+import time
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Metric names
+RSSI = 'rssi'              # dBm
+LATENCY = 'latency'        # Seconds from send to arrival
+LOSS = 'loss'              # Fraction of chunks lost on the link
+SEND_TIME = 'send_time'    # Seconds the host spent in one send call
+SEND_DROPS = 'send_drops'  # Fraction of chunks failed or dropped before sending
+
+# RSSI range mapped onto a 0..1 score
+RSSI_FLOOR = -90.0
+RSSI_CEILING = -50.0
+
+
+class RingSeries:
+    """Fixed-capacity time series of (time, value) in two float arrays, plus an EWMA."""
+
+    __slots__ = ('times', 'values', 'start', 'count', 'alpha', 'ewma')
+
+    def __init__(self, capacity: int = 120, alpha: float = 0.2):
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.start = 0
+        self.count = 0
+        self.alpha = alpha
+        self.ewma: Optional[float] = None
+
+    def append(self, at: float, value: float):
+        capacity = len(self.values)
+        index = (self.start + self.count) % capacity
+        if self.count < capacity:
+            self.count += 1
+        else:
+            self.start = (self.start + 1) % capacity
+        self.times[index] = at
+        self.values[index] = value
+        self.ewma = value if self.ewma is None else self.ewma + self.alpha * (value - self.ewma)
+
+    def latest(self) -> Optional[Tuple[float, float]]:
+        if not self.count:
+            return None
+        index = (self.start + self.count - 1) % len(self.values)
+        return self.times[index], self.values[index]
+
+    def items(self) -> List[Tuple[float, float]]:
+        """All samples, oldest first."""
+        capacity = len(self.values)
+        return [(self.times[(self.start + i) % capacity], self.values[(self.start + i) % capacity])
+                for i in range(self.count)]
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class DeviceLink:
+    """Series and pending send-path values of one device."""
+
+    __slots__ = ('address', 'source', 'series', 'pending', 'tracked')
+
+    def __init__(self, address: str, source: Optional[Callable[[str], Optional[Dict[str, float]]]]):
+        self.address = address
+        self.source = source
+        self.series: Dict[str, RingSeries] = {}
+        self.pending: Dict[str, List[float]] = {}  # metric -> [sum, count] since the last sample
+        self.tracked = True
+
+
+class LinkQualitySampler:
+    """
+    Polls every tracked device once per `interval` on a single thread. The
+    thread starts when the first device is tracked and exits when none are;
+    untracked devices keep their history until forgotten.
+    """
+
+    def __init__(self, interval: float = 1.0, capacity: int = 120, alpha: float = 0.2):
+        self.interval = interval
+        self.capacity = capacity
+        self.alpha = alpha
+
+        self.links: Dict[str, DeviceLink] = {}
+        self.condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._listeners: List[Callable[[str], None]] = []
+
+    @staticmethod
+    def _key(address: str) -> str:
+        return address.upper()
+
+    def track(self, address: str, source: Optional[Callable[[str], Optional[Dict[str, float]]]] = None):
+        """Start sampling a device, polling `source(address)` for metrics if given."""
+        with self.condition:
+            link = self.links.get(self._key(address))
+            if link is None:
+                link = self.links[self._key(address)] = DeviceLink(address, source)
+            link.source = source
+            link.tracked = True
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._sample_loop, daemon=True, name="link-quality")
+                self._thread.start()
+            self.condition.notify_all()
+
+    def untrack(self, address: str):
+        """Stop sampling a device; its history stays readable."""
+        with self.condition:
+            link = self.links.get(self._key(address))
+            if link is not None:
+                link.tracked = False
+                link.pending.clear()
+
+    def forget(self, address: str):
+        with self.condition:
+            self.links.pop(self._key(address), None)
+
+    def record(self, address: str, metric: str, value: float):
+        """Add a send-path value; values are averaged into one sample per interval."""
+        link = self.links.get(self._key(address))
+        if link is None or not link.tracked:
+            return
+        with self.condition:
+            total = link.pending.get(metric)
+            if total is None:
+                link.pending[metric] = [value, 1]
+            else:
+                total[0] += value
+                total[1] += 1
+
+    def add_listener(self, listener: Callable[[str], None]):
+        """Call `listener(address)` after each new sample of a device."""
+        with self.condition:
+            self._listeners.append(listener)
+
+    def sample_now(self) -> int:
+        """Take one sample of every tracked device; returns how many were sampled."""
+        with self.condition:
+            links = [link for link in self.links.values() if link.tracked]
+        now = time.monotonic()
+        sampled = []
+        for link in links:
+            polled = None
+            if link.source is not None:
+                try:
+                    polled = link.source(link.address)
+                except Exception as e:
+                    print(f"Link quality source error for {link.address}: {e}")
+            with self.condition:
+                values = dict(polled or {})
+                for metric, (total, count) in link.pending.items():
+                    values[metric] = total / count
+                link.pending.clear()
+                for metric, value in values.items():
+                    if value is None:
+                        continue
+                    series = link.series.get(metric)
+                    if series is None:
+                        series = link.series[metric] = RingSeries(self.capacity, self.alpha)
+                    series.append(now, float(value))
+            if values:
+                sampled.append(link.address)
+
+        for address in sampled:
+            for listener in list(self._listeners):
+                try:
+                    listener(address)
+                except Exception as e:
+                    print(f"Link quality listener error: {e}")
+        return len(sampled)
+
+    def _sample_loop(self):
+        next_sample = time.monotonic()
+        while True:
+            with self.condition:
+                while not self._stopped and any(link.tracked for link in self.links.values()):
+                    remaining = next_sample - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if self._stopped or not any(link.tracked for link in self.links.values()):
+                    self._thread = None
+                    return
+            self.sample_now()
+            # Fixed schedule; skip missed ticks instead of sampling in a burst
+            next_sample += self.interval
+            now = time.monotonic()
+            if next_sample < now:
+                next_sample = now + self.interval
+
+    def stop(self):
+        with self.condition:
+            self._stopped = True
+            self.condition.notify_all()
+
+    # Readers
+
+    def series(self, address: str, metric: str) -> Optional[RingSeries]:
+        link = self.links.get(self._key(address))
+        return link.series.get(metric) if link is not None else None
+
+    def smoothed(self, address: str, metric: str) -> Optional[float]:
+        """EWMA of a metric, or None if it was never sampled."""
+        series = self.series(address, metric)
+        return series.ewma if series is not None else None
+
+    def quality_score(self, address: str) -> Optional[float]:
+        """
+        0 (unusable) to 1 (excellent) from whichever of RSSI, loss, send
+        drops and send time have been sampled; None if nothing has.
+        """
+        parts = []
+        rssi = self.smoothed(address, RSSI)
+        if rssi is not None:
+            parts.append((rssi - RSSI_FLOOR) / (RSSI_CEILING - RSSI_FLOOR))
+        for metric, worst in ((LOSS, 0.1), (SEND_DROPS, 0.1), (SEND_TIME, 0.05)):
+            value = self.smoothed(address, metric)
+            if value is not None:
+                parts.append(1.0 - value / worst)
+        if not parts:
+            return None
+        score = 1.0
+        for part in parts:
+            score *= min(1.0, max(0.0, part))
+        return score
+
+    def signal_label(self, address: str) -> str:
+        """'Strong', 'Medium', 'Weak' or 'Unknown', for display."""
+        score = self.quality_score(address)
+        if score is None:
+            return "Unknown"
+        if score >= 0.66:
+            return "Strong"
+        return "Medium" if score >= 0.33 else "Weak"
+
+    def best_devices(self, addresses: List[str], count: Optional[int] = None) -> List[str]:
+        """Addresses ordered by quality score, best first; unsampled devices last."""
+        ranked = sorted(addresses, key=lambda address: -(self.quality_score(address) or -1.0))
+        return ranked if count is None else ranked[:count]
+
+
+_sampler: Optional[LinkQualitySampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_link_quality_sampler() -> LinkQualitySampler:
+    """The sampler shared by every manager in this process."""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = LinkQualitySampler()
+        return _sampler
+
+
+# Sample a small simulated farm
+if __name__ == "__main__":
+    from device_farm import DeviceFarm
+
+    farm = DeviceFarm.default()
+    sampler = LinkQualitySampler(interval=0.2)
+    connected = [address for address in farm.sinks if farm.connect(address, wait=False)]
+    for address in connected:
+        sampler.track(address, farm.link_quality)
+    time.sleep(1.5)
+    for address in connected:
+        sink = farm.sinks[address]
+        print(f"{sink.spec.name:22s} rssi {sampler.smoothed(address, RSSI):6.1f} dBm  "
+              f"samples {len(sampler.series(address, RSSI))}  {sampler.signal_label(address)}")
+    print("Best:", [farm.sinks[address].spec.name for address in sampler.best_devices(connected, 3)])
+    sampler.stop()
+    farm.stop()
@@ -0,0 +1,246 @@
+"""
+Loudness Analysis Module
+EBU R128 / ReplayGain 2.0 loudness measurement with a per-file gain cache.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Optional
+
+from startup_profiler import lazy_import
+
+np = lazy_import("numpy")
+
+# ReplayGain 2.0 reference level; EBU R128 broadcast uses -23 LUFS
+DEFAULT_TARGET_LUFS = -18.0
+
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+BLOCK_SECONDS = 0.4
+BLOCK_OVERLAP = 0.75
+
+
+def k_weighting_coefficients(sample_rate: int):
+    """
+    Return the two biquad stages (b, a) of the BS.1770 K-weighting filter:
+    a high-shelf "head" filter followed by the RLB high-pass.
+    """
+    # Stage 1: high shelf
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / sample_rate)
+    vh = 10.0 ** (gain_db / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+    shelf_b = [(vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0]
+    shelf_a = [1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+
+    # Stage 2: high pass
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / sample_rate)
+    a0 = 1.0 + k / q + k * k
+    highpass_b = [1.0, -2.0, 1.0]
+    highpass_a = [1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+
+    return [(shelf_b, shelf_a), (highpass_b, highpass_a)]
+
+
+def _frequency_response(sample_rate: int, fft_size: int) -> np.ndarray:
+    """Complex K-weighting response at the rfft bins of an fft_size transform."""
+    z_inv = np.exp(-2j * np.pi * np.fft.rfftfreq(fft_size))
+    response = np.ones_like(z_inv)
+    for b, a in k_weighting_coefficients(sample_rate):
+        numerator = b[0] + b[1] * z_inv + b[2] * z_inv ** 2
+        denominator = a[0] + a[1] * z_inv + a[2] * z_inv ** 2
+        response *= numerator / denominator
+    return response
+
+
+def k_weight(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    Apply K-weighting to (frames, channels) audio in the frequency domain.
+    The signal is zero-padded by one second so circular wrap-around of the
+    filter's impulse response stays below the measurement floor.
+    """
+    frames = len(samples)
+    fft_size = 1 << int(math.ceil(math.log2(frames + sample_rate)))
+    spectrum = np.fft.rfft(samples, n=fft_size, axis=0)
+    spectrum *= _frequency_response(sample_rate, fft_size)[:, None]
+    return np.fft.irfft(spectrum, n=fft_size, axis=0)[:frames]
+
+
+def integrated_loudness(samples: np.ndarray, sample_rate: int) -> float:
+    """
+    Gated integrated loudness in LUFS (BS.1770-4). Returns -inf for silence
+    or audio shorter than one 400 ms block.
+    """
+    if samples.ndim == 1:
+        samples = samples[:, None]
+
+    block = int(BLOCK_SECONDS * sample_rate)
+    step = int(block * (1.0 - BLOCK_OVERLAP))
+    if len(samples) < block:
+        return float('-inf')
+
+    filtered = k_weight(samples.astype(np.float64), sample_rate)
+
+    # Mean square of every overlapping block from one cumulative sum
+    energy = np.concatenate([np.zeros((1, filtered.shape[1])), np.cumsum(filtered ** 2, axis=0)])
+    starts = np.arange(0, len(filtered) - block + 1, step)
+    block_power = ((energy[starts + block] - energy[starts]) / block).sum(axis=1)
+
+    with np.errstate(divide='ignore'):
+        block_loudness = -0.691 + 10.0 * np.log10(block_power)
+
+    above_absolute = block_loudness > ABSOLUTE_GATE_LUFS
+    if not above_absolute.any():
+        return float('-inf')
+
+    relative_gate = -0.691 + 10.0 * np.log10(block_power[above_absolute].mean()) + RELATIVE_GATE_LU
+    gated = block_power[above_absolute & (block_loudness > relative_gate)]
+    return float(-0.691 + 10.0 * np.log10(gated.mean()))
+
+
+def track_gain_db(loudness: float, peak: float, target: float = DEFAULT_TARGET_LUFS) -> float:
+    """Gain that brings a track to the target loudness without clipping its peak."""
+    if not math.isfinite(loudness):
+        return 0.0
+    gain = target - loudness
+    if peak > 0:
+        gain = min(gain, -20.0 * math.log10(peak))
+    return gain
+
+
+def analyze_file(file_path: str, sample_rate: int = 44100, target: float = DEFAULT_TARGET_LUFS) -> Dict:
+    """Decode and measure one file. Runs inside pool worker processes."""
+    from audio_engine import decode_audio_file
+
+    samples = decode_audio_file(file_path, sample_rate)
+    loudness = integrated_loudness(samples, sample_rate)
+    peak = float(np.abs(samples).max()) if len(samples) else 0.0
+    return {
+        'loudness': loudness if math.isfinite(loudness) else None,
+        'peak': peak,
+        'gain_db': track_gain_db(loudness, peak, target),
+        'target': target
+    }
+
+
+class LoudnessCache:
+    """Per-file loudness results keyed by path and validated by size and mtime."""
+
+    def __init__(self, filename: str = "loudness_cache.json"):
+        self.filename = filename
+        self.entries: Dict[str, Dict] = {}
+        self.load()
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.normcase(os.path.abspath(file_path))
+
+    @staticmethod
+    def _signature(file_path: str):
+        stat = os.stat(file_path)
+        return stat.st_size, stat.st_mtime
+
+    def load(self):
+        """Load cached entries from disk."""
+        try:
+            if os.path.exists(self.filename):
+                with open(self.filename, 'r') as f:
+                    self.entries = json.load(f)
+        except Exception as e:
+            print(f"Error loading loudness cache: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Write cached entries to disk."""
+        try:
+            temp_filename = self.filename + ".tmp"
+            with open(temp_filename, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(temp_filename, self.filename)
+        except Exception as e:
+            print(f"Error saving loudness cache: {e}")
+
+    def get(self, file_path: str) -> Optional[Dict]:
+        """Return the cached result, or None if missing or the file has changed."""
+        entry = self.entries.get(self._key(file_path))
+        if not entry:
+            return None
+        try:
+            size, mtime = self._signature(file_path)
+        except OSError:
+            return None
+        if entry.get('size') != size or entry.get('mtime') != mtime:
+            return None
+        return entry
+
+    def put(self, file_path: str, result: Dict):
+        """Store an analysis result for a file."""
+        size, mtime = self._signature(file_path)
+        entry = dict(result)
+        entry.update({'size': size, 'mtime': mtime, 'analyzed_at': time.time()})
+        self.entries[self._key(file_path)] = entry
+
+    def get_gain(self, file_path: str) -> float:
+        """Linear gain for a file, or 1.0 if it has not been analyzed."""
+        entry = self.get(file_path)
+        if not entry:
+            return 1.0
+        return 10.0 ** (entry.get('gain_db', 0.0) / 20.0)
+
+
+def analyze_library(file_paths: Iterable[str], cache: Optional[LoudnessCache] = None,
+                    max_workers: Optional[int] = None, target: float = DEFAULT_TARGET_LUFS,
+                    progress_callback: Optional[Callable[[str, Dict], None]] = None) -> Dict[str, Dict]:
+    """
+    Analyze every file not already in the cache using a process pool.
+    Returns the results for all files, cached or new.
+    """
+    cache = cache or LoudnessCache()
+    results = {}
+    pending = []
+
+    for file_path in file_paths:
+        entry = cache.get(file_path)
+        if entry and entry.get('target') == target:
+            results[file_path] = entry
+        else:
+            pending.append(file_path)
+
+    if pending:
+        print(f"Analyzing loudness of {len(pending)} files...")
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(analyze_file, path, 44100, target): path for path in pending}
+            for future in as_completed(futures):
+                file_path = futures[future]
+                try:
+                    result = future.result()
+                    cache.put(file_path, result)
+                    results[file_path] = result
+                    if progress_callback:
+                        progress_callback(file_path, result)
+                except Exception as e:
+                    print(f"Error analyzing {os.path.basename(file_path)}: {e}")
+        cache.save()
+
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    paths = sys.argv[1:]
+    if not paths:
+        print("Usage: python loudness.py <audio files...>")
+        sys.exit(1)
+
+    for path, result in analyze_library(paths).items():
+        loudness = result['loudness']
+        loudness_text = f"{loudness:.1f} LUFS" if loudness is not None else "silent"
+        print(f"{os.path.basename(path)}: {loudness_text}, gain {result['gain_db']:+.1f} dB")
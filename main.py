@@ -13,16 +13,23 @@ Author: Python Software Developer
 Version: 1.0
 """
 
+from startup_profiler import get_startup_profiler, lazy_import
+startup = get_startup_profiler("main")  # Imported first so the imports below are timed
+
 import sys
 import os
 import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import pygame
 import time
+from collections import deque
 from bluetooth_manager import BluetoothManager
-from audio_engine import AudioEngine
+from audio_engine import AudioEngine, pcm16_bytes
 from gui_components import MusicPlayerGUI
+from reconnect_supervisor import ReconnectSupervisor
+from shutdown_coordinator import ShutdownCoordinator
+
+pygame = lazy_import("pygame")
 
 class BluetoothMusicPlayer:
     def __init__(self):
@@ -42,6 +49,26 @@ class BluetoothMusicPlayer:
         self.is_playing = False
         self.is_paused = False
         
+        # The engine's decoded, scheduled chunks go out through the Bluetooth manager
+        self.audio_engine.chunk_sink = self._send_chunk
+        
+        # Files selected after the first play in order, crossfading into each other
+        self.playlist = deque()
+        self.crossfade_seconds = self.audio_engine.crossfade.duration
+        self.audio_engine.track_changed_callback = self._on_track_changed
+        
+        # Reconnect dropped devices and rejoin them to the running stream
+        self.auto_reconnect = True
+        self.reconnect_supervisor = ReconnectSupervisor(
+            connect=self.bluetooth_manager.connect_device,
+            is_connected=self.bluetooth_manager.is_link_alive,
+            on_link_lost=self._on_link_lost,
+            on_reconnected=self._on_device_reconnected,
+            on_gave_up=self._on_reconnect_gave_up
+        )
+        self.bluetooth_manager.link_lost_callback = self.reconnect_supervisor.report_link_lost
+        self.reconnect_supervisor.start()
+        
         # Setup window close event
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
@@ -49,9 +76,19 @@ class BluetoothMusicPlayer:
         """Discover available Bluetooth audio devices."""
         try:
             self.gui.update_status("Discovering Bluetooth devices...")
-            devices = self.bluetooth_manager.discover_audio_devices()
-            self.gui.update_device_list(devices)
-            self.gui.update_status(f"Found {len(devices)} Bluetooth audio devices")
+            self.root.after(0, self.gui.clear_device_list)
+            
+            # Show devices as they are found instead of after the whole scan
+            devices = {}
+            started = time.perf_counter()
+            for device in self.bluetooth_manager.iter_audio_devices():
+                if not devices:
+                    startup.mark('first_discovery', since=started)
+                devices[device['address']] = device
+                self.root.after(0, self.gui.add_device, device)
+            
+            devices = list(devices.values())
+            self.root.after(0, self.gui.update_status, f"Found {len(devices)} Bluetooth audio devices")
             return devices
         except Exception as e:
             messagebox.showerror("Error", f"Failed to discover devices: {str(e)}")
@@ -68,6 +105,9 @@ class BluetoothMusicPlayer:
                         'name': device_name,
                         'connected': True
                     }
+                    # Warm-start sync from the device's saved latency profile
+                    self.audio_engine.on_device_connected(device_address)
+                    self.reconnect_supervisor.watch(device_address)
                     self.gui.update_connected_devices(self.connected_devices)
                     self.gui.update_status(f"Connected to {device_name}")
                     return True
@@ -85,6 +125,8 @@ class BluetoothMusicPlayer:
         """Disconnect from a specific Bluetooth device."""
         try:
             if device_address in self.connected_devices:
+                self.reconnect_supervisor.unwatch(device_address)
+                self.audio_engine.remove_stream_device(device_address)
                 success = self.bluetooth_manager.disconnect_device(device_address)
                 if success:
                     device_name = self.connected_devices[device_address]['name']
@@ -99,11 +141,41 @@ class BluetoothMusicPlayer:
             messagebox.showerror("Error", f"Disconnection failed: {str(e)}")
             return False
     
+    def set_auto_reconnect(self, enabled: bool):
+        """Enable or disable automatic reconnection of dropped devices."""
+        self.auto_reconnect = enabled
+        self.reconnect_supervisor.set_enabled(enabled)
+    
+    def _on_link_lost(self, device_address):
+        """Drop a lost device from the stream; the other devices keep playing."""
+        self.audio_engine.remove_stream_device(device_address)
+        device = self.connected_devices.get(device_address)
+        if device:
+            device['connected'] = False
+            self.root.after(0, self.gui.update_status, f"Lost connection to {device['name']}, reconnecting...")
+    
+    def _on_device_reconnected(self, device_address):
+        """Rejoin a reconnected device to the stream at the current presentation time."""
+        self.audio_engine.on_device_connected(device_address)
+        if self.is_playing:
+            self.audio_engine.add_stream_device(device_address)
+        device = self.connected_devices.get(device_address)
+        if device:
+            device['connected'] = True
+            self.root.after(0, self.gui.update_status, f"Reconnected to {device['name']}")
+    
+    def _on_reconnect_gave_up(self, device_address):
+        """Forget a device that could not be reconnected."""
+        device = self.connected_devices.pop(device_address, None)
+        if device:
+            self.root.after(0, self.gui.update_connected_devices, self.connected_devices)
+            self.root.after(0, self.gui.update_status, f"Could not reconnect to {device['name']}")
+    
     def load_music_file(self):
-        """Load a music file for playback."""
+        """Load one or more music files; the first plays and the rest are queued."""
         try:
-            file_path = filedialog.askopenfilename(
-                title="Select Music File",
+            file_paths = filedialog.askopenfilenames(
+                title="Select Music Files",
                 filetypes=[
                     ("Audio Files", "*.mp3 *.wav *.ogg *.m4a"),
                     ("MP3 Files", "*.mp3"),
@@ -113,18 +185,44 @@ class BluetoothMusicPlayer:
                 ]
             )
             
-            if file_path:
+            if file_paths:
+                file_path = file_paths[0]
                 self.current_song = file_path
                 song_name = os.path.basename(file_path)
                 self.gui.update_current_song(song_name)
                 self.audio_engine.load_file(file_path)
-                self.gui.update_status(f"Loaded: {song_name}")
+                self.playlist = deque(file_paths[1:])
+                self._queue_next_track()
+                queued = f" ({len(file_paths) - 1} more queued)" if len(file_paths) > 1 else ""
+                self.gui.update_status(f"Loaded: {song_name}{queued}")
                 return True
             return False
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load music file: {str(e)}")
             return False
     
+    def _queue_next_track(self):
+        """Hand the next playlist file to the engine so it is decoded before the crossfade."""
+        if self.playlist:
+            self.audio_engine.queue_next(self.playlist.popleft())
+    
+    def _on_track_changed(self, file_path):
+        """The engine moved on to the queued track (called on its stream thread)."""
+        def update():
+            self.current_song = file_path
+            self.gui.update_current_song(os.path.basename(file_path))
+            self._queue_next_track()
+        self.root.after(0, update)
+    
+    def _send_chunk(self, device_address, chunk):
+        """Engine chunk sink: send one scheduled chunk to a device as 16-bit PCM."""
+        self.bluetooth_manager.send_audio_data(device_address, pcm16_bytes(chunk, self.audio_engine.volume))
+    
+    def set_crossfade(self, seconds: float):
+        """Crossfade length between queued tracks; 0 plays them back to back."""
+        self.crossfade_seconds = seconds
+        self.audio_engine.set_crossfade(seconds)
+    
     def play_music(self):
         """Start playing music to all connected devices."""
         try:
@@ -186,13 +284,14 @@ class BluetoothMusicPlayer:
             if self.is_playing:
                 self.stop_music()
             
-            # Disconnect all devices
-            for device_address in list(self.connected_devices.keys()):
-                self.disconnect_device(device_address)
-            
-            # Cleanup
-            self.audio_engine.cleanup()
-            self.bluetooth_manager.cleanup()
+            # Shut down in dependency order within one deadline; the Bluetooth
+            # manager disconnects all devices together
+            coordinator = ShutdownCoordinator(deadline=5.0)
+            supervisor = coordinator.add_step("reconnect_supervisor", self.reconnect_supervisor.stop)
+            audio = coordinator.add_step("audio_engine", self.audio_engine.cleanup, [supervisor])
+            self.bluetooth_manager.add_shutdown_steps(coordinator, after=[supervisor, audio])
+            coordinator.run()
+            self.connected_devices.clear()
             
         except Exception as e:
             print(f"Error during cleanup: {e}")
@@ -202,17 +301,24 @@ class BluetoothMusicPlayer:
     def run(self):
         """Start the application."""
         try:
-            # Initialize pygame mixer
-            pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=1024)
-            
-            # Start the GUI
+            # Start the GUI; the mixer (and pygame) starts once the window is up
             self.gui.update_status("Application started - Click 'Discover Devices' to begin")
+            self.root.after_idle(self._on_window_shown)
             self.root.mainloop()
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to start application: {str(e)}")
             sys.exit(1)
 
+    def _on_window_shown(self):
+        """Record time to first window, then initialize the pygame mixer."""
+        startup.mark('first_window')
+        try:
+            pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=1024)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to start audio output: {str(e)}")
+            self.root.destroy()
+
 def main():
     """Main entry point."""
     try:
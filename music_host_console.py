@@ -4,11 +4,14 @@ Professional console application for streaming audio to multiple Bluetooth devic
 Works without GUI dependencies
 """
 
+from startup_profiler import get_startup_profiler
+startup = get_startup_profiler("music_host_console")  # Imported first so the imports below are timed
+
 import os
 import sys
 import time
 import threading
-import json
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from datetime import datetime
 
 # Import our backend modules
@@ -77,7 +80,9 @@ except ImportError as e:
             if device not in self.connected_devices:
                 self.connected_devices.append(device)
                 device.is_connected = True
-            return True
+            future = Future()
+            future.set_result(True)
+            return future
             
         def disconnect_device(self, device):
             if device in self.connected_devices:
@@ -90,6 +95,16 @@ except ImportError as e:
             
         def get_connected_audio_devices(self):
             return [d for d in self.connected_devices if d.is_audio_device]
+            
+        def save_known_devices(self):
+            return True
+            
+        def load_known_devices(self):
+            return False
+
+
+# Seconds to wait for a queued connect before giving up on reporting it
+CONNECT_TIMEOUT = 40.0
 
 
 class ConsoleMusicHost:
@@ -99,6 +114,7 @@ class ConsoleMusicHost:
         self.running = True
         self.is_streaming = False
         self.current_volume = 75
+        self._discovery_started = None
         
         # Initialize backend systems
         self.audio_capture = WindowsAudioCapture()
@@ -169,7 +185,10 @@ class ConsoleMusicHost:
         print("Scanning for nearby Bluetooth audio devices...")
         
         # Start discovery
+        self._discovery_started = time.perf_counter()
         devices = self.bluetooth_manager.discover_devices(duration=3)
+        if devices:
+            startup.mark('first_discovery', since=self._discovery_started)
         
         # Simulate discovery progress
         for i in range(3):
@@ -232,12 +251,13 @@ class ConsoleMusicHost:
                 device = devices[device_index]
                 print(f"\n🔄 Connecting to {device.name}...")
                 
-                # Simulate connection time
-                for i in range(3):
-                    print(".", end="", flush=True)
-                    time.sleep(0.5)
-                    
-                success = self.bluetooth_manager.connect_device(device)
+                # Connects are queued; wait for this one to finish before reporting
+                try:
+                    success = self.bluetooth_manager.connect_device(device).result(timeout=CONNECT_TIMEOUT)
+                except FutureTimeoutError:
+                    print(f"\n⏱️ Connection to {device.name} is still in progress")
+                    input("\nPress Enter to continue...")
+                    return
                 if success:
                     print(f"\n✅ Successfully connected to {device.name}!")
                     self.stats['devices_connected'] += 1
@@ -455,20 +475,16 @@ class ConsoleMusicHost:
         choice = input("\nEnter choice: ").strip()
         
         if choice == "5":
-            try:
-                devices_data = [device.to_dict() for device in self.bluetooth_manager.devices]
-                with open("music_host_devices.json", 'w') as f:
-                    json.dump(devices_data, f, indent=2)
+            # Devices are kept in the known-device store shared with the GUI
+            if self.bluetooth_manager.save_known_devices():
                 print("✅ Device list saved successfully!")
-            except Exception as e:
-                print(f"❌ Failed to save device list: {e}")
+            else:
+                print("❌ Failed to save device list")
                 
         elif choice == "6":
             try:
-                if os.path.exists("music_host_devices.json"):
-                    with open("music_host_devices.json", 'r') as f:
-                        devices_data = json.load(f)
-                    print(f"✅ Loaded {len(devices_data)} devices from file")
+                if self.bluetooth_manager.load_known_devices():
+                    print(f"✅ Loaded {len(self.bluetooth_manager.devices)} devices")
                 else:
                     print("❌ No saved device list found")
             except Exception as e:
@@ -479,7 +495,8 @@ class ConsoleMusicHost:
     # Callback handlers
     def on_device_found(self, device):
         """Handle device found."""
-        pass
+        if self._discovery_started is not None:
+            startup.mark('first_discovery', since=self._discovery_started)
         
     def on_device_connected(self, device):
         """Handle device connected."""
@@ -500,6 +517,7 @@ class ConsoleMusicHost:
                 self.clear_screen()
                 self.print_header()
                 self.print_menu()
+                startup.mark('first_window')
                 
                 choice = input("\nEnter your choice (0-10): ").strip()
                 
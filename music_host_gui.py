@@ -6,6 +6,9 @@ This application captures any audio playing on Windows and streams it
 to multiple connected Bluetooth devices simultaneously.
 """
 
+from startup_profiler import get_startup_profiler
+startup = get_startup_profiler("music_host_gui")  # Imported first so the imports below are timed
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import threading
@@ -17,6 +20,9 @@ import subprocess
 import sys
 from pathlib import Path
 
+from device_farm import DeviceFarm
+from reconnect_supervisor import ReconnectSupervisor
+
 class MusicHostGUI:
     def __init__(self):
         self.root = tk.Tk()
@@ -33,6 +39,23 @@ class MusicHostGUI:
         self.connected_devices = []
         self.is_streaming = False
         
+        # Simulated devices, the same farm the Bluetooth managers use in simulation mode
+        self.device_farm = DeviceFarm.default()
+        self.device_addresses = {sink.spec.name: address for address, sink in self.device_farm.sinks.items()}
+        
+        # Reconnect devices whose link drops while auto-connect is on
+        self.reconnect_supervisor = ReconnectSupervisor(
+            connect=self._connect_device_worker,
+            is_connected=self._is_link_alive,
+            on_link_lost=lambda device_name: self.root.after(
+                0, self.update_status, f"Lost connection to {device_name}, reconnecting...")
+        )
+        self.device_farm.link_lost_callback = self._on_link_lost
+        self.reconnect_supervisor.set_enabled(self.var_auto_connect.get())
+        self.var_auto_connect.trace_add(
+            'write', lambda *args: self.reconnect_supervisor.set_enabled(self.var_auto_connect.get()))
+        self.reconnect_supervisor.start()
+        
     def setup_window(self):
         """Configure main window properties."""
         self.root.title("Music Host by Nadeemal - Universal Audio Streaming")
@@ -511,22 +534,19 @@ Stream any Windows audio to multiple Bluetooth devices simultaneously.
         
     def _discover_devices_worker(self):
         """Background worker for device discovery."""
-        # Simulate device discovery
-        discovered_devices = [
-            ("JBL Charge 4", "Speaker", "Available", "Strong"),
-            ("Sony WH-1000XM4", "Headphones", "Available", "Medium"),
-            ("Samsung Galaxy Buds", "Earbuds", "Available", "Weak"),
-            ("Bose SoundLink", "Speaker", "Paired", "Strong"),
-            ("AirPods Pro", "Earbuds", "Available", "Medium")
-        ]
+        started = time.perf_counter()
         
         # Clear existing items
         self.root.after(0, lambda: self.available_tree.delete(*self.available_tree.get_children()))
         
-        # Add discovered devices with delay for realistic effect
-        for i, (name, device_type, status, signal) in enumerate(discovered_devices):
-            time.sleep(0.5)  # Simulate discovery time
-            self.root.after(0, lambda n=name, t=device_type, s=status, sig=signal: 
+        # Add devices as the simulated scan sees them
+        discovered_devices = []
+        for spec in self.device_farm.discover(duration=3.0):
+            if not discovered_devices:
+                startup.mark('first_discovery', since=started)
+            discovered_devices.append(spec)
+            status = "Connected" if self.device_farm.is_connected(spec.address) else "Available"
+            self.root.after(0, lambda n=spec.name, t=spec.device_type, s=status, sig=spec.signal_strength:
                           self.available_tree.insert('', 'end', text=n, values=(t, s, sig)))
         
         # Re-enable button
@@ -552,13 +572,17 @@ Stream any Windows audio to multiple Bluetooth devices simultaneously.
         # Simulate connection process
         threading.Thread(target=self._connect_device_worker, args=(device_name,), daemon=True).start()
         
-    def _connect_device_worker(self, device_name):
+    def _connect_device_worker(self, device_name) -> bool:
         """Background worker for device connection."""
-        time.sleep(2)  # Simulate connection time
+        address = self.device_addresses.get(device_name)
+        if address is None or not self.device_farm.connect(address):
+            self.root.after(0, self.update_status, f"Failed to connect to {device_name}")
+            return False
         
         # Add to connected devices
         if device_name not in self.connected_devices:
             self.connected_devices.append(device_name)
+            self.reconnect_supervisor.watch(device_name)
             
             # Update UI
             self.root.after(0, lambda: [
@@ -566,6 +590,7 @@ Stream any Windows audio to multiple Bluetooth devices simultaneously.
                 self.update_status(f"Connected to {device_name}"),
                 self.update_connection_indicator()
             ])
+        return True
         
     def disconnect_device(self):
         """Disconnect selected device."""
@@ -576,11 +601,24 @@ Stream any Windows audio to multiple Bluetooth devices simultaneously.
             
         device_name = self.available_tree.item(selection[0])['text']
         if device_name in self.connected_devices:
+            self.reconnect_supervisor.unwatch(device_name)
+            self.device_farm.disconnect(self.device_addresses[device_name])
             self.connected_devices.remove(device_name)
             self.update_connected_devices_display()
             self.update_status(f"Disconnected from {device_name}")
             self.update_connection_indicator()
         
+    def _is_link_alive(self, device_name) -> bool:
+        """Whether the device's link is actually up, not just listed as connected here."""
+        address = self.device_addresses.get(device_name)
+        return address is not None and self.device_farm.is_connected(address)
+        
+    def _on_link_lost(self, address):
+        """A simulated device dropped its link; reconnect it without waiting for the next poll."""
+        for device_name, device_address in self.device_addresses.items():
+            if device_address == address:
+                self.reconnect_supervisor.report_link_lost(device_name)
+        
     def test_device_audio(self):
         """Test audio on selected device."""
         selection = self.available_tree.selection()
@@ -725,10 +763,13 @@ Stream any Windows audio to multiple Bluetooth devices simultaneously.
             # Minimize to tray instead of closing
             self.root.withdraw()
         else:
+            self.reconnect_supervisor.stop()
+            self.device_farm.stop()
             self.root.destroy()
             
     def run(self):
         """Start the application."""
+        self.root.after_idle(startup.mark, 'first_window')
         self.root.mainloop()
 
 
@@ -3,6 +3,9 @@ Music Host by Nadeemal - Main Application
 Professional Windows application for streaming audio to multiple Bluetooth devices
 """
 
+from startup_profiler import get_startup_profiler
+startup = get_startup_profiler("music_host_main")  # Imported first so the imports below are timed
+
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
@@ -10,15 +13,12 @@ import time
 import sys
 import os
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from shutdown_coordinator import ShutdownCoordinator
 
-# Import our custom modules
-try:
-    from audio_capture import WindowsAudioCapture, AudioStreamProcessor
-    from enhanced_bluetooth import EnhancedBluetoothManager, WindowsBluetoothDevice
-except ImportError as e:
-    print(f"Import error: {e}")
-    print("Make sure all module files are in the same directory")
-    sys.exit(1)
+if TYPE_CHECKING:
+    from enhanced_bluetooth import WindowsBluetoothDevice
 
 class MusicHostApplication:
     """Main application class integrating all components."""
@@ -27,20 +27,44 @@ class MusicHostApplication:
         self.root = tk.Tk()
         self.setup_window()
         
-        # Initialize backend systems
+        # Initialize GUI
+        self.setup_gui()
+        
+        # Application state
+        self.is_streaming = False
+        self.current_volume = 75
+        self._discovery_started: Optional[float] = None
+        
+        # Draw the window before loading the capture and Bluetooth backends
+        self.root.update()
+        startup.mark('first_window')
+        self.load_backends()
+        
+    def load_backends(self):
+        """Import and start the capture and Bluetooth backends."""
+        try:
+            from audio_capture import WindowsAudioCapture, AudioStreamProcessor
+            from enhanced_bluetooth import EnhancedBluetoothManager
+        except ImportError as e:
+            print(f"Import error: {e}")
+            print("Make sure all module files are in the same directory")
+            sys.exit(1)
+            
         self.audio_capture = WindowsAudioCapture()
         self.bluetooth_manager = EnhancedBluetoothManager()
         self.stream_processor = AudioStreamProcessor()
         
         # Setup callbacks
         self.setup_callbacks()
+        self.root.after(2000, self.refresh_signal_column)
         
-        # Initialize GUI
-        self.setup_gui()
-        
-        # Application state
-        self.is_streaming = False
-        self.current_volume = 75
+    def refresh_signal_column(self):
+        """Show the sampled signal strength of connected devices, every 2 seconds."""
+        for device in self.bluetooth_manager.get_connected_devices():
+            # Rows are keyed by address, so devices sharing a name stay apart
+            if self.device_tree.exists(device.address):
+                self.device_tree.item(device.address, values=(device.device_type, "Connected", device.signal_strength))
+        self.root.after(2000, self.refresh_signal_column)
         
     def setup_window(self):
         """Configure main window."""
@@ -394,6 +418,7 @@ class MusicHostApplication:
             self.device_tree.delete(item)
             
         # Start discovery
+        self._discovery_started = time.perf_counter()
         self.bluetooth_manager.discover_devices(duration=8)
         
         # Re-enable button after delay
@@ -413,11 +438,8 @@ class MusicHostApplication:
             messagebox.showwarning("No Selection", "Please select a device to connect.")
             return
             
-        item = self.device_tree.item(selection[0])
-        device_name = item['text']
-        
-        # Find device object
-        device = self.bluetooth_manager.get_device_by_name(device_name)
+        # Find device object; rows are keyed by address
+        device = self.bluetooth_manager.get_device_by_address(selection[0])
         if device:
             self.bluetooth_manager.connect_device(device)
         else:
@@ -430,10 +452,7 @@ class MusicHostApplication:
             messagebox.showwarning("No Selection", "Please select a device to disconnect.")
             return
             
-        item = self.device_tree.item(selection[0])
-        device_name = item['text']
-        
-        device = self.bluetooth_manager.get_device_by_name(device_name)
+        device = self.bluetooth_manager.get_device_by_address(selection[0])
         if device:
             self.bluetooth_manager.disconnect_device(device)
         else:
@@ -498,22 +517,29 @@ class MusicHostApplication:
         self.current_volume = int(float(value))
         
     # Callback handlers
-    def on_device_found(self, device: WindowsBluetoothDevice):
+    def on_device_found(self, device: 'WindowsBluetoothDevice'):
         """Handle device found."""
+        if self._discovery_started is not None:
+            startup.mark('first_discovery', since=self._discovery_started)
         def update_ui():
             status_icon = "🔗" if device.is_connected else "📱"
             if device.is_audio_device:
                 status_icon = "🎵" if device.is_connected else "🔊"
                 
             status_text = "Connected" if device.is_connected else "Available"
+            values = (device.device_type, status_text, device.signal_strength)
             
-            self.device_tree.insert('', 'end', 
-                                  text=f"{status_icon} {device.name}",
-                                  values=(device.device_type, status_text, device.signal_strength))
+            # A device seen again updates its row instead of adding a duplicate
+            if self.device_tree.exists(device.address):
+                self.device_tree.item(device.address, text=f"{status_icon} {device.name}", values=values)
+            else:
+                self.device_tree.insert('', 'end', iid=device.address,
+                                      text=f"{status_icon} {device.name}",
+                                      values=values)
                                   
         self.root.after(0, update_ui)
         
-    def on_device_connected(self, device: WindowsBluetoothDevice):
+    def on_device_connected(self, device: 'WindowsBluetoothDevice'):
         """Handle device connected."""
         def update_ui():
             self.update_connected_devices_display()
@@ -521,14 +547,12 @@ class MusicHostApplication:
             self.update_stats(f"Connected: {device.name}")
             
             # Update tree view
-            for item in self.device_tree.get_children():
-                if device.name in self.device_tree.item(item)['text']:
-                    self.device_tree.item(item, values=(device.device_type, "Connected", device.signal_strength))
-                    break
+            if self.device_tree.exists(device.address):
+                self.device_tree.item(device.address, values=(device.device_type, "Connected", device.signal_strength))
                     
         self.root.after(0, update_ui)
         
-    def on_device_disconnected(self, device: WindowsBluetoothDevice):
+    def on_device_disconnected(self, device: 'WindowsBluetoothDevice'):
         """Handle device disconnected."""
         def update_ui():
             self.update_connected_devices_display()
@@ -536,10 +560,8 @@ class MusicHostApplication:
             self.update_stats(f"Disconnected: {device.name}")
             
             # Update tree view
-            for item in self.device_tree.get_children():
-                if device.name in self.device_tree.item(item)['text']:
-                    self.device_tree.item(item, values=(device.device_type, "Available", device.signal_strength))
-                    break
+            if self.device_tree.exists(device.address):
+                self.device_tree.item(device.address, values=(device.device_type, "Available", device.signal_strength))
                     
         self.root.after(0, update_ui)
         
@@ -630,8 +652,11 @@ class MusicHostApplication:
         if self.is_streaming:
             self.stop_streaming()
             
-        # Cleanup
-        self.audio_capture.cleanup()
+        # Capture and Bluetooth clean up concurrently within one deadline
+        coordinator = ShutdownCoordinator(deadline=5.0)
+        coordinator.add_step("audio_capture", self.audio_capture.cleanup)
+        self.bluetooth_manager.add_shutdown_steps(coordinator)
+        coordinator.run()
         
         # Close application
         self.root.destroy()
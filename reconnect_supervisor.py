@@ -0,0 +1,199 @@
+"""
+Reconnect Supervisor Module
+Watches connected devices for link loss and reconnects them with jittered
+exponential backoff, reporting each loss and recovery through callbacks.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+
+class _WatchedDevice:
+    """Link state and backoff bookkeeping for one device."""
+
+    __slots__ = ('address', 'state', 'attempts', 'next_attempt', 'lost_at', 'reconnects')
+
+    def __init__(self, address: str):
+        self.address = address
+        self.state = 'connected'  # connected, reconnecting, connecting or failed
+        self.attempts = 0
+        self.next_attempt = 0.0
+        self.lost_at: Optional[float] = None
+        self.reconnects = 0
+
+
+class ReconnectSupervisor:
+    """
+    Polls `is_connected(address)` for every watched device. When a link
+    drops, `connect(address)` is retried after delays of base_delay,
+    2 * base_delay, ... up to max_delay, each randomly shortened by up to
+    `jitter` so several dropped devices do not retry in lockstep.
+    """
+
+    def __init__(self, connect: Callable[[str], bool], is_connected: Callable[[str], bool],
+                 on_link_lost: Optional[Callable[[str], None]] = None,
+                 on_reconnected: Optional[Callable[[str], None]] = None,
+                 on_gave_up: Optional[Callable[[str], None]] = None,
+                 check_interval: float = 1.0, base_delay: float = 1.0, max_delay: float = 60.0,
+                 jitter: float = 0.5, max_attempts: Optional[int] = None, max_concurrent: int = 2):
+        self.connect = connect
+        self.is_connected = is_connected
+        self.on_link_lost = on_link_lost
+        self.on_reconnected = on_reconnected
+        self.on_gave_up = on_gave_up
+        self.check_interval = check_interval
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.max_attempts = max_attempts  # None retries forever
+
+        self.enabled = True
+        self.devices: Dict[str, _WatchedDevice] = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the monitoring thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._monitor_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop monitoring; reconnect attempts already running finish on their own."""
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=self.check_interval + 1.0)
+        self.executor.shutdown(wait=False)
+
+    def set_enabled(self, enabled: bool):
+        """Turn auto-reconnect on or off without forgetting watched devices."""
+        self.enabled = enabled
+        print(f"Auto-reconnect {'enabled' if enabled else 'disabled'}")
+
+    def watch(self, address: str):
+        """Supervise a device that is currently connected."""
+        with self.lock:
+            device = self.devices.get(address)
+            if device is None:
+                self.devices[address] = _WatchedDevice(address)
+            elif device.state != 'connecting':
+                # A manual reconnect; an attempt in progress settles the state itself
+                device.state = 'connected'
+                device.attempts = 0
+
+    def unwatch(self, address: str):
+        """Stop supervising a device, e.g. after the user disconnects it."""
+        with self.lock:
+            self.devices.pop(address, None)
+
+    def report_link_lost(self, address: str):
+        """Signal a lost link immediately instead of waiting for the next poll."""
+        with self.lock:
+            device = self.devices.get(address)
+            if device is None or device.state != 'connected':
+                return
+            self._mark_lost(device)
+        self._notify(self.on_link_lost, address)
+
+    def backoff_delay(self, attempts: int) -> float:
+        """Delay before the next attempt after `attempts` failures."""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempts))
+        return delay * (1.0 - self.jitter * random.random())
+
+    def _mark_lost(self, device: _WatchedDevice):
+        device.state = 'reconnecting'
+        device.attempts = 0
+        device.lost_at = time.monotonic()
+        device.next_attempt = device.lost_at + self.backoff_delay(0)
+        print(f"Lost link to {device.address}, reconnecting")
+
+    def _monitor_loop(self):
+        while not self._stop_event.wait(self.check_interval):
+            if self.enabled:
+                self.check_devices()
+
+    def check_devices(self):
+        """Detect dropped links and start any reconnect attempts that are due."""
+        with self.lock:
+            devices = list(self.devices.values())
+
+        now = time.monotonic()
+        for device in devices:
+            if device.state == 'connected':
+                if self._safe_is_connected(device.address):
+                    continue
+                with self.lock:
+                    if device.state != 'connected':
+                        continue
+                    self._mark_lost(device)
+                self._notify(self.on_link_lost, device.address)
+            elif device.state == 'reconnecting' and now >= device.next_attempt:
+                with self.lock:
+                    device.state = 'connecting'
+                self.executor.submit(self._attempt, device)
+
+    def _safe_is_connected(self, address: str) -> bool:
+        try:
+            return self.is_connected(address)
+        except Exception as e:
+            print(f"Link check for {address} failed: {e}")
+            return False
+
+    def _attempt(self, device: _WatchedDevice):
+        """Run one reconnect attempt and schedule the next on failure."""
+        try:
+            success = self.connect(device.address)
+        except Exception as e:
+            print(f"Reconnect to {device.address} failed: {e}")
+            success = False
+
+        with self.lock:
+            if self.devices.get(device.address) is not device:
+                return  # Unwatched while the attempt was running
+            device.attempts += 1
+            if success:
+                downtime = time.monotonic() - device.lost_at
+                device.state = 'connected'
+                device.reconnects += 1
+                print(f"Reconnected to {device.address} after {device.attempts} attempt(s), "
+                      f"{downtime:.1f}s offline")
+            elif self.max_attempts is not None and device.attempts >= self.max_attempts:
+                device.state = 'failed'
+                print(f"Giving up on {device.address} after {device.attempts} attempts")
+            else:
+                device.state = 'reconnecting'
+                device.next_attempt = time.monotonic() + self.backoff_delay(device.attempts)
+
+        if success:
+            self._notify(self.on_reconnected, device.address)
+        elif device.state == 'failed':
+            self._notify(self.on_gave_up, device.address)
+
+    @staticmethod
+    def _notify(callback: Optional[Callable[[str], None]], address: str):
+        if callback:
+            try:
+                callback(address)
+            except Exception as e:
+                print(f"Reconnect callback error for {address}: {e}")
+
+    def get_status(self) -> Dict[str, Dict]:
+        """Per-device link state, attempt count and seconds until the next attempt."""
+        now = time.monotonic()
+        with self.lock:
+            return {
+                address: {
+                    'state': device.state,
+                    'attempts': device.attempts,
+                    'reconnects': device.reconnects,
+                    'next_attempt_in': max(0.0, device.next_attempt - now) if device.state == 'reconnecting' else None
+                }
+                for address, device in self.devices.items()
+            }
@@ -0,0 +1,225 @@
+"""
+Scatter Send Module
+Sends one audio chunk to many devices at once. Each device has its own send
+lane, so a stalled socket only delays that device. Every send carries a
+deadline derived from the chunk's presentation time: a send that cannot
+start before its deadline is dropped rather than queued, and each device's
+outcome is reported with its timing.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+# Outcome statuses
+SENT = 'sent'          # Finished before the deadline
+MISSED = 'missed'      # Sent, but finished after the deadline
+LATE = 'late'          # Dropped without sending; the deadline had passed
+FAILED = 'failed'      # The send itself failed
+PENDING = 'pending'    # Still queued or sending when scatter() returned
+
+
+class SendOutcome:
+    """What happened to one device's send, updated in place by its lane."""
+
+    __slots__ = ('address', 'status', 'deadline', 'queued_at', 'started_at', 'finished_at', 'error')
+
+    def __init__(self, address: str, deadline: float, queued_at: float):
+        self.address = address
+        self.status = PENDING
+        self.deadline = deadline
+        self.queued_at = queued_at
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds spent in the send call."""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    @property
+    def slack(self) -> Optional[float]:
+        """Seconds to spare before the deadline (negative if it was missed)."""
+        if self.finished_at is None:
+            return None
+        return self.deadline - self.finished_at
+
+    def to_dict(self) -> Dict:
+        return {'address': self.address, 'status': self.status, 'wait': (self.started_at or self.queued_at) - self.queued_at,
+                'duration': self.duration, 'slack': self.slack, 'error': self.error}
+
+    def __repr__(self):
+        return f"SendOutcome({self.address}, {self.status})"
+
+
+class _Batch:
+    """Counts outstanding sends of one scatter() call."""
+
+    def __init__(self, count: int):
+        self.remaining = count
+        self.condition = threading.Condition()
+
+    def done(self):
+        with self.condition:
+            self.remaining -= 1
+            if self.remaining <= 0:
+                self.condition.notify_all()
+
+    def wait(self, until: float, clock: Callable[[], float]) -> bool:
+        with self.condition:
+            while self.remaining > 0:
+                remaining = until - clock()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            return True
+
+
+class _Lane:
+    """Queued sends for one device, served by one worker thread."""
+
+    def __init__(self, address: str, lock: threading.Lock):
+        self.address = address
+        self.queue: deque = deque()  # (outcome, data, batch)
+        self.thread: Optional[threading.Thread] = None
+        # Shares the sender's lock, but only this lane's worker waits on it
+        self.condition = threading.Condition(lock)
+
+
+class ScatterSender:
+    """
+    Fans chunks out through `send(address, data) -> bool` with one lane per
+    device. At most `max_queued` chunks wait behind a busy send; older ones
+    are dropped as late. Lane threads start on demand and exit when idle.
+    """
+
+    def __init__(self, send: Callable[[str, bytes], bool], max_queued: int = 2,
+                 idle_timeout: float = 5.0, clock: Callable[[], float] = time.monotonic):
+        self.send = send
+        self.max_queued = max_queued
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+
+        self.lanes: Dict[str, _Lane] = {}
+        self.lock = threading.Lock()
+        self._stopped = False
+        self.stats = {SENT: 0, MISSED: 0, LATE: 0, FAILED: 0}
+
+    def scatter(self, chunks: Dict[str, bytes], deadlines: Dict[str, float],
+                wait_until: Optional[float] = None) -> Dict[str, SendOutcome]:
+        """
+        Queue one chunk per device and wait until every send has finished or
+        `wait_until` (default: the latest deadline) has passed. Sends still
+        running then are reported as pending and finish in the background.
+        """
+        now = self.clock()
+        outcomes = {address: SendOutcome(address, deadlines[address], now) for address in chunks}
+        batch = _Batch(len(outcomes))
+
+        with self.lock:
+            if self._stopped:
+                raise RuntimeError("Scatter sender is stopped")
+            for address, outcome in outcomes.items():
+                lane = self.lanes.get(address)
+                if lane is None:
+                    lane = self.lanes[address] = _Lane(address, self.lock)
+                while len(lane.queue) >= self.max_queued:
+                    dropped, _, dropped_batch = lane.queue.popleft()
+                    self._finish(dropped, LATE, dropped_batch)
+                lane.queue.append((outcome, chunks[address], batch))
+                if lane.thread is None:
+                    lane.thread = threading.Thread(target=self._lane_worker, args=(lane,), daemon=True,
+                                                   name=f"scatter-{address}")
+                    lane.thread.start()
+                else:
+                    lane.condition.notify()
+
+        if outcomes:
+            until = max(deadlines.values()) if wait_until is None else wait_until
+            batch.wait(until, self.clock)
+        return outcomes
+
+    def _finish(self, outcome: SendOutcome, status: str, batch: _Batch):
+        outcome.status = status
+        if outcome.finished_at is None:
+            outcome.finished_at = self.clock()
+        self.stats[status] += 1
+        batch.done()
+
+    def _lane_worker(self, lane: _Lane):
+        while True:
+            with self.lock:
+                idle_since = self.clock()
+                while not lane.queue and not self._stopped:
+                    if self.clock() - idle_since >= self.idle_timeout:
+                        break
+                    lane.condition.wait(self.idle_timeout)
+                if not lane.queue:
+                    lane.thread = None
+                    if self.lanes.get(lane.address) is lane:
+                        del self.lanes[lane.address]
+                    return
+                outcome, data, batch = lane.queue.popleft()
+
+                if self.clock() > outcome.deadline:
+                    # Too late to be heard on time; sending would only delay later chunks
+                    self._finish(outcome, LATE, batch)
+                    continue
+
+            outcome.started_at = self.clock()
+            try:
+                success = bool(self.send(lane.address, data))
+            except Exception as e:
+                outcome.error = str(e)
+                success = False
+            outcome.finished_at = self.clock()
+            with self.lock:
+                if not success:
+                    self._finish(outcome, FAILED, batch)
+                else:
+                    self._finish(outcome, SENT if outcome.finished_at <= outcome.deadline else MISSED, batch)
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return dict(self.stats, lanes=len(self.lanes),
+                        queued=sum(len(lane.queue) for lane in self.lanes.values()))
+
+    def stop(self):
+        """Drop queued sends and let lane threads exit; sends in progress finish on their own."""
+        with self.lock:
+            self._stopped = True
+            for lane in self.lanes.values():
+                while lane.queue:
+                    outcome, _, batch = lane.queue.popleft()
+                    self._finish(outcome, LATE, batch)
+                lane.condition.notify()
+
+
+def summarize_outcomes(outcomes: Dict[str, SendOutcome]) -> Dict[str, int]:
+    """Number of devices per outcome status."""
+    summary = {SENT: 0, MISSED: 0, LATE: 0, FAILED: 0, PENDING: 0}
+    for outcome in outcomes.values():
+        summary[outcome.status] += 1
+    return summary
+
+
+# One stalled device among fast ones
+if __name__ == "__main__":
+    def send(address: str, data: bytes) -> bool:
+        time.sleep(1.0 if address == "stalled" else 0.005)
+        return True
+
+    sender = ScatterSender(send)
+    addresses = ["stalled"] + [f"device-{i}" for i in range(7)]
+    for chunk in range(5):
+        deadline = time.monotonic() + 0.05
+        outcomes = sender.scatter({address: b"\0" * 4096 for address in addresses},
+                                  {address: deadline for address in addresses})
+        print(f"chunk {chunk}: {summarize_outcomes(outcomes)}")
+        time.sleep(0.05)
+    print(sender.get_stats())
+    sender.stop()
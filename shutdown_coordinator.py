@@ -0,0 +1,175 @@
+"""
+Shutdown Coordinator Module
+Runs application shutdown as a set of named steps with dependencies.
+Independent steps run concurrently, each step starts once the steps it
+depends on have finished, and the whole shutdown is bounded by one
+deadline. The returned report lists which steps completed, failed or were
+cut off, so a hung device cannot hold the application open.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class ShutdownStep:
+    """One named piece of shutdown work and its outcome."""
+
+    def __init__(self, name: str, func: Callable[[], object], after: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.after = list(after)
+        self.status = 'pending'  # pending, running, completed, failed, timed_out
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.duration: Optional[float] = None
+
+
+class ShutdownReport:
+    """Outcome of a coordinated shutdown."""
+
+    def __init__(self, steps: List[ShutdownStep], elapsed: float, deadline: float):
+        self.steps = steps
+        self.elapsed = elapsed
+        self.deadline = deadline
+
+    def _names(self, *statuses: str) -> List[str]:
+        return [step.name for step in self.steps if step.status in statuses]
+
+    @property
+    def completed(self) -> List[str]:
+        return self._names('completed')
+
+    @property
+    def failed(self) -> List[str]:
+        return self._names('failed')
+
+    @property
+    def timed_out(self) -> List[str]:
+        """Steps still running or never started when the deadline passed."""
+        return self._names('timed_out')
+
+    @property
+    def clean(self) -> bool:
+        return all(step.status == 'completed' for step in self.steps)
+
+    def summary(self) -> str:
+        lines = [f"Shutdown finished in {self.elapsed:.2f}s "
+                 f"({len(self.completed)}/{len(self.steps)} steps completed)"]
+        for step in self.steps:
+            line = f"  {step.status:9s} {step.name}"
+            if step.duration is not None:
+                line += f" ({step.duration:.2f}s)"
+            if step.error:
+                line += f": {step.error}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict:
+        return {
+            'elapsed': self.elapsed,
+            'deadline': self.deadline,
+            'steps': {step.name: {'status': step.status, 'duration': step.duration, 'error': step.error}
+                      for step in self.steps}
+        }
+
+
+class ShutdownCoordinator:
+    """
+    Collects shutdown steps from each component, then runs them with
+    run(). Steps run on daemon threads, so a step still blocked when the
+    deadline passes is abandoned rather than waited for.
+    """
+
+    def __init__(self, deadline: float = 5.0):
+        self.deadline = deadline
+        self.steps: Dict[str, ShutdownStep] = {}
+        self._end: Optional[float] = None
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline of the running shutdown (the whole deadline before run())."""
+        if self._end is None:
+            return self.deadline
+        return max(0.0, self._end - time.monotonic())
+
+    def add_step(self, name: str, func: Callable[[], object], after: Iterable[str] = ()) -> str:
+        """Register a step that starts after the named steps have finished."""
+        if name in self.steps:
+            raise ValueError(f"Duplicate shutdown step: {name}")
+        self.steps[name] = ShutdownStep(name, func, after)
+        return name
+
+    def add_group(self, prefix: str, funcs: Dict[str, Callable[[], object]],
+                  after: Iterable[str] = ()) -> List[str]:
+        """Register several independent steps (e.g. one per device) that run concurrently."""
+        after = list(after)
+        return [self.add_step(f"{prefix}:{key}", func, after) for key, func in funcs.items()]
+
+    def run(self, deadline: Optional[float] = None) -> ShutdownReport:
+        """Run all steps and return a report once they finish or the deadline passes."""
+        deadline = self.deadline if deadline is None else deadline
+        start = time.monotonic()
+        end = self._end = start + deadline
+        condition = threading.Condition()
+
+        for step in self.steps.values():
+            missing = [name for name in step.after if name not in self.steps]
+            if missing:
+                # Unknown dependencies are ignored rather than blocking shutdown
+                print(f"Shutdown step {step.name} depends on unknown steps: {missing}")
+                step.after = [name for name in step.after if name in self.steps]
+
+        def run_step(step: ShutdownStep):
+            try:
+                step.func()
+                status, error = 'completed', None
+            except Exception as e:
+                status, error = 'failed', str(e)
+            with condition:
+                if step.status == 'running':
+                    step.status = status
+                    step.error = error
+                    step.duration = time.monotonic() - step.started_at
+                condition.notify_all()
+
+        finished = ('completed', 'failed')
+        with condition:
+            while True:
+                for step in self.steps.values():
+                    if step.status == 'pending' and all(self.steps[name].status in finished
+                                                        for name in step.after):
+                        step.status = 'running'
+                        step.started_at = time.monotonic()
+                        threading.Thread(target=run_step, args=(step,), daemon=True,
+                                         name=f"shutdown-{step.name}").start()
+
+                if all(step.status in finished for step in self.steps.values()):
+                    break
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    break
+                condition.wait(remaining)
+
+            for step in self.steps.values():
+                if step.status == 'running':
+                    step.status = 'timed_out'
+                    step.duration = time.monotonic() - step.started_at
+                elif step.status == 'pending':
+                    step.status = 'timed_out'
+
+        report = ShutdownReport(list(self.steps.values()), time.monotonic() - start, deadline)
+        print(report.summary())
+        return report
+
+
+# Show a shutdown with a hung step being cut off at the deadline
+if __name__ == "__main__":
+    coordinator = ShutdownCoordinator(deadline=2.0)
+    coordinator.add_step("stop stream", lambda: time.sleep(0.2))
+    devices = coordinator.add_group("disconnect", {
+        f"Speaker {i}": (lambda i=i: time.sleep(0.3 + 0.1 * i)) for i in range(8)
+    }, after=["stop stream"])
+    coordinator.add_group("disconnect", {"Hung speaker": lambda: time.sleep(30)}, after=["stop stream"])
+    coordinator.add_step("stop helper", lambda: time.sleep(0.1), after=devices)
+    coordinator.add_step("save cache", lambda: 1 / 0)
+    coordinator.run()
@@ -0,0 +1,249 @@
+"""
+Startup Profiler Module
+Measures how long each entry point takes to start: a per-module import time
+breakdown, time to first window and time to first discovered device. Each
+run is appended to a small JSON history so regressions show up against the
+previous runs and against a per-milestone budget.
+
+Profiling is off unless MUSIC_HOST_PROFILE_STARTUP is set; a normal launch
+only records milestones in memory, without timing imports, printing or
+writing the history file.
+
+Also provides lazy_import(), which defers loading a heavy or
+platform-specific module until one of its attributes is first used.
+"""
+
+import builtins
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Taken when this module is first imported; entry points import it first
+PROCESS_START = time.perf_counter()
+
+# Seconds each milestone is expected to stay under
+DEFAULT_BUDGETS = {
+    'first_window': 1.0,
+    'first_discovery': 5.0
+}
+
+# Set to time imports, print milestones and the import breakdown, and save the history
+PROFILE_ENV_VAR = "MUSIC_HOST_PROFILE_STARTUP"
+
+
+class ImportTimer:
+    """
+    Times every module import by wrapping builtins.__import__, keeping both
+    the cumulative time and the self time (excluding nested imports) of
+    each module, similar to `python -X importtime`.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, List[float]] = {}  # name -> [self, cumulative]
+        self._original_import = None
+        self._local = threading.local()
+
+    def install(self):
+        if self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self):
+        if self._original_import is None:
+            return
+        builtins.__import__ = self._original_import
+        self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import or builtins.__import__
+        if level or name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            timing = self.timings.setdefault(name, [0.0, 0.0])
+            timing[0] += elapsed - nested
+            timing[1] += elapsed
+
+    def breakdown(self, top: int = 15) -> List[Tuple[str, float, float]]:
+        """(module, self seconds, cumulative seconds), slowest cumulative first."""
+        rows = [(name, t[0], t[1]) for name, t in self.timings.items()]
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows[:top]
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access."""
+
+    def __init__(self, name: str):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            name = self.__dict__['_name']
+            # Through __import__ so the import timer sees it
+            __import__(name)
+            module = sys.modules[name]
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    def __setattr__(self, attribute: str, value):
+        setattr(self._load(), attribute, value)
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Return a placeholder that imports `name` the first time it is used."""
+    module = sys.modules.get(name)
+    lazy = LazyModule(name)
+    if module is not None:
+        lazy.__dict__['_module'] = module
+    return lazy
+
+
+class StartupProfiler:
+    """Milestones and import timings for one run of one entry point."""
+
+    def __init__(self, entry_point: str, metrics_file: str = "startup_metrics.json",
+                 budgets: Optional[Dict[str, float]] = None, history_size: int = 20,
+                 enabled: Optional[bool] = None):
+        self.entry_point = entry_point
+        self.enabled = bool(os.environ.get(PROFILE_ENV_VAR)) if enabled is None else enabled
+        self.metrics_file = metrics_file
+        self.budgets = dict(DEFAULT_BUDGETS, **(budgets or {}))
+        self.history_size = history_size
+
+        self.milestones: Dict[str, float] = {}
+        self.import_timer = ImportTimer()
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+
+    def mark(self, milestone: str, since: Optional[float] = None) -> Optional[float]:
+        """
+        Record a milestone the first time it is reached, as seconds since
+        process start or since the perf_counter() value `since`. Returns the
+        elapsed time, or None if the milestone was already recorded. Import
+        timing stops at the first window.
+        """
+        elapsed = time.perf_counter() - (PROCESS_START if since is None else since)
+        with self.lock:
+            if milestone in self.milestones:
+                return None
+            self.milestones[milestone] = elapsed
+        if milestone == 'first_window':
+            self.import_timer.uninstall()
+        if not self.enabled:
+            return elapsed
+
+        budget = self.budgets.get(milestone)
+        over = f" (over {budget:g}s budget)" if budget is not None and elapsed > budget else ""
+        print(f"[Startup] {self.entry_point}: {milestone} after {elapsed * 1000:.0f} ms{over}")
+        if milestone == 'first_window':
+            print(self.report())
+        self.save()
+        return elapsed
+
+    def report(self, top: int = 15) -> str:
+        """Milestones, comparison with previous runs, and the slowest imports."""
+        lines = [f"Startup profile for {self.entry_point}"]
+        previous = [run for run in self.get_history() if run.get('started_at') != self.started_at]
+        for milestone, elapsed in self.milestones.items():
+            line = f"  {milestone:16s} {elapsed * 1000:8.1f} ms"
+            earlier = sorted(run['milestones'][milestone] for run in previous
+                             if milestone in run.get('milestones', {}))
+            if earlier:
+                median = earlier[len(earlier) // 2]
+                line += f"  (median of last {len(earlier)}: {median * 1000:.1f} ms)"
+            lines.append(line)
+
+        rows = self.import_timer.breakdown(top)
+        if rows:
+            lines.append("  Slowest imports (self / cumulative):")
+            for name, self_time, cumulative in rows:
+                lines.append(f"    {name:28s} {self_time * 1000:7.1f} ms {cumulative * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+    def _load_all(self) -> Dict[str, List[Dict]]:
+        try:
+            if os.path.exists(self.metrics_file):
+                with open(self.metrics_file, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Error loading startup metrics: {e}")
+        return {}
+
+    def get_history(self) -> List[Dict]:
+        """Recorded runs of this entry point, oldest first (including this one once saved)."""
+        return self._load_all().get(self.entry_point, [])
+
+    def save(self):
+        """Store this run's milestones and slowest imports in the history file."""
+        try:
+            with self.lock:
+                run = {
+                    'started_at': self.started_at,
+                    'milestones': dict(self.milestones),
+                    'imports': {name: round(cumulative, 4)
+                                for name, _, cumulative in self.import_timer.breakdown(10)}
+                }
+            data = self._load_all()
+            runs = [r for r in data.get(self.entry_point, []) if r.get('started_at') != self.started_at]
+            runs.append(run)
+            data[self.entry_point] = runs[-self.history_size:]
+            with open(self.metrics_file, 'w') as f:
+                json.dump(data, f, indent=2)
+        except Exception as e:
+            print(f"Error saving startup metrics: {e}")
+
+
+_profiler: Optional[StartupProfiler] = None
+
+
+def get_startup_profiler(entry_point: Optional[str] = None, enabled: Optional[bool] = None) -> StartupProfiler:
+    """
+    The profiler for this process. The first call names the entry point and,
+    if profiling is enabled, starts timing imports; later calls return the
+    same profiler.
+    """
+    global _profiler
+    if _profiler is None:
+        name = entry_point or os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0]
+        _profiler = StartupProfiler(name, enabled=enabled)
+        if _profiler.enabled:
+            _profiler.import_timer.install()
+    return _profiler
+
+
+# Print the import breakdown of the application modules
+if __name__ == "__main__":
+    profiler = get_startup_profiler("profile_demo", enabled=True)
+    modules = sys.argv[1:] or ["main"]
+    for module_name in modules:
+        try:
+            __import__(module_name)
+        except Exception as e:
+            print(f"Could not import {module_name}: {e}")
+    profiler.mark('imports_done')
+    print(profiler.report())
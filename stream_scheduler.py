@@ -0,0 +1,331 @@
+"""
+Stream Scheduler Module
+Stamps audio chunks with presentation timestamps on a monotonic master clock
+and releases them to each device ahead of time by that device's latency.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from delay_line import DelayLine, DriftResampler
+from startup_profiler import lazy_import
+
+np = lazy_import("numpy")
+
+
+class TimedChunk:
+    """A chunk of audio with the master-clock time it should be heard."""
+
+    __slots__ = ('data', 'pts', 'sequence')
+
+    def __init__(self, data: np.ndarray, pts: float, sequence: int):
+        self.data = data
+        self.pts = pts
+        self.sequence = sequence
+
+
+class DeviceSender:
+    """Per-device worker that sends each chunk at pts - device latency."""
+
+    def __init__(self, device_address: str, send_callback: Callable[[str, np.ndarray], None],
+                 clock: Callable[[], float], latency: float = 0.15, late_tolerance: float = 0.05,
+                 delay_line: Optional[DelayLine] = None):
+        self.device_address = device_address
+        self.send_callback = send_callback
+        self.clock = clock
+        self.latency = latency
+        self.late_tolerance = late_tolerance
+        self.delay_line = delay_line
+        self.resampler: Optional[DriftResampler] = None
+
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.running = False
+        self.paused = False
+        self.thread: Optional[threading.Thread] = None
+
+        # Statistics
+        self.chunks_sent = 0
+        self.chunks_dropped = 0
+        self.last_release_error = 0.0
+        self.last_release_at = 0.0  # When the last chunk was due to be released (pts - latency)
+
+    def start(self):
+        """Start the sender thread."""
+        self.running = True
+        self.thread = threading.Thread(target=self._send_worker, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the sender thread and discard queued audio."""
+        with self.condition:
+            self.running = False
+            self.queue.clear()
+            self.condition.notify_all()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=1.0)
+
+    def enqueue(self, chunk: TimedChunk):
+        """Queue a chunk for release at its scheduled time."""
+        with self.condition:
+            self.queue.append(chunk)
+            self.condition.notify()
+
+    def pause(self):
+        """Hold queued chunks until resumed."""
+        with self.condition:
+            self.paused = True
+
+    def resume(self):
+        """Continue sending queued chunks."""
+        with self.condition:
+            self.paused = False
+            self.condition.notify()
+
+    def shift_queued(self, delta: float, shifted: set):
+        """Move queued chunks later by `delta`; chunks shared with other senders are shifted once."""
+        with self.condition:
+            for chunk in self.queue:
+                if chunk.sequence not in shifted:
+                    shifted.add(chunk.sequence)
+                    chunk.pts += delta
+
+    def _send_worker(self):
+        """Release queued chunks at their presentation time minus latency."""
+        while True:
+            with self.condition:
+                while self.running and (self.paused or not self.queue):
+                    self.condition.wait()
+                if not self.running:
+                    return
+
+                chunk = self.queue[0]
+                wait_time = chunk.pts - self.latency - self.clock()
+                if wait_time > 0:
+                    # Re-check after waking: the queue may have been shifted or cleared
+                    self.condition.wait(wait_time)
+                    continue
+                self.queue.popleft()
+
+            self.last_release_error = -wait_time
+            self.last_release_at = chunk.pts - self.latency
+            if -wait_time > self.late_tolerance and not self.delay_line:
+                # Too late to be heard in sync; skip rather than drift
+                self.chunks_dropped += 1
+                continue
+
+            try:
+                data = chunk.data
+                if self.resampler:
+                    data = self.resampler.process(data)
+                if self.delay_line:
+                    # Always feed the delay line so its sample count stays exact
+                    data = self.delay_line.process(data)
+                self.send_callback(self.device_address, data)
+                self.chunks_sent += 1
+            except Exception as e:
+                print(f"Error sending chunk to {self.device_address}: {e}")
+
+    def get_stats(self) -> Dict:
+        """Get sender statistics."""
+        return {
+            'latency': self.latency,
+            'delay_frames': self.delay_line.delay_frames if self.delay_line else 0,
+            'queued': len(self.queue),
+            'sent': self.chunks_sent,
+            'dropped': self.chunks_dropped,
+            'last_release_error': self.last_release_error
+        }
+
+
+class PresentationScheduler:
+    """
+    Assigns presentation timestamps from one master clock and fans chunks out
+    to per-device senders, so every device is aligned from a single schedule.
+
+    With delay lines enabled, every sender releases at pts minus the largest
+    latency and each device's shorter latency is made up by delaying its
+    stream an exact number of samples instead of by sleeping.
+    """
+
+    def __init__(self, sample_rate: int = 44100, clock: Callable[[], float] = time.monotonic,
+                 lead_margin: float = 0.1, use_delay_lines: bool = True, channels: int = 2,
+                 max_delay: float = 1.0):
+        self.sample_rate = sample_rate
+        self.clock = clock
+        self.lead_margin = lead_margin
+        self.use_delay_lines = use_delay_lines
+        self.channels = channels
+        self.max_delay = max_delay
+        self.release_latency = 0.0
+
+        self.senders: Dict[str, DeviceSender] = {}
+        self.send_callback: Optional[Callable[[str, np.ndarray], None]] = None
+        # Submitted chunks not yet due for release, replayed to devices joining mid-stream
+        self.recent_chunks = deque()
+        self.start_pts = 0.0
+        self.next_pts = 0.0
+        self.sequence = 0
+        self.paused_at: Optional[float] = None
+
+    def start(self, device_addresses: List[str], latencies: Dict[str, float],
+              send_callback: Callable[[str, np.ndarray], None], extra_delay: float = 0.0) -> float:
+        """
+        Start senders for all devices. The first chunk is scheduled far enough
+        ahead that the slowest device can still receive it in time.
+        Returns the presentation time of the first sample.
+        """
+        self.stop()
+
+        self.send_callback = send_callback
+        self.release_latency = max((latencies.get(address, 0.0) for address in device_addresses), default=0.0)
+        lead_time = self.release_latency + self.lead_margin + extra_delay
+        self.start_pts = self.clock() + lead_time
+        self.next_pts = self.start_pts
+        self.sequence = 0
+        self.paused_at = None
+
+        for address in device_addresses:
+            self._start_sender(address, latencies.get(address, 0.0))
+
+        return self.start_pts
+
+    def _start_sender(self, address: str, latency: float) -> DeviceSender:
+        if self.use_delay_lines:
+            delay_frames = int(round((self.release_latency - latency) * self.sample_rate))
+            if delay_frames < 0:
+                print(f"Latency of {address} exceeds the schedule lead; clamping delay to 0")
+            delay_line = DelayLine(self.channels, int(self.max_delay * self.sample_rate),
+                                   delay_frames=max(0, delay_frames))
+            sender = DeviceSender(address, self.send_callback, self.clock, self.release_latency,
+                                  delay_line=delay_line)
+        else:
+            sender = DeviceSender(address, self.send_callback, self.clock, latency)
+        self.senders[address] = sender
+        sender.start()
+        return sender
+
+    def add_device(self, device_address: str, latency: float) -> int:
+        """
+        Join a device to the running schedule without disturbing the others.
+        It starts from the first buffered chunk it can still release in time,
+        so it plays in sync at the current presentation time.
+        Returns how many buffered chunks were replayed to it.
+        """
+        if self.send_callback is None:
+            return 0
+        self.remove_device(device_address)
+        sender = self._start_sender(device_address, latency)
+        if self.paused_at is not None:
+            sender.pause()
+
+        release_latency = self.release_latency if self.use_delay_lines else latency
+        deadline = (self.paused_at or self.clock()) + release_latency
+        replayed = 0
+        for chunk in list(self.recent_chunks):
+            if chunk.pts >= deadline:
+                sender.enqueue(chunk)
+                replayed += 1
+        return replayed
+
+    def remove_device(self, device_address: str):
+        """Stop sending to one device; the rest of the schedule is unaffected."""
+        sender = self.senders.pop(device_address, None)
+        if sender:
+            sender.stop()
+
+    def submit(self, data: np.ndarray) -> TimedChunk:
+        """Stamp a chunk with the next presentation time and queue it for every device."""
+        chunk = TimedChunk(data, self.next_pts, self.sequence)
+        self.next_pts += len(data) / self.sample_rate
+        self.sequence += 1
+        for sender in list(self.senders.values()):
+            sender.enqueue(chunk)
+
+        # Keep only chunks a joining device could still release in time
+        self.recent_chunks.append(chunk)
+        if self.paused_at is None:
+            released_before = self.clock() + self.release_latency
+            while self.recent_chunks and self.recent_chunks[0].pts < released_before:
+                self.recent_chunks.popleft()
+        return chunk
+
+    def time_until_next(self) -> float:
+        """Seconds between now and the presentation time of the next chunk."""
+        return self.next_pts - self.clock()
+
+    def pause(self):
+        """Freeze the schedule."""
+        if self.paused_at is None:
+            self.paused_at = self.clock()
+            for sender in self.senders.values():
+                sender.pause()
+
+    def resume(self):
+        """Shift the schedule by the time spent paused."""
+        if self.paused_at is None:
+            return
+        delta = self.clock() - self.paused_at
+        self.paused_at = None
+        self.next_pts += delta
+        shifted = set()
+        for sender in self.senders.values():
+            sender.shift_queued(delta, shifted)
+        for sender in self.senders.values():
+            sender.resume()
+
+    def set_device_latency(self, device_address: str, latency: float):
+        """Update one device's latency; takes effect from its next chunk."""
+        sender = self.senders.get(device_address)
+        if not sender:
+            return
+        if sender.delay_line:
+            # Audio the resampler has already pulled forward must be delayed back
+            advance = sender.resampler.advance_seconds(self.sample_rate) if sender.resampler else 0.0
+            delay = self.release_latency - latency + advance
+            if delay < 0:
+                print(f"Latency of {device_address} exceeds the schedule lead; clamping delay to 0")
+            sender.delay_line.set_delay_seconds(delay, self.sample_rate)
+        else:
+            sender.latency = latency
+
+    def get_device_latency(self, device_address: str) -> Optional[float]:
+        """
+        The latency the device's stream is currently compensated for,
+        including its delay line and any resampler advance; None if the
+        device is not streaming.
+        """
+        sender = self.senders.get(device_address)
+        if not sender:
+            return None
+        if sender.delay_line:
+            advance = sender.resampler.advance_seconds(self.sample_rate) if sender.resampler else 0.0
+            return self.release_latency - sender.delay_line.delay_frames / self.sample_rate + advance
+        return sender.latency
+
+    def set_device_drift(self, device_address: str, drift: float):
+        """
+        Compensate a device's clock drift (seconds of latency gained per
+        second) by resampling its stream.
+        """
+        sender = self.senders.get(device_address)
+        if not sender:
+            return
+        if sender.resampler is None:
+            sender.resampler = DriftResampler(self.channels)
+        sender.resampler.ratio = 1.0 + drift
+
+    def stop(self):
+        """Stop all device senders."""
+        for sender in self.senders.values():
+            sender.stop()
+        self.senders.clear()
+        self.recent_chunks.clear()
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Get per-device sender statistics."""
+        return {address: sender.get_stats() for address, sender in self.senders.items()}
@@ -0,0 +1,197 @@
+"""
+Sync Quality Harness
+Runs AudioEngine's Bluetooth stream into simulated sinks, records what each
+sink played and when, and measures per-device offset, drift and glitches by
+cross-correlating the recordings against the source.
+
+Usage: python sync_harness.py [--devices N] [--duration S] [--max-error-ms MS]
+"""
+
+import argparse
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from audio_engine import AudioEngine, PrefetchedTrack
+from latency_probe import estimate_delay
+
+
+class SimulatedSink:
+    """
+    A device that plays received chunks back to back on its own clock.
+    Playback starts `latency` after the first chunk arrived, so a sender
+    that releases late shows up as an offset. A chunk that arrives after the
+    previous one finished playing is a glitch; playback then restarts after
+    the device latency.
+    """
+
+    def __init__(self, address: str, latency: float, drift_ppm: float = 0.0,
+                 jitter: float = 0.0, sample_rate: int = 44100, seed: Optional[int] = None):
+        self.address = address
+        self.latency = latency
+        self.drift = drift_ppm * 1e-6
+        self.jitter = jitter
+        self.sample_rate = sample_rate
+        self.rng = np.random.default_rng(seed)
+
+        self.segments = []  # (master-clock start time, samples)
+        self.playout_end: Optional[float] = None
+        self.glitches = 0
+        self.lock = threading.Lock()
+
+    def receive(self, data: np.ndarray, arrival_time: float):
+        """Record a chunk arriving at the sink at the given master-clock time."""
+        arrival_time += self.rng.normal(0.0, self.jitter) if self.jitter else 0.0
+        # A drifting clock plays each chunk slightly slower (positive) or faster
+        duration = len(data) * (1.0 + self.drift) / self.sample_rate
+        with self.lock:
+            if self.playout_end is None:
+                start = arrival_time + self.latency
+            elif arrival_time > self.playout_end:
+                self.glitches += 1
+                start = arrival_time + self.latency
+            else:
+                start = self.playout_end
+            self.segments.append((start, data.copy()))
+            self.playout_end = start + duration
+
+    def render(self, t0: float, frames: int) -> np.ndarray:
+        """Render what the sink played onto the master timeline starting at t0."""
+        output = np.zeros(frames, dtype=np.float32)
+        with self.lock:
+            segments = list(self.segments)
+        for start, data in segments:
+            index = int(round((start - t0) * self.sample_rate))
+            mono = data.mean(axis=1) if data.ndim > 1 else data
+            begin, end = max(index, 0), min(index + len(mono), frames)
+            if begin < end:
+                output[begin:end] = mono[begin - index:end - index]
+        return output
+
+
+def analyze_sink(reference: np.ndarray, recording: np.ndarray, sample_rate: int,
+                 window: float = 0.25, search: float = 0.2) -> List[tuple]:
+    """
+    Cross-correlate the sink's recording against the reference in windows.
+    Windows are kept short so drift does not smear the correlation peak.
+    Returns (window time, offset seconds, confidence); a positive offset
+    means the sink played late.
+    """
+    window_frames = int(window * sample_rate)
+    search_frames = int(search * sample_rate)
+    results = []
+    for start in range(search_frames, len(reference) - window_frames - search_frames, window_frames):
+        ref = reference[start:start + window_frames]
+        rec = recording[start - search_frames:start + window_frames + search_frames]
+        if not rec.any():
+            continue
+        delay, confidence = estimate_delay(ref, rec, sample_rate)
+        results.append((start / sample_rate, delay - search, confidence))
+    return results
+
+
+def run_harness(device_specs: List[Dict], duration: float = 10.0, chunk_frames: int = 1024,
+                seed: int = 7) -> Dict:
+    """
+    Stream `duration` seconds of noise through AudioEngine's Bluetooth
+    stream into simulated sinks. Each spec has 'address', 'latency' (true)
+    and optionally 'estimated_latency', 'drift_ppm' and 'jitter'.
+    """
+    engine = AudioEngine()
+    engine.chunk_frames = chunk_frames
+    sample_rate = engine.sample_rate
+    clock = engine.synchronizer.master_clock
+
+    rng = np.random.default_rng(seed)
+    source = (rng.standard_normal((int(duration * sample_rate), engine.channels)) * 0.25).astype(np.float32)
+
+    sinks = {spec['address']: SimulatedSink(spec['address'], spec['latency'], spec.get('drift_ppm', 0.0),
+                                            spec.get('jitter', 0.0), sample_rate, seed)
+             for spec in device_specs}
+
+    # Set directly so the harness does not write calibration profiles
+    engine.synchronizer.device_delays.update(
+        {spec['address']: spec.get('estimated_latency', spec['latency']) for spec in device_specs})
+    # Playout is timed from when the engine's sender actually delivered the chunk
+    engine.chunk_sink = lambda address, data: sinks[address].receive(data, clock())
+
+    # Decoded-stream path of AudioEngine.play, without the local pygame output
+    engine.current_file = "sync_harness"
+    engine._current_track = PrefetchedTrack(engine.current_file, source, sample_rate)
+    engine.stop_event.clear()
+    engine.is_playing = True
+    engine._stream_to_bluetooth_devices(list(sinks))
+    start_pts = engine.scheduler.start_pts
+
+    engine.stream_thread.join()
+    time.sleep(max(0.0, engine.scheduler.next_pts - clock()) + 0.2)
+    sender_stats = engine.scheduler.get_stats()
+    engine.is_playing = False
+    engine.stop_event.set()
+    engine.scheduler.stop()
+
+    reference = source.mean(axis=1)
+    report = {}
+    for address, sink in sinks.items():
+        recording = sink.render(start_pts, len(reference))
+        windows = analyze_sink(reference, recording, sample_rate)
+        offsets = np.array([offset for _, offset, confidence in windows if confidence > 0.3])
+        times = np.array([t for t, _, confidence in windows if confidence > 0.3])
+        drift_ppm = float(np.polyfit(times, offsets, 1)[0] * 1e6) if len(offsets) > 1 else 0.0
+        report[address] = {
+            'offset_ms': float(np.median(offsets) * 1000) if len(offsets) else None,
+            'max_abs_offset_ms': float(np.max(np.abs(offsets)) * 1000) if len(offsets) else None,
+            'drift_ppm': drift_ppm,
+            'glitches': sink.glitches,
+            'dropped': sender_stats.get(address, {}).get('dropped', 0),
+            'windows': len(offsets)
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure multi-device sync quality with simulated sinks")
+    parser.add_argument('--devices', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--latency-error-ms', type=float, default=0.0,
+                        help="Error added to the latency the pipeline believes each device has")
+    parser.add_argument('--drift-ppm', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=2.0)
+    # Sender thread wake-up lateness (typically 0.5-3.5ms) is measured, so allow a few ms
+    parser.add_argument('--max-error-ms', type=float, default=5.0,
+                        help="Fail if any device's offset exceeds this")
+    args = parser.parse_args()
+
+    specs = []
+    for i in range(args.devices):
+        latency = 0.08 + 0.05 * i
+        specs.append({
+            'address': f"SIM:00:00:00:00:{i:02X}",
+            'latency': latency,
+            'estimated_latency': latency + args.latency_error_ms / 1000 * (1 if i % 2 else -1),
+            'drift_ppm': args.drift_ppm * (1 if i % 2 else -1),
+            'jitter': args.jitter_ms / 1000
+        })
+
+    print(f"Running sync harness: {args.devices} devices, {args.duration:.0f}s")
+    report = run_harness(specs, args.duration)
+
+    failed = False
+    for address, result in report.items():
+        offset = result['offset_ms']
+        worst = result['max_abs_offset_ms']
+        ok = worst is not None and worst <= args.max_error_ms and result['glitches'] == 0
+        failed |= not ok
+        offset_text = f"{offset:+.3f}ms" if offset is not None else "n/a"
+        worst_text = f"{worst:.3f}ms" if worst is not None else "n/a"
+        print(f"{'PASS' if ok else 'FAIL'} {address}: offset {offset_text}, worst {worst_text}, "
+              f"drift {result['drift_ppm']:+.1f}ppm, glitches {result['glitches']}, dropped {result['dropped']}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
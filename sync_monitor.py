@@ -0,0 +1,197 @@
+"""
+Sync Monitor Module
+Continuously measures each device's latency while streaming, tracks offset
+and clock drift with a Kalman filter and feeds smoothed corrections back.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from latency_probe import LoopbackBackend, measure_latency
+
+
+class OffsetKalmanFilter:
+    """
+    Two-state Kalman filter over [offset (s), drift (s/s)] with a constant
+    drift model. Measurements are noisy observations of the offset.
+    """
+
+    def __init__(self, initial_offset: float = 0.15, offset_variance: float = 0.01,
+                 drift_variance: float = 1e-8, process_noise: float = 1e-10,
+                 measurement_noise: float = 1e-7):
+        self.offset = initial_offset
+        self.drift = 0.0
+        self.p = [[offset_variance, 0.0], [0.0, drift_variance]]
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.initialized = False
+
+    def predict(self, dt: float):
+        """Advance the state by dt seconds."""
+        self.offset += self.drift * dt
+        p = self.p
+        q = self.process_noise
+        # P = F P F^T + Q with F = [[1, dt], [0, 1]] and white drift acceleration
+        p00 = p[0][0] + dt * (p[1][0] + p[0][1]) + dt * dt * p[1][1] + q * dt ** 3 / 3
+        p01 = p[0][1] + dt * p[1][1] + q * dt ** 2 / 2
+        p10 = p[1][0] + dt * p[1][1] + q * dt ** 2 / 2
+        p11 = p[1][1] + q * dt
+        self.p = [[p00, p01], [p10, p11]]
+
+    def update(self, measured_offset: float) -> float:
+        """Fold in one offset measurement; returns the innovation."""
+        if not self.initialized:
+            # First measurement sets the offset directly
+            self.offset = measured_offset
+            self.initialized = True
+            return 0.0
+
+        p = self.p
+        innovation = measured_offset - self.offset
+        s = p[0][0] + self.measurement_noise
+        k0 = p[0][0] / s
+        k1 = p[1][0] / s
+        self.offset += k0 * innovation
+        self.drift += k1 * innovation
+        self.p = [[(1 - k0) * p[0][0], (1 - k0) * p[0][1]],
+                  [p[1][0] - k1 * p[0][0], p[1][1] - k1 * p[0][1]]]
+        return innovation
+
+
+def loopback_measurement(backends: Dict[str, LoopbackBackend], probe: str = 'chirp',
+                         sample_rate: int = 44100) -> Callable[[str], Optional[float]]:
+    """Build a measurement function that probes each device through its loopback backend."""
+    def measure(device_address: str) -> Optional[float]:
+        backend = backends.get(device_address)
+        if backend is None:
+            return None
+        return measure_latency(backend, probe=probe, sample_rate=sample_rate, repeats=1)
+    return measure
+
+
+def playhead_measurement(get_playhead: Callable[[str], Optional[Tuple[float, float]]],
+                         get_applied_latency: Callable[[str], Optional[float]]
+                         ) -> Callable[[str], Optional[float]]:
+    """
+    Build a measurement function from devices that report their playhead.
+    `get_playhead(address)` returns (pts_being_heard, master_clock_time); how
+    far the clock is ahead of what the device plays is only the residual
+    error left after the applied compensation. Adding the latency the stream
+    is compensated for (`get_applied_latency`, e.g.
+    PresentationScheduler.get_device_latency) gives the device's latency,
+    so corrections are not fed back into their own input.
+    """
+    def measure(device_address: str) -> Optional[float]:
+        report = get_playhead(device_address)
+        applied = get_applied_latency(device_address)
+        if report is None or applied is None:
+            return None
+        pts_heard, clock_time = report
+        return applied + (clock_time - pts_heard)
+    return measure
+
+
+class SyncMonitor:
+    """
+    Background loop that periodically measures every device, smooths offset
+    and drift per device, and applies corrections through a callback.
+    """
+
+    def __init__(self, measure: Callable[[str], Optional[float]],
+                 apply_correction: Callable[[str, float, float], None],
+                 interval: float = 2.0, clock: Callable[[], float] = time.monotonic,
+                 min_adjustment: float = 0.0005, history_size: int = 600):
+        self.measure = measure
+        self.apply_correction = apply_correction
+        self.interval = interval
+        self.clock = clock
+        self.min_adjustment = min_adjustment
+
+        self.filters: Dict[str, OffsetKalmanFilter] = {}
+        self.applied: Dict[str, float] = {}
+        self.last_update: Dict[str, float] = {}
+        self.error_series: Dict[str, deque] = {}
+        self.history_size = history_size
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def add_device(self, device_address: str, initial_offset: float):
+        """Start tracking a device from its current latency estimate."""
+        with self.lock:
+            self.filters[device_address] = OffsetKalmanFilter(initial_offset)
+            self.applied[device_address] = initial_offset
+            self.error_series[device_address] = deque(maxlen=self.history_size)
+
+    def remove_device(self, device_address: str):
+        """Stop tracking a device."""
+        with self.lock:
+            self.filters.pop(device_address, None)
+            self.applied.pop(device_address, None)
+            self.last_update.pop(device_address, None)
+            self.error_series.pop(device_address, None)
+
+    def start(self):
+        """Start the monitor thread."""
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._monitor_worker, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the monitor thread."""
+        self.stop_event.set()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=self.interval + 1.0)
+
+    def _monitor_worker(self):
+        """Measure all devices every interval."""
+        while not self.stop_event.wait(self.interval):
+            with self.lock:
+                addresses = list(self.filters)
+            for device_address in addresses:
+                try:
+                    self.sample_device(device_address)
+                except Exception as e:
+                    print(f"Sync monitor error for {device_address}: {e}")
+
+    def sample_device(self, device_address: str):
+        """Take one measurement for a device and apply the smoothed correction."""
+        measured = self.measure(device_address)
+        now = self.clock()
+
+        with self.lock:
+            kalman = self.filters.get(device_address)
+            if kalman is None or measured is None:
+                return
+            previous = self.last_update.get(device_address)
+            if previous is not None:
+                kalman.predict(now - previous)
+            kalman.update(measured)
+            self.last_update[device_address] = now
+
+            offset, drift = kalman.offset, kalman.drift
+            error = measured - self.applied[device_address]
+            self.error_series[device_address].append((now, error, offset, drift))
+
+            if abs(offset - self.applied[device_address]) < self.min_adjustment:
+                return
+            self.applied[device_address] = offset
+
+        self.apply_correction(device_address, offset, drift)
+
+    def get_error_series(self, device_address: str) -> List[Tuple[float, float, float, float]]:
+        """(time, sync error, smoothed offset, drift) samples for a device."""
+        with self.lock:
+            return list(self.error_series.get(device_address, ()))
+
+    def get_estimates(self) -> Dict[str, Dict]:
+        """Current smoothed offset and drift for every device."""
+        with self.lock:
+            return {address: {'offset': kalman.offset, 'drift': kalman.drift,
+                              'applied': self.applied.get(address)}
+                    for address, kalman in self.filters.items()}